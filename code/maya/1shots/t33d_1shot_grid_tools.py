@@ -7,9 +7,14 @@ Originally Written by Joe Crawford
 
 """
 
+import os
+import sys
+import time
 import traceback
 import maya.cmds as cmds
 import maya.mel
+import maya.api.OpenMaya as om
+import numpy as np
 
 
 def onMayaDroppedPythonFile( *args, **kwargs ):
@@ -69,32 +74,237 @@ def _installToShelf():
 
 
 
+class T33d_GridDef(object):
+    """
+    A grid in world space: ``origin``, ``rotation`` (3x3, rows are the
+    grid's X, Y and Z axes as world unit vectors) and per-axis ``spacing``.
+
+    Points go into grid space, are rounded to multiples of the spacing
+    there and come back -- for whole (N, 3) arrays at once, as two matrix
+    products.  That covers rotated and non-uniform grids, like 2 x 0.25 x 2
+    floor tiles, as well as the plain Maya grid.
+    """
+
+    def __init__(self, origin=(0.0, 0.0, 0.0), rotation=None, spacing=1.0):
+        self.origin = np.array(origin, dtype=np.float64).reshape(3)
+        self.rotation = np.eye(3) if rotation is None else np.array(rotation, dtype=np.float64).reshape(3, 3)
+        self.spacing = np.abs(np.broadcast_to(np.array(spacing, dtype=np.float64), (3,))).copy()
+
+    def __repr__(self):
+        return 'T33d_GridDef(origin={}, rotation={}, spacing={})'.format(
+            self.origin.tolist(), self.rotation.tolist(), self.spacing.tolist())
+
+    @classmethod
+    def fromMayaGrid(cls):
+        """The uniform, world-aligned grid the Maya grid settings describe."""
+        return cls(spacing=T33d_GridToolsFuncs.getGridSnappableSpacing())
+
+    @classmethod
+    def fromTransform(cls, obj, spacing=None):
+        """
+        A grid on transform ``obj``: its world pivot is the origin and its
+        world axes the grid axes.  When ``spacing`` is None the world scale
+        of each axis is the spacing, so a locator scaled (2, 0.25, 2)
+        describes a 2 x 0.25 x 2 grid.  Shear is ignored.
+        """
+        selList = om.MSelectionList()
+        selList.add(obj)
+        dagPath = selList.getDagPath(0)
+        world = np.array(list(dagPath.inclusiveMatrix()), dtype=np.float64).reshape(4, 4)
+        pivot = om.MFnTransform(dagPath).rotatePivot(om.MSpace.kWorld)
+
+        axes = world[:3, :3]
+        scale = np.linalg.norm(axes, axis=1)
+        ## Orthonormalise, keeping X and the XY plane, so sheared or
+        ## mirrored transforms still give a proper rotation.
+        x = axes[0] / scale[0]
+        z = np.cross(x, axes[1])
+        z /= np.linalg.norm(z)
+        y = np.cross(z, x)
+        return cls(
+            origin=list(pivot)[:3],
+            rotation=np.array([x, y, z]),
+            spacing=scale if spacing is None else spacing,
+        )
+
+    def toGrid(self, points):
+        return (np.asarray(points, dtype=np.float64) - self.origin).dot(self.rotation.T)
+
+    def fromGrid(self, gridPoints):
+        return np.asarray(gridPoints, dtype=np.float64).dot(self.rotation) + self.origin
+
+    def snap(self, points):
+        """Nearest grid points to an (N, 3) array of world positions."""
+        return self.fromGrid(np.round(self.toGrid(points) / self.spacing) * self.spacing)
+
+    def minSpacing(self):
+        return float(self.spacing.min())
+
+
+class T33d_GridState(object):
+    """
+    The grid settings -- spacing, divisions, whole size and this tool's
+    multiplier -- read from Maya once and kept here, so Grid Tools and its
+    hotkeys do not query ``cmds.grid`` on every call.
+
+    All changes made by Grid Tools go through set() / reset(), which write
+    the grid and update this copy.  Changes made elsewhere are picked up by
+    scriptJobs on the optionVars the Grid Options box saves; they trigger
+    invalidate(), the only place that re-reads the grid (refresh() does the
+    same on demand, e.g. after a script called ``cmds.grid``).  After every
+    change the new values are pushed to the registered listeners (open
+    Grid Tools windows), which update from them without querying anything.
+
+    The multiplier is kept in the ``T33d_GridTools_Multiplier`` optionVar.
+    It divides sizes in the UI, so anything but a positive number reads
+    as 1.
+    """
+
+    _Instance = None
+    _MayaGridOptionVars = ('gridSpacing', 'gridDivisions', 'gridSize')
+    _MultiplierOptionVar = 'T33d_GridTools_Multiplier'
+
+    @classmethod
+    def GetInstance(cls):
+        if cls._Instance is None:
+            cls._Instance = cls()
+            cls._Instance.installJobs()
+        return cls._Instance
+
+    def __init__(self):
+        self.listeners = []
+        self.multiplier = 1.0
+        if cmds.optionVar(exists=self._MultiplierOptionVar):
+            self.multiplier = self.clampMultiplier(cmds.optionVar(query=self._MultiplierOptionVar))
+        self.read()
+
+    @staticmethod
+    def clampMultiplier(multiplier):
+        try:
+            multiplier = float(multiplier)
+        except (TypeError, ValueError):
+            return 1.0
+        return multiplier if 0.0 < multiplier < float('inf') else 1.0
+
+    def read(self):
+        self.spacing = cmds.grid(query=True, spacing=True)
+        ## Just in case maya ever gives us a number lower than the logically smallest
+        self.divisions = max(1, cmds.grid(query=True, divisions=True))
+        self.wholeSize = cmds.grid(query=True, size=True)
+
+    @property
+    def snappableSpacing(self):
+        return self.spacing / float(self.divisions)
+
+    def set(self, spacing=None, divisions=None, wholeSize=None, multiplier=None, reset=False):
+        """
+        Change any of the settings with one cmds.grid call, then notify.
+        With ``reset``, the grid goes back to Maya's defaults first.
+        """
+        if reset:
+            cmds.grid(reset=True)
+            self.read()
+        gridArgs = {}
+        if spacing is not None:
+            self.spacing = gridArgs['spacing'] = float(spacing)
+        if divisions is not None:
+            self.divisions = gridArgs['divisions'] = max(1, int(divisions))
+        if wholeSize is not None:
+            self.wholeSize = gridArgs['size'] = float(wholeSize)
+        if gridArgs:
+            cmds.grid(**gridArgs)
+        if multiplier is not None:
+            self.multiplier = self.clampMultiplier(multiplier)
+            cmds.optionVar(floatValue=(self._MultiplierOptionVar, self.multiplier))
+        self.notify()
+
+    def reset(self):
+        """Maya's default grid, and a multiplier of 1."""
+        self.set(multiplier=1.0, reset=True)
+
+    def invalidate(self, *args):
+        """The grid was changed outside Grid Tools: read it again and notify."""
+        self.read()
+        self.notify()
+
+    refresh = invalidate
+
+    def addListener(self, listener):
+        """``listener(state)`` is called after every change."""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def removeListener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def notify(self):
+        for listener in list(self.listeners):
+            try:
+                listener(self)
+            except Exception:
+                traceback.print_exc()
+
+    def installJobs(self):
+        """
+        One scriptJob per Maya grid optionVar.  Their ids live in a MEL
+        global, which lasts for the Maya session, so running this file again
+        replaces the jobs rather than piling up more.
+        """
+        oldJobs = maya.mel.eval('global int $gT33dGridStateJobs[]; $temp = $gT33dGridStateJobs;') or []
+        for job in oldJobs:
+            if cmds.scriptJob(exists=job):
+                cmds.scriptJob(kill=job, force=True)
+        jobs = []
+        for optionVar in self._MayaGridOptionVars:
+            try:
+                jobs.append(cmds.scriptJob(optionVarChanged=(optionVar, self.invalidate)))
+            except (TypeError, RuntimeError):
+                ## No such scriptJob flag in this Maya; refresh() still works.
+                traceback.print_exc()
+                break
+        maya.mel.eval('global int $gT33dGridStateJobs[]; $gT33dGridStateJobs = {' +
+                      ', '.join(str(job) for job in jobs) + '};')
+
+
 class T33d_GridToolsFuncs(object):
 
     _Instance = None
+    _GridDef = None    ## a T33d_GridDef set by the user; None follows the Maya grid
+    _InstanceSpace = 'first'    ## which instance of an instanced shape defines world space
+    _InstanceSpaces = ('first', 'last', 'original')
+    _LastInstanceDedup = None   ## what the last selection resolve skipped, for reporting
+    _SnapPlugin = 't33dGridSnap'    ## plugin with the undoable snap command, in t33d/plugins
 
     @classmethod
     def GetInstance(cls):
         return cls.__Instance
 
+    @classmethod
+    def getGridState(cls):
+        return T33d_GridState.GetInstance()
+
     @classmethod
     def reset(cls, setManip=False):
-        cmds.grid(reset=True)
+        state = cls.getGridState()
+        state.reset()
         if setManip == True:
             ## Reset grid is spacing of 5 with 5 divisions,
             ## ends up being just 1.0
-            cls.setManipToSpacing(1.0)
+            cls.setManipToSpacing(state.snappableSpacing)
 
     @classmethod
     def reset_via_numbers(cls, multiplier=1.0, spacing=1.0, wholeSize=4096, setManip=False):
-        ## Reset, but remember, default grid size is wacky, based on 5.0
-        cmds.grid(reset=True)
-        ## now change it to be power of two friendly 1.0*multiplier
+        multiplier = T33d_GridState.clampMultiplier(multiplier)
+        ## Reset, but remember, default grid size is wacky, based on 5.0,
+        ## so change it to be power of two friendly 1.0*multiplier,
         ## also set divisions to one and size
-        cmds.grid(
-            size=wholeSize * multiplier,
+        cls.getGridState().set(
+            wholeSize=wholeSize * multiplier,
             spacing=spacing * multiplier,
-            divisions=1
+            divisions=1,
+            multiplier=multiplier,
+            reset=True,
         )
         if setManip == True:
             cls.setManipToSpacing(spacing * multiplier)
@@ -105,7 +315,7 @@ class T33d_GridToolsFuncs(object):
         This function gets the size of the *entire* grid,
         not the spacing between grid lines.
         """
-        return cmds.grid(query=True, size=True)
+        return cls.getGridState().wholeSize
 
     @classmethod
     def setWholeSize(cls, wholeSize):
@@ -113,20 +323,18 @@ class T33d_GridToolsFuncs(object):
         This function sets the size of the *entire* grid,
         not the spacing between grid lines.
         """
-        cmds.grid(size=wholeSize)
+        cls.getGridState().set(wholeSize=wholeSize)
 
     @classmethod
     def getSpacing(cls, log=False):
-        sp = cmds.grid(query=True, spacing=True)
+        sp = cls.getGridState().spacing
         if log:
             print("Grid spacing value is: " + str(sp))
         return sp
 
     @classmethod
     def getDivisions(cls, log=False):
-        sp = cmds.grid(query=True, divisions=True)
-        if sp < 1:  ## Just in case maya ever gives us a number lower than the logically smallest
-            sp = 1
+        sp = cls.getGridState().divisions
         if log:
             print("Grid spacing value is: " + str(sp))
         return sp
@@ -135,7 +343,7 @@ class T33d_GridToolsFuncs(object):
     def setSpacing(cls, spacing, setManip=False, log=False):
         if log:
             print("Grid spacing value is: " + str(spacing))
-        cmds.grid(spacing=spacing)
+        cls.getGridState().set(spacing=spacing)
         if setManip:
             cls.setManipToSpacing(spacing)
 
@@ -169,88 +377,628 @@ class T33d_GridToolsFuncs(object):
 
     @classmethod
     def snapVertsToGrid(cls):
-        originalSelection = cmds.ls(selection=True, flatten=True)
-        maya.mel.eval('ConvertSelectionToVertices;')
-        selVerts = cmds.ls(selection=True, flatten=True)
+        """
+        Snap the selected vertices (or the vertices of the selected edges,
+        faces and meshes) to the grid, in world space.
 
-        spacing = cls.getSpacing()
-        divisions = cls.getDivisions()
+        Points are read per mesh with one MFnMesh.getPoints call, snapped
+        as a NumPy array to the active grid (getGridDef), and only the ones
+        that actually move are written back, through applyEdits (one undo
+        entry for the whole snap).
+        """
+        return cls.snapVertsToGridDef(cls.getGridDef())
 
-        spacingOfDivisions = spacing / float(divisions)
+    @classmethod
+    def snapVertsToGridDef(cls, gridDef):
+        """snapVertsToGrid, onto the T33d_GridDef ``gridDef``."""
+        started = time.time()
+        edits = []
+        for dagPath, indices, points, snapped, moved in cls.planVertSnap(gridDef):
+            if moved.any():
+                edits.append(cls.makePointEdit(dagPath, indices[moved], points[moved], snapped[moved]))
+
+        cls.applyEdits(pointEdits=edits)
+        cls.reportInstanceDedup(time.time() - started)
+        return sum(len(edit[1]) for edit in edits)
 
-        def onGrid(n, s):
-            return (spacingOfDivisions * float(round(n / float(s))))
+    @classmethod
+    def planVertSnap(cls, gridDef):
+        """
+        For each mesh in the selection: ``(dagPath, indices, points,
+        snapped, moved)`` -- the selected vertex indices, their world
+        positions, their snapped positions and a mask of the ones that move.
+        Nothing is written.
+        """
+        plan = []
+        for dagPath, indices in cls.getSelectedMeshVerts():
+            points = cls.getMeshPoints(dagPath)[indices]
+            snapped = gridDef.snap(points)
+            plan.append((dagPath, indices, points, snapped,
+                         cls.getMovedMask(points, snapped, gridDef.minSpacing())))
+        return plan
+
+    @classmethod
+    def previewSnapVerts(cls, selectMoved=False, selectCollapsed=False, log=True):
+        """
+        Dry run of snapVertsToGrid: work out where the selected vertices
+        would go, in the same vectorised pass, without moving anything.
+
+        Returns a dict with ``points`` (considered), ``moved`` (count that
+        would move), ``maxDisplacement`` and ``meanDisplacement`` (over the
+        moving points), and ``collapsed`` / ``collapsedCells``: points that
+        would land in a grid cell shared with another point of the same
+        mesh, and how many such cells there are.
+
+        ``selectMoved`` / ``selectCollapsed`` replace the selection with
+        the vertices concerned -- without a snap, to look at them first.
+        """
+        gridDef = cls.getGridDef()
+        report = {'points': 0, 'moved': 0, 'maxDisplacement': 0.0, 'meanDisplacement': 0.0,
+                  'collapsed': 0, 'collapsedCells': 0}
+        displacementSum = 0.0
+        toSelect = om.MSelectionList()
+
+        for dagPath, indices, points, snapped, moved in cls.planVertSnap(gridDef):
+            distances = np.linalg.norm(snapped - points, axis=1)[moved]
+            report['points'] += len(points)
+            report['moved'] += len(distances)
+            if len(distances):
+                report['maxDisplacement'] = max(report['maxDisplacement'], float(distances.max()))
+                displacementSum += float(distances.sum())
+
+            cells = np.round(gridDef.toGrid(snapped) / gridDef.spacing).astype(np.int64)
+            shared, cellCount = cls.getSharedCellMask(cells)
+            report['collapsed'] += int(shared.sum())
+            report['collapsedCells'] += cellCount
+
+            selectMask = np.zeros(len(indices), dtype=bool)
+            if selectMoved:
+                selectMask |= moved
+            if selectCollapsed:
+                selectMask |= shared
+            if selectMask.any():
+                fnComp = om.MFnSingleIndexedComponent()
+                component = fnComp.create(om.MFn.kMeshVertComponent)
+                fnComp.addElements(indices[selectMask].tolist())
+                toSelect.add((dagPath, component))
+
+        if report['moved']:
+            report['meanDisplacement'] = displacementSum / report['moved']
+        if selectMoved or selectCollapsed:
+            om.MGlobal.setActiveSelectionList(toSelect)
+        if log:
+            msg = ('Snap preview: {moved} of {points} points would move '
+                   '(max {maxDisplacement:.6g}, mean {meanDisplacement:.6g}), '
+                   '{collapsed} would collapse into {collapsedCells} shared cells').format(**report)
+            print(msg)
+            cls.showMsg(msg)
+        return report
 
-        for v in selVerts:
-            if '.vtx[' in v:
-                pos = cmds.pointPosition(v, world=True)
-                x = onGrid(pos[0], spacingOfDivisions)
-                y = onGrid(pos[1], spacingOfDivisions)
-                z = onGrid(pos[2], spacingOfDivisions)
-                cmds.xform(v, translation=[x, y, z], worldSpace=True)
+    @classmethod
+    def getSharedCellMask(cls, cells):
+        """
+        For (N, 3) integer grid cells: a mask of the rows whose cell occurs
+        more than once, and the number of such cells.
 
-        if originalSelection:
-            cmds.select(originalSelection)
+        The three coordinates are packed into one int64 key (21 bits each,
+        relative to the minimum) -- a perfect hash for any mesh under two
+        million cells across -- so the duplicate search is a 1-D unique;
+        larger spans fall back to a row-wise unique.
+        """
+        if not len(cells):
+            return np.zeros(0, dtype=bool), 0
+        cells = cells - cells.min(axis=0)
+        if cells.max() < (1 << 21):
+            keys = (cells[:, 0] << 42) | (cells[:, 1] << 21) | cells[:, 2]
+            _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
         else:
-            cmds.select(clear=True)
+            _, inverse, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        return counts[inverse] > 1, int((counts > 1).sum())
+
+    @classmethod
+    def getSelectedMeshVerts(cls):
+        """
+        Resolve the selection to ``[(meshDagPath, vertIndices), ...]``, one
+        entry per mesh shape, with indices as a sorted, unique int64 array.
+
+        Uses polyListComponentConversion, which returns compact ranges
+        like ``pCube1.vtx[0:4095]``, so the selection itself is not changed
+        and nothing is flattened into one string per vertex.
+
+        Instances of one shape share its points, so they are merged into
+        a single entry: the points are snapped once, in the world space of
+        the instance chosen with setInstanceSpace.  What was skipped is
+        kept in ``_LastInstanceDedup`` for reportInstanceDedup.
+        """
+        cls._LastInstanceDedup = None
+        sel = cmds.ls(selection=True)
+        if not sel:
+            return []
+        verts = cmds.polyListComponentConversion(sel, toVertex=True) or []
+
+        selList = om.MSelectionList()
+        for v in verts:
+            selList.add(v)
+
+        order = []
+        byShape = {}
+        for i in range(selList.length()):
+            dagPath, component = selList.getComponent(i)
+            if not dagPath.hasFn(om.MFn.kMesh):
+                continue
+            dagPath.extendToShape()
+            key = cls.getInstanceKey(dagPath)
+            if component.isNull():
+                indices = range(om.MFnMesh(dagPath).numVertices)
+            else:
+                indices = om.MFnSingleIndexedComponent(component).getElements()
+            if key not in byShape:
+                order.append(key)
+                byShape[key] = ([], [])
+            byShape[key][0].append(dagPath)
+            byShape[key][1].append(np.array(indices, dtype=np.int64))
+
+        result = []
+        skippedPaths = 0
+        skippedPoints = 0
+        for key in order:
+            dagPaths, chunks = byShape[key]
+            instancePaths = cls.getUniquePaths(dagPaths)
+            indices = np.unique(np.concatenate(chunks))
+            result.append((cls.pickInstance(instancePaths), indices))
+            skippedPaths += len(instancePaths) - 1
+            skippedPoints += (len(instancePaths) - 1) * len(indices)
+        cls._LastInstanceDedup = {'shapes': len(result), 'skippedPaths': skippedPaths,
+                                  'skippedPoints': skippedPoints,
+                                  'points': sum(len(r[1]) for r in result)}
+        return result
+
+    @classmethod
+    def getInstanceKey(cls, dagPath):
+        """The same key for every instance (DAG path) of one node."""
+        return om.MDagPath.getAPathTo(dagPath.node()).fullPathName()
+
+    @classmethod
+    def getUniquePaths(cls, dagPaths):
+        seen = set()
+        unique = []
+        for dagPath in dagPaths:
+            if dagPath.fullPathName() not in seen:
+                seen.add(dagPath.fullPathName())
+                unique.append(dagPath)
+        return unique
+
+    @classmethod
+    def setInstanceSpace(cls, mode):
+        """
+        Which instance of an instanced shape (or transform) defines the
+        world space it is snapped in, when several are selected:
+
+        ``'first'``     the first one selected (default)
+        ``'last'``      the last one selected
+        ``'original'``  instance 0, the node's first parent, whether selected or not
+        """
+        if mode not in cls._InstanceSpaces:
+            raise ValueError('Instance space must be one of ' + ', '.join(cls._InstanceSpaces))
+        cls._InstanceSpace = mode
+
+    @classmethod
+    def pickInstance(cls, dagPaths):
+        """The path out of ``dagPaths`` (instances of one node, in selection order) to use."""
+        if cls._InstanceSpace == 'last':
+            return dagPaths[-1]
+        if cls._InstanceSpace == 'original' and dagPaths[0].isInstanced():
+            for dagPath in om.MDagPath.getAllPathsTo(dagPaths[0].node()):
+                if dagPath.instanceNumber() == 0:
+                    return dagPath
+        return dagPaths[0]
+
+    @classmethod
+    def reportInstanceDedup(cls, seconds):
+        """
+        Print how much instance merging saved on the last snap: the skipped
+        instances' points, at the per-point rate the snap itself ran at.
+        """
+        dedup = cls._LastInstanceDedup
+        if not dedup or not dedup['skippedPaths']:
+            return
+        perPoint = seconds / max(1, dedup['points'])
+        print(
+            'Grid Tools: snapped {shapes} instanced shape(s) once each, skipping {skippedPaths} '
+            'duplicate instance path(s) / {skippedPoints} points (~{saved:.3f}s saved)'.format(
+                saved=perPoint * dedup['skippedPoints'], **dedup)
+        )
+
+    @classmethod
+    def getMeshPoints(cls, dagPath, space=om.MSpace.kWorld):
+        """All points of a mesh as an (N, 3) float64 array, world space by default."""
+        points = om.MFnMesh(dagPath).getPoints(space)
+        return np.array(points, dtype=np.float64).reshape(-1, 4)[:, :3]
+
+    @classmethod
+    def getMovedMask(cls, points, snapped, snappableSpacing):
+        ## Points within a millionth of a grid step are already on the grid;
+        ## writing them again would only add float noise and undo data.
+        tolerance = abs(float(snappableSpacing)) * 1e-6
+        return np.any(np.abs(snapped - points) > tolerance, axis=1)
+
+    @classmethod
+    def makePointEdit(cls, dagPath, indices, oldWorld, newWorld):
+        """
+        Package a move of vertices ``indices`` from world positions
+        ``oldWorld`` to ``newWorld`` as ``(dagPath, indices, oldLocal, newLocal)``,
+        the packed, object-space form applyEdits and the snap command use.
+        """
+        inverse = np.array(list(dagPath.inclusiveMatrixInverse()), dtype=np.float64).reshape(4, 4)
+        ## Maya matrices act on row vectors; the translation cancels out in a delta.
+        localDeltas = (np.asarray(newWorld) - np.asarray(oldWorld)).dot(inverse[:3, :3])
+        indices = np.asarray(indices, dtype=np.int64)
+        oldLocal = cls.getMeshPoints(dagPath, om.MSpace.kObject)[indices]
+        return (dagPath, indices, oldLocal, oldLocal + localDeltas)
+
+    @classmethod
+    def makeTranslateEdits(cls, dagPaths, worldDeltas):
+        """
+        Package moves of transforms by world-space ``worldDeltas`` as
+        ``(dagPaths, oldTranslates, newTranslates)``, translates being the
+        transforms' own (parent space) translate values.
+        """
+        oldTranslates = np.zeros((len(dagPaths), 3))
+        newTranslates = np.zeros((len(dagPaths), 3))
+        for i, dagPath in enumerate(dagPaths):
+            oldTranslates[i] = list(om.MFnTransform(dagPath).translation(om.MSpace.kTransform))
+            parentInverse = np.array(list(dagPath.exclusiveMatrixInverse()), dtype=np.float64).reshape(4, 4)
+            newTranslates[i] = oldTranslates[i] + np.dot(worldDeltas[i], parentInverse[:3, :3])
+        return (list(dagPaths), oldTranslates, newTranslates)
+
+    @classmethod
+    def applyEdits(cls, pointEdits=None, translateEdits=None):
+        """
+        Apply point edits from makePointEdit and/or translate edits from
+        makeTranslateEdits as a single undo entry.
+
+        Goes through the t33dGridSnap command from t33d/plugins (see
+        getSnapCommand), which keeps only the moved indices / transforms and
+        their old and new values for undo.  When that plugin cannot be
+        loaded -- e.g. this 1shot is used without the t33d package -- the
+        same values are written with setAttr in one undo chunk.
+        """
+        pointEdits = pointEdits or []
+        if translateEdits is not None and not translateEdits[0]:
+            translateEdits = None
+        if not pointEdits and translateEdits is None:
+            return
+        cmdClass = cls.getSnapCommand()
+        if cmdClass is not None:
+            cmdClass._Pending = (pointEdits, translateEdits)
+            try:
+                getattr(cmds, cmdClass.kCommandName)()
+            finally:
+                cmdClass._Pending = None
+            return
+
+        cmds.undoInfo(openChunk=True, chunkName='T33d_GridTools_Snap')
+        try:
+            for dagPath, indices, oldLocal, newLocal in pointEdits:
+                cls.addTweaks(dagPath, indices, newLocal - oldLocal)
+            if translateEdits is not None:
+                dagPaths, oldTranslates, newTranslates = translateEdits
+                for dagPath, value in zip(dagPaths, newTranslates.tolist()):
+                    cmds.setAttr(dagPath.fullPathName() + '.translate', *value)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+    @classmethod
+    def getSnapCommand(cls):
+        """
+        The T33d_GridSnapCmd class of the t33dGridSnap plugin
+        (t33d/plugins/t33dGridSnap.py), loading the plugin by name the
+        first time.  None when the plugin cannot be found or loaded.
+
+        The plugin is never unloaded here: that would flush Maya's undo
+        queue.
+        """
+        try:
+            if not cmds.pluginInfo(cls._SnapPlugin, query=True, loaded=True):
+                cmds.loadPlugin(cls.findSnapPlugin(), quiet=True)
+        except RuntimeError:
+            traceback.print_exc()
+            return None
+        ## Maya imports a python plugin under its base name; that module's
+        ## class is the one whose doIt will run.
+        module = sys.modules.get(cls._SnapPlugin)
+        return getattr(module, 'T33d_GridSnapCmd', None)
+
+    @classmethod
+    def findSnapPlugin(cls):
+        """
+        What to pass to loadPlugin for t33dGridSnap: its name when it is on
+        MAYA_PLUG_IN_PATH, else its path in the t33d package on sys.path.
+        """
+        fileName = cls._SnapPlugin + '.py'
+        for folder in os.environ.get('MAYA_PLUG_IN_PATH', '').split(os.pathsep):
+            if folder and os.path.isfile(os.path.join(folder, fileName)):
+                return cls._SnapPlugin
+        for folder in sys.path:
+            path = os.path.join(folder or '.', 't33d', 'plugins', fileName)
+            if os.path.isfile(path):
+                return path
+        raise RuntimeError('{} not found on MAYA_PLUG_IN_PATH or in t33d/plugins on sys.path'.format(fileName))
+
+    @classmethod
+    def addTweaks(cls, dagPath, indices, localDeltas):
+        """
+        Add object-space ``localDeltas`` to the ``pnts`` tweaks of vertices
+        ``indices``.  Only those vertices are written: one undoable setAttr
+        per run of consecutive indices, so undo grows with the moved count.
+        """
+        if not len(indices):
+            return
+        order = np.argsort(indices, kind='stable')
+        indices = np.asarray(indices)[order]
+        localDeltas = np.asarray(localDeltas, dtype=np.float64)[order]
+        ## Split wherever the next index is not the previous one plus one.
+        runStarts = np.flatnonzero(np.diff(indices) != 1) + 1
+        for runIndices, runDeltas in zip(np.split(indices, runStarts), np.split(localDeltas, runStarts)):
+            first = int(runIndices[0])
+            last = int(runIndices[-1])
+            tweaks = cls.getTweaks(dagPath, first, last) + runDeltas
+            runPlug = '{}.pnts[{}:{}]'.format(dagPath.fullPathName(), first, last)
+            cmds.setAttr(runPlug, *tweaks.ravel().tolist())
+
+    @classmethod
+    def getTweaks(cls, dagPath, first, last):
+        """The shape's ``pnts`` tweaks ``first..last`` as an array; unset ones are zero."""
+        count = last - first + 1
+        values = cmds.getAttr('{}.pnts[{}:{}]'.format(dagPath.fullPathName(), first, last)) or []
+        if len(values) == count:
+            return np.array(values, dtype=np.float64).reshape(count, 3)
+        ## getAttr skipped unset elements, so place the existing ones by index.
+        tweaks = np.zeros((count, 3))
+        plug = om.MFnDependencyNode(dagPath.node()).findPlug('pnts', False)
+        for index in plug.getExistingArrayAttributeIndices():
+            if first <= index <= last:
+                element = plug.elementByLogicalIndex(index)
+                tweaks[index - first] = [element.child(c).asDouble() for c in range(3)]
+        return tweaks
 
 
     @classmethod
     def getGridSnappableSpacing(cls):
-        snappableSpacing = cmds.grid(query=True, spacing=True) / cmds.grid(query=True, divisions=True)
-        return snappableSpacing
+        return cls.getGridState().snappableSpacing
+
+
+    @classmethod
+    def getGridDef(cls):
+        """The grid snaps go to: the one set with setGridDef, else the Maya grid."""
+        if cls._GridDef is not None:
+            return cls._GridDef
+        return T33d_GridDef.fromMayaGrid()
+
+    @classmethod
+    def setGridDef(cls, gridDef):
+        """Make ``gridDef`` (a T33d_GridDef, or None for the Maya grid) the active grid."""
+        cls._GridDef = gridDef
 
+    @classmethod
+    def setGridFromSelected(cls, spacing=None, log=True):
+        """Use the first selected transform as the grid (see T33d_GridDef.fromTransform)."""
+        sel = cmds.ls(selection=True, long=True, transforms=True)
+        if not sel:
+            cmds.warning('Select a transform to define the grid.')
+            return None
+        cls.setGridDef(T33d_GridDef.fromTransform(sel[0], spacing=spacing))
+        if log:
+            cls.showMsg('Grid from ' + sel[0].split('|')[-1] +
+                        ', spacing ' + str([round(v, 6) for v in cls._GridDef.spacing.tolist()]))
+        return cls._GridDef
+
+    @classmethod
+    def useMayaGrid(cls, log=True):
+        cls.setGridDef(None)
+        if log:
+            cls.showMsg('Snapping to the Maya grid')
 
     @classmethod
     def putSelectedObjsOnGrid(cls):
-        ss = cls.getGridSnappableSpacing()
-        cls.putSelectedObjsOnSnappableSpacing(ss)
+        return cls.putObjsOnGridDef(cmds.ls(selection=True, long=True, transforms=True), cls.getGridDef())
 
 
     @classmethod
     def putSelectedObjsOnSnappableSpacing(cls, snappableSpacing):
-        oSel = cmds.ls(selection=True)
-        objs = oSel[:]
-        for obj in objs:
-            cls.putObjOnSnappableSpacing(obj, snappableSpacing)
-        cmds.select(oSel)
+        return cls.putObjsOnSnappableSpacing(cmds.ls(selection=True, long=True, transforms=True), snappableSpacing)
 
 
     @classmethod
     def putObjsOnSnappableSpacing(cls, objs, snappableSpacing):
-        oSel = cmds.ls(selection=True)
-        for obj in objs:
-            cls.putObjOnSnappableSpacing(obj, snappableSpacing)
+        return cls.putObjsOnGridDef(objs, T33d_GridDef(spacing=snappableSpacing))
 
 
     @classmethod
-    def putObjOnSnappableSpacing(cls, obj, snappableSpacing):
-        oSel = cmds.ls(selection=True)
-        destinationObj = obj
-        usedObj = obj
+    def putObjsOnGridDef(cls, objs, gridDef):
+        """
+        Move each of ``objs`` so its world rotate pivot lands on ``gridDef``.
+
+        All pivots are read through the API in one pass and snapped as
+        NumPy arrays, parents before their selected children (see
+        solveParentFirst); the moves go out as one undoable batch
+        (applyEdits).  The selection is not touched.
+        """
+        dagPaths = cls.getTransformPaths(objs)
+        if not dagPaths:
+            return 0
+        pivots = np.array(
+            [list(om.MFnTransform(p).rotatePivot(om.MSpace.kWorld))[:3] for p in dagPaths],
+            dtype=np.float64,
+        )
+
+        def solve(rows, inherited):
+            current = pivots[rows] + inherited
+            return gridDef.snap(current) - current
+
+        deltas = cls.solveParentFirst(dagPaths, solve)
+        moved = cls.getMovedMask(np.zeros_like(deltas), deltas, gridDef.minSpacing())
+        movedPaths = [p for p, m in zip(dagPaths, moved) if m]
+        cls.applyEdits(translateEdits=cls.makeTranslateEdits(movedPaths, deltas[moved]))
+        return len(movedPaths)
+
+    @classmethod
+    def getSelectedAncestors(cls, dagPaths):
+        """
+        For each of ``dagPaths``, the indices of the others whose node is
+        one of its DAG ancestors.
+        """
+        index = {cls.getInstanceKey(p): i for i, p in enumerate(dagPaths)}
+        ancestors = []
+        for dagPath in dagPaths:
+            found = []
+            walk = om.MDagPath(dagPath)
+            while walk.length() > 1:
+                walk.pop()
+                i = index.get(cls.getInstanceKey(walk))
+                if i is not None:
+                    found.append(i)
+            ancestors.append(found)
+        return ancestors
+
+    @classmethod
+    def solveParentFirst(cls, dagPaths, solve):
+        """
+        World deltas for ``dagPaths`` when some are ancestors of others.
+
+        Moving a transform carries its descendants along by the same world
+        delta, so deltas read from the scene up front would move a
+        selected child twice.  Paths are solved in levels, each after its
+        selected ancestors: ``solve(rows, inherited)`` gets an index array
+        and the world delta those paths already inherit, and returns their
+        own deltas from there.  Returns the own deltas, (N, 3).
+        """
+        ancestors = cls.getSelectedAncestors(dagPaths)
+        depth = np.array([len(a) for a in ancestors])
+        deltas = np.zeros((len(dagPaths), 3))
+        for level in np.unique(depth):
+            rows = np.flatnonzero(depth == level)
+            inherited = np.array([deltas[ancestors[i]].sum(axis=0) for i in rows])
+            deltas[rows] = solve(rows, inherited)
+        return deltas
 
-        cmds.select(destinationObj)
-        t = cmds.xform(query=True, rotatePivot=True, worldSpace=True)
-        vt = cls.onSnappableSpacingVec((t[0], t[1], t[2]), snappableSpacing)
 
-        cmds.select(usedObj)
-        cmds.move(vt[0], vt[1], vt[2], worldSpace=True, absolute=True, worldSpaceDistance=True)
+    _BoxAnchors = ('min', 'center', 'bottomCenter', 'max')
 
-        ## We compensate by getting the *object being moved*'s
-        ## pivot
-        t2 = cmds.xform(query=True, rotatePivot=True, worldSpace=True)
-        vt2 = (t2[0], t2[1], t2[2])
+    @classmethod
+    def alignSelectedObjsToGrid(cls, anchor='bottomCenter', axes=(True, True, True)):
+        return cls.alignObjsToGridDef(
+            cmds.ls(selection=True, long=True, transforms=True), cls.getGridDef(), anchor=anchor, axes=axes)
 
-        ## vExtra is the additional amount compensated
-        vExtra = (vt[0] - vt2[0], vt[1] - vt2[1], vt[2] - vt2[2])
+    @classmethod
+    def getGridBoxes(cls, dagPaths, gridDef):
+        """
+        ``(boxMin, boxMax)``, (N, 3) arrays: the bounding boxes of the
+        transforms ``dagPaths`` in ``gridDef``'s grid space.
+
+        MFnDagNode.boundingBox of a transform is already in its parent's
+        space, so its 8 corners go through the parent's world matrix
+        (exclusiveMatrix) and into the grid.  With the world grid this
+        matches ``xform -q -bb -ws`` on an object whose parents are not
+        rotated; a rotated object's box is the box around its transformed
+        local box.
+        """
+        corners = np.zeros((len(dagPaths), 8, 4))
+        matrices = np.zeros((len(dagPaths), 4, 4))
+        for i, dagPath in enumerate(dagPaths):
+            box = om.MFnDagNode(dagPath).boundingBox
+            lo = list(box.min)[:3]
+            hi = list(box.max)[:3]
+            corners[i, :, :3] = [(x, y, z) for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])]
+            matrices[i] = np.array(list(dagPath.exclusiveMatrix())).reshape(4, 4)
+        corners[:, :, 3] = 1.0
+        ## Row vectors: each object's parent-space corners times its parent's world matrix.
+        worldCorners = np.einsum('nij,njk->nik', corners, matrices)[:, :, :3]
+        gridCorners = gridDef.toGrid(worldCorners.reshape(-1, 3)).reshape(-1, 8, 3)
+        return gridCorners.min(axis=1), gridCorners.max(axis=1)
 
-        vDest = (vt[0] + vExtra[0], vt[1] + vExtra[1], vt[2] + vExtra[2])
+    @classmethod
+    def alignObjsToGridDef(cls, objs, gridDef, anchor='bottomCenter', axes=(True, True, True)):
+        """
+        Move each of ``objs`` so a point of its bounding box lands on
+        ``gridDef``: ``'min'`` corner, ``'center'``, ``'bottomCenter'``
+        (centre of the bottom face) or ``'max'`` corner.  ``axes`` are
+        per-axis (x, y, z) enable flags, in grid space: ``(False, True,
+        False)`` drops props onto the floor and leaves them where they are
+        otherwise.
+
+        Boxes are taken in grid space (see getGridBoxes), so "bottom"
+        follows a rotated grid.  All objects are read in one pass, the
+        offsets are computed as NumPy arrays, parents before their selected
+        children (see solveParentFirst), and the moves go out as one
+        undoable batch (applyEdits).
+        """
+        if anchor not in cls._BoxAnchors:
+            raise ValueError('anchor must be one of ' + ', '.join(cls._BoxAnchors))
+        dagPaths = cls.getTransformPaths(objs)
+        if not dagPaths:
+            return 0
+        boxMin, boxMax = cls.getGridBoxes(dagPaths, gridDef)
+
+        if anchor == 'min':
+            points = boxMin
+        elif anchor == 'max':
+            points = boxMax
+        else:
+            points = (boxMin + boxMax) * 0.5
+            if anchor == 'bottomCenter':
+                points[:, 1] = boxMin[:, 1]
 
-        vFinal = vDest
+        fixedAxes = ~np.array(axes, dtype=bool)
 
-        cmds.move(vFinal[0], vFinal[1], vFinal[2], worldSpace=True, absolute=True, worldSpaceDistance=True)
+        def solve(rows, inherited):
+            current = points[rows] + inherited.dot(gridDef.rotation.T)
+            gridDeltas = np.round(current / gridDef.spacing) * gridDef.spacing - current
+            gridDeltas[:, fixedAxes] = 0.0
+            return gridDeltas.dot(gridDef.rotation)
 
-        cmds.select(oSel)
+        worldDeltas = cls.solveParentFirst(dagPaths, solve)
+        moved = cls.getMovedMask(np.zeros_like(worldDeltas), worldDeltas, gridDef.minSpacing())
+        movedPaths = [p for p, m in zip(dagPaths, moved) if m]
+        cls.applyEdits(translateEdits=cls.makeTranslateEdits(movedPaths, worldDeltas[moved]))
+        return len(movedPaths)
+
+    @classmethod
+    def putObjOnSnappableSpacing(cls, obj, snappableSpacing):
+        cls.putObjsOnSnappableSpacing([obj], snappableSpacing)
+
+    @classmethod
+    def getTransformPaths(cls, objs):
+        """
+        One transform MDagPath per transform node in ``objs``; shapes
+        resolve to their transform.  An instanced transform has one
+        translate however many paths lead to it, so only one of its paths
+        is kept (see setInstanceSpace).
+        """
+        selList = om.MSelectionList()
+        for obj in objs:
+            try:
+                selList.add(obj)
+            except RuntimeError:
+                continue
+        order = []
+        byNode = {}
+        for i in range(selList.length()):
+            try:
+                dagPath = selList.getDagPath(i)
+            except TypeError:
+                continue    ## not a DAG node
+            if not dagPath.hasFn(om.MFn.kTransform):
+                dagPath.pop()
+            if not dagPath.hasFn(om.MFn.kTransform):
+                continue
+            key = cls.getInstanceKey(dagPath)
+            if key not in byNode:
+                order.append(key)
+                byNode[key] = []
+            byNode[key].append(dagPath)
+        return [cls.pickInstance(cls.getUniquePaths(byNode[key])) for key in order]
 
     @classmethod
     def onSnappableSpacing(cls, n, snappableSpacing):
@@ -263,6 +1011,261 @@ class T33d_GridToolsFuncs(object):
         z = cls.onSnappableSpacing(v[2], snappableSpacing)
         return (x, y, z)
 
+    @classmethod
+    def onSnappableSpacingArray(cls, points, snappableSpacing):
+        """onSnappableSpacing for a whole (N, 3) array at once."""
+        snappableSpacing = float(snappableSpacing)
+        return np.round(np.asarray(points, dtype=np.float64) / snappableSpacing) * snappableSpacing
+
+
+
+class T33d_NearestVertSnapFuncs(object):
+    """
+    Snap vertices to the nearest vertex of a set of target meshes, for
+    kitbashing.
+
+    Target points are read once through the API (T33d_GridToolsFuncs
+    helpers) into a spatial index: scipy's cKDTree when scipy is
+    available, else a voxel hash built with NumPy.  All selected source
+    points are then looked up in one vectorised query; both indexes give
+    the same answers.  The index is kept across snaps and only rebuilt
+    after a target (or one of its parents) is dirtied, which node dirty
+    callbacks record.
+    """
+
+    _Instance = None
+    _Targets = []           ## MDagPaths of the target mesh shapes
+    _Callbacks = []         ## dirty callback ids on the targets and their parents
+    _Index = None           ## (kind, index, points, requested cellSize), None when stale
+
+    @classmethod
+    def GetInstance(cls):
+        return cls._Instance
+
+    @classmethod
+    def setTargetsFromSelection(cls, log=True):
+        cls.setTargets(cmds.ls(selection=True, long=True, objectsOnly=True))
+        if log:
+            cls.gtFuncs().showMsg('Nearest-vert targets: {} mesh(es)'.format(len(cls._Targets)))
+
+    @classmethod
+    def setTargets(cls, objs):
+        """Use the meshes among ``objs`` (objects or shapes) as the snap targets."""
+        cls.clearTargets()
+        selList = om.MSelectionList()
+        for obj in objs:
+            selList.add(obj)
+        seen = set()
+        for i in range(selList.length()):
+            try:
+                dagPath = selList.getDagPath(i)
+            except TypeError:
+                continue
+            if not dagPath.hasFn(om.MFn.kMesh):
+                continue
+            dagPath.extendToShape()
+            if dagPath.fullPathName() in seen:
+                continue
+            seen.add(dagPath.fullPathName())
+            cls._Targets.append(dagPath)
+
+            ## Points change on the shape, placement on it or any parent.
+            walk = om.MDagPath(dagPath)
+            while walk.length() > 0:
+                cls._Callbacks.append(om.MNodeMessage.addNodeDirtyCallback(walk.node(), cls._onTargetDirty))
+                walk.pop()
+        cls._storeCallbackIds()
+
+    @classmethod
+    def clearTargets(cls):
+        """
+        Forget the targets and remove their dirty callbacks.  The callback
+        ids are also kept in a MEL global, which lasts for the Maya session,
+        so running this file again removes the previous run's callbacks too.
+        """
+        oldIds = maya.mel.eval('global string $gT33dNearestVertCallbacks[]; '
+                               '$temp = $gT33dNearestVertCallbacks;') or []
+        for callbackId in set(cls._Callbacks) | set(int(i) for i in oldIds):
+            try:
+                om.MMessage.removeCallback(callbackId)
+            except RuntimeError:
+                pass    ## already gone, e.g. with its node
+        cls._Callbacks = []
+        cls._Targets = []
+        cls._Index = None
+        cls._storeCallbackIds()
+
+    @classmethod
+    def _storeCallbackIds(cls):
+        ## Strings: MCallbackIds can overflow a MEL int.
+        maya.mel.eval('global string $gT33dNearestVertCallbacks[]; $gT33dNearestVertCallbacks = {' +
+                      ', '.join('"{}"'.format(i) for i in cls._Callbacks) + '};')
+
+    @classmethod
+    def _onTargetDirty(cls, *args):
+        cls._Index = None
+
+    @classmethod
+    def gtFuncs(cls):
+        return T33d_GridToolsFuncs
+
+    @classmethod
+    def getIndex(cls, cellSize=None):
+        """
+        The index over all target points, built when missing or stale.  The
+        voxel hash is also rebuilt when a different ``cellSize`` is asked for.
+        """
+        index = cls._Index
+        if index is not None and (index[0] == 'kdtree' or index[3] == cellSize):
+            return index
+        if not cls._Targets:
+            raise RuntimeError('Set the nearest-vert targets first.')
+        points = np.concatenate([cls.gtFuncs().getMeshPoints(p) for p in cls._Targets])
+        try:
+            from scipy.spatial import cKDTree
+            cls._Index = ('kdtree', cKDTree(points), points, None)
+        except ImportError:
+            voxelHash, sortedPoints = cls.buildVoxelHash(points, cellSize)
+            cls._Index = ('voxel', voxelHash, sortedPoints, cellSize)
+        return cls._Index
+
+    @classmethod
+    def buildVoxelHash(cls, points, cellSize=None):
+        """
+        Sort the points by voxel so each voxel is one contiguous run.
+        Returns ``((sortedKeys, origin, cellSize), sortedPoints)``.
+        Without a ``cellSize``, aim at a few points per voxel.
+        """
+        extent = points.max(axis=0) - points.min(axis=0)
+        if not cellSize:
+            volume = float(np.prod(np.maximum(extent, extent.max() * 1e-3 + 1e-9)))
+            cellSize = (volume * 4.0 / len(points)) ** (1.0 / 3.0)
+        ## Keep the voxel span inside the 21 bits per axis a key packs.
+        cellSize = max(float(cellSize), float(extent.max()) / ((1 << 21) - 4), 1e-9)
+        origin = points.min(axis=0) - cellSize     ## room for the -1 neighbour
+        keys = cls.voxelKeys(np.floor((points - origin) / cellSize).astype(np.int64))
+        order = np.argsort(keys, kind='stable')
+        return (keys[order], origin, cellSize), points[order]
+
+    @classmethod
+    def voxelKeys(cls, cells):
+        """Pack (N, 3) voxel coordinates into int64 keys; out of range gives -1."""
+        inRange = np.all((cells >= 0) & (cells < (1 << 21)), axis=1)
+        keys = (cells[:, 0] << 42) | (cells[:, 1] << 21) | cells[:, 2]
+        return np.where(inRange, keys, -1)
+
+    _VoxelRings = 2     ## voxel shells searched before falling back to brute force
+
+    @classmethod
+    def query(cls, points, maxDistance=None):
+        """
+        Nearest target point for each row of ``points``.  Returns
+        ``(nearest, distances)``; rows with nothing within ``maxDistance``
+        have an infinite distance, and there is no limit when it is None
+        or 0.
+
+        With the voxel hash, the voxels are searched in growing shells
+        around each point.  A point is done once its nearest candidate is
+        closer than the searched radius.  Points still open after
+        ``_VoxelRings`` shells, far from every target, are compared
+        against all target points.
+        """
+        kind, index, targetPoints, cellSize = cls.getIndex(maxDistance or None)
+        points = np.asarray(points, dtype=np.float64)
+
+        if kind == 'kdtree':
+            bound = maxDistance if maxDistance else np.inf
+            distances, found = index.query(points, k=1, distance_upper_bound=bound)
+            nearest = np.zeros_like(points)
+            ok = np.isfinite(distances)
+            nearest[ok] = targetPoints[found[ok]]
+            return nearest, distances
+
+        sortedKeys, origin, cellSize = index
+        cells = np.floor((points - origin) / cellSize).astype(np.int64)
+        best = np.full(len(points), np.inf)
+        bestAt = np.zeros(len(points), dtype=np.int64)
+        pending = np.arange(len(points))
+        for ring in range(cls._VoxelRings + 1):
+            for offset in cls.shellOffsets(ring):
+                keys = cls.voxelKeys(cells[pending] + offset)
+                lo = np.searchsorted(sortedKeys, keys, side='left')
+                hi = np.searchsorted(sortedKeys, keys, side='right')
+                counts = np.where(keys >= 0, hi - lo, 0)
+                total = int(counts.sum())
+                if not total:
+                    continue
+                ## Expand every (point, voxel run) pair into candidate rows.
+                queryRows = np.repeat(pending, counts)
+                starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+                candidates = starts + np.arange(total)
+                d2 = np.sum((targetPoints[candidates] - points[queryRows]) ** 2, axis=1)
+                np.minimum.at(best, queryRows, d2)
+                closest = d2 == best[queryRows]
+                bestAt[queryRows[closest]] = candidates[closest]
+            ## Every target within ring * cellSize has now been seen.
+            reach = ring * cellSize
+            if maxDistance and reach >= maxDistance:
+                pending = pending[:0]
+            pending = pending[best[pending] > reach * reach]
+            if not len(pending):
+                break
+
+        ## Bounded memory: about a million point-target pairs per chunk.
+        chunks = max(1, len(pending) * len(targetPoints) // (1 << 20))
+        for rows in np.array_split(pending, chunks):
+            d2 = np.sum((points[rows, None, :] - targetPoints[None, :, :]) ** 2, axis=2)
+            at = d2.argmin(axis=1)
+            best[rows] = d2[np.arange(len(rows)), at]
+            bestAt[rows] = at
+
+        distances = np.sqrt(best)
+        if maxDistance:
+            distances[distances > maxDistance] = np.inf
+        return targetPoints[bestAt], distances
+
+    @classmethod
+    def shellOffsets(cls, ring):
+        """Voxel offsets at Chebyshev distance ``ring``: the shell of a (2 * ring + 1)^3 cube."""
+        span = np.arange(-ring, ring + 1)
+        offsets = np.array(np.meshgrid(span, span, span)).T.reshape(-1, 3)
+        return offsets[np.abs(offsets).max(axis=1) == ring]
+
+    @classmethod
+    def snapSelectedVerts(cls, maxDistance=None, log=True):
+        """
+        Move the selected vertices onto their nearest target vertex, when
+        that is within ``maxDistance`` (no limit when None or 0, see query).
+        One undo entry, through T33d_GridToolsFuncs.applyEdits.
+        """
+        funcs = cls.gtFuncs()
+        started = time.time()
+        plan = [(dagPath, indices, funcs.getMeshPoints(dagPath)[indices])
+                for dagPath, indices in funcs.getSelectedMeshVerts()]
+        if not plan:
+            return 0
+        allPoints = np.concatenate([points for _, _, points in plan])
+        nearest, distances = cls.query(allPoints, maxDistance)
+
+        edits = []
+        start = 0
+        for dagPath, indices, points in plan:
+            stop = start + len(points)
+            targets = nearest[start:stop]
+            moved = np.isfinite(distances[start:stop]) & np.any(targets != points, axis=1)
+            if moved.any():
+                edits.append(funcs.makePointEdit(dagPath, indices[moved], points[moved], targets[moved]))
+            start = stop
+        funcs.applyEdits(pointEdits=edits)
+
+        movedCount = sum(len(edit[1]) for edit in edits)
+        if log:
+            msg = 'Snapped {} of {} verts to nearest target verts ({:.3f}s)'.format(
+                movedCount, len(allPoints), time.time() - started)
+            print(msg)
+            funcs.showMsg(msg)
+        return movedCount
+
 
 class T33d_GridToolsUi(object):
 
@@ -279,15 +1282,13 @@ class T33d_GridToolsUi(object):
             "with the button."
         )
         self.gtFuncs = T33d_GridToolsFuncs
+        self.nvFuncs = T33d_NearestVertSnapFuncs
 
-        initialMultiplier = 1.0
+        self.gridState = self.gtFuncs.getGridState()
 
-        initialSpacing = (
-            (cmds.grid(query=True, spacing=True) / cmds.grid(query=True, divisions=True))
-            /
-            initialMultiplier
-        )
-        initialWholeSize = cmds.grid(query=True, size=True) / initialMultiplier
+        initialMultiplier = self.gridState.multiplier
+        initialSpacing = self.gridState.snappableSpacing / initialMultiplier
+        initialWholeSize = self.gridState.wholeSize / initialMultiplier
         self.widgets = {}
 
         win = self.widgets['parentWidget'] = cmds.window(
@@ -389,6 +1390,29 @@ class T33d_GridToolsUi(object):
             ## the checkbox has a built in label, but that shows on wrong side
         cmds.setParent(col)
 
+        instanceRow = self.widgets['instanceRow'] = cmds.rowLayout(numberOfColumns=2, parent=col)
+        self.widgets['instanceRowText'] = cmds.text(label='Instances snap in space of:', parent=instanceRow)
+        self.widgets['instanceOptionMenu'] = cmds.optionMenu(
+            parent=instanceRow,
+            annotation=(
+                "When several instances of one shape are selected, its points are\n" +
+                "snapped once, in the world space of this instance."
+            ),
+            changeCommand=lambda x: self.gtFuncs.setInstanceSpace(self.getInstanceSpaceFromUi()),
+        )
+        for label in ('First Selected', 'Last Selected', 'Original (Instance 0)'):
+            cmds.menuItem(label=label, parent=self.widgets['instanceOptionMenu'])
+        cmds.optionMenu(
+            self.widgets['instanceOptionMenu'], edit=True,
+            select=self.gtFuncs._InstanceSpaces.index(self.gtFuncs._InstanceSpace) + 1,
+        )
+        cmds.setParent(col)
+
+        previewRow = self.widgets['previewRow'] = cmds.rowLayout(numberOfColumns=2, parent=col)
+        self.widgets['previewRowText'] = cmds.text(label='Preview selects affected verts:', parent=previewRow)
+        self.widgets['previewSelectCheckBox'] = cmds.checkBox(value=False, label=' ', parent=previewRow)
+        cmds.setParent(col)
+
         self.widgets['spacerBlankText'] = cmds.text(label='  ', parent=col)
 
         self.widgets['snapButton'] = cmds.button(
@@ -401,8 +1425,80 @@ class T33d_GridToolsUi(object):
             command=lambda x: self.gtFuncs.snapVertsToGrid(),
             parent=col
         )
+        self.widgets['previewButton'] = cmds.button(
+            label="Preview Vert Snap (Moves Nothing)",
+            annotation=(
+                "Report how far the selected verts would move when snapped,\n" +
+                "and how many would collapse onto the same grid point."
+            ),
+            command=lambda x: self.gtFuncs.previewSnapVerts(
+                selectMoved=self.getPreviewSelectFromUi(),
+                selectCollapsed=self.getPreviewSelectFromUi(),
+            ),
+            parent=col
+        )
+        self.widgets['gridFromSelectedButton'] = cmds.button(
+            label="Use Selected Transform As Grid",
+            annotation=(
+                "Snap to a grid on the selected transform instead of the Maya grid:\n" +
+                "its pivot is the origin, its axes the grid axes,\n" +
+                "and its scale on each axis the spacing on that axis."
+            ),
+            command=lambda x: self.gtFuncs.setGridFromSelected(),
+            parent=col
+        )
+        self.widgets['useMayaGridButton'] = cmds.button(
+            label="Use Maya Grid",
+            command=lambda x: self.gtFuncs.useMayaGrid(),
+            parent=col
+        )
+        alignRow = self.widgets['alignRow'] = cmds.rowLayout(numberOfColumns=2, parent=col)
+        self.widgets['alignRowText'] = cmds.text(label='Align anchor:', parent=alignRow)
+        self.widgets['alignAnchorOptionMenu'] = cmds.optionMenu(parent=alignRow)
+        for label in ('Min', 'Center', 'Bottom Center', 'Max'):
+            cmds.menuItem(label=label, parent=self.widgets['alignAnchorOptionMenu'])
+        cmds.optionMenu(self.widgets['alignAnchorOptionMenu'], edit=True, select=3)
+        cmds.setParent(col)
+        alignAxesRow = self.widgets['alignAxesRow'] = cmds.rowLayout(numberOfColumns=4, parent=col)
+        self.widgets['alignAxesRowText'] = cmds.text(label='Align axes:', parent=alignAxesRow)
+        for axis in 'XYZ':
+            self.widgets['align' + axis + 'CheckBox'] = cmds.checkBox(value=True, label=axis, parent=alignAxesRow)
+        cmds.setParent(col)
+        self.widgets['alignButton'] = cmds.button(
+            label="Align Selected Objs' Bounding Boxes To Grid",
+            annotation=(
+                "Snap the chosen point of each selected object's bounding box to the grid,\n" +
+                "only on the ticked axes (e.g. just Y with Bottom Center to drop props on a floor)."
+            ),
+            command=lambda x: self.gtFuncs.alignSelectedObjsToGrid(
+                anchor=self.getAlignAnchorFromUi(),
+                axes=self.getAlignAxesFromUi(),
+            ),
+            parent=col
+        )
         self.widgets['snapText'] = cmds.text(label='  ', parent=col)
 
+        self.widgets['nearestTargetsButton'] = cmds.button(
+            label="Set Nearest-Vert Targets From Selection",
+            command=lambda x: self.nvFuncs.setTargetsFromSelection(),
+            parent=col
+        )
+        nearestRow = self.widgets['nearestRow'] = cmds.rowLayout(numberOfColumns=2, parent=col)
+        self.widgets['nearestRowText'] = cmds.text(label='Max Distance:', parent=nearestRow)
+        self.widgets['nearestMaxDistanceFloatField'] = cmds.floatField(
+            value=0.0,
+            minValue=0.0,
+            parent=nearestRow,
+            annotation="Verts further than this from every target vert stay put. 0 means no limit.",
+        )
+        cmds.setParent(col)
+        self.widgets['nearestSnapButton'] = cmds.button(
+            label="Snap Selected Verts To Nearest Target Vert",
+            command=lambda x: self.nvFuncs.snapSelectedVerts(maxDistance=self.getNearestMaxDistanceFromUi()),
+            parent=col
+        )
+        self.widgets['nearestText'] = cmds.text(label='  ', parent=col)
+
         self.widgets['growButton'] = cmds.button(
             label="Grow",
             command=lambda x: self.growWithWarning(log=True),
@@ -414,21 +1510,31 @@ class T33d_GridToolsUi(object):
             parent=col
         )
 
+        ## Follow grid changes from hotkeys, other windows and Maya's Grid Options
+        self.gridState.addListener(self.onGridStateChanged)
+        cmds.scriptJob(
+            uiDeleted=(win, lambda: self.gridState.removeListener(self.onGridStateChanged)),
+        )
+
         # Show Window
         cmds.showWindow(win)
-        cmds.window(win, edit=True, width=200, height=330)
+        cmds.window(win, edit=True, width=200, height=640)
 
 
     def resetToMayaDefault(self):
-        self.gtFuncs.reset(setManip=True)
         ## Maya default size is 5 with 5 divisions, results in one
-        ## since this tool doesn't use divisions
-        spacing = cmds.grid(query=True, spacing=True) / cmds.grid(query=True, divisions=True)
-        wholeSize = cmds.grid(query=True, size=True)
+        ## since this tool doesn't use divisions.
+        ## The fields follow through onGridStateChanged.
+        self.gtFuncs.reset(setManip=True)
+
 
-        cmds.floatField(self.widgets['spacingFloatField'], edit=True, value=spacing)
-        cmds.floatField(self.widgets['multiplierFloatField'], edit=True, value=1.0)
-        cmds.floatField(self.widgets['wholeSizeFloatField'], edit=True, value=wholeSize)
+    def onGridStateChanged(self, state):
+        if not cmds.window(self.widgets['parentWidget'], exists=True):
+            return
+        multiplier = state.multiplier or 1.0
+        cmds.floatField(self.widgets['multiplierFloatField'], edit=True, value=multiplier)
+        cmds.floatField(self.widgets['spacingFloatField'], edit=True, value=state.snappableSpacing / multiplier)
+        cmds.floatField(self.widgets['wholeSizeFloatField'], edit=True, value=state.wholeSize / multiplier)
 
 
     def getMultiplierFromUi(self):
@@ -443,6 +1549,25 @@ class T33d_GridToolsUi(object):
     def getSetManipFromUi(self):
         return cmds.checkBox(self.widgets['setManipCheckBox'], query=True, value=True)
 
+    def getInstanceSpaceFromUi(self):
+        index = cmds.optionMenu(self.widgets['instanceOptionMenu'], query=True, select=True)
+        return self.gtFuncs._InstanceSpaces[index - 1]
+
+    def getAlignAnchorFromUi(self):
+        index = cmds.optionMenu(self.widgets['alignAnchorOptionMenu'], query=True, select=True)
+        return self.gtFuncs._BoxAnchors[index - 1]
+
+    def getAlignAxesFromUi(self):
+        return tuple(
+            cmds.checkBox(self.widgets['align' + axis + 'CheckBox'], query=True, value=True) for axis in 'XYZ'
+        )
+
+    def getNearestMaxDistanceFromUi(self):
+        return cmds.floatField(self.widgets['nearestMaxDistanceFloatField'], query=True, value=True)
+
+    def getPreviewSelectFromUi(self):
+        return cmds.checkBox(self.widgets['previewSelectCheckBox'], query=True, value=True)
+
     def getExponentFromUi(self):
         return cmds.intField(self.widgets['exponentIntField'], query=True, value=True)
 
@@ -450,38 +1575,23 @@ class T33d_GridToolsUi(object):
         ## This grow function will increase total size if required.
         self.applyUiNumbers()
 
-        exponent = self.getExponentFromUi()
-        ## Scale the UI spacing field up by the exponent
-        currentSpacing = cmds.floatField(self.widgets['spacingFloatField'], query=True, value=True)
-        cmds.floatField(self.widgets['spacingFloatField'], edit=True, value=float(exponent) * currentSpacing)
-        ## Scale the actual grid spacing by the exponent
-        self.gtFuncs.grow(setManip=True, log=log, exponent=exponent)
+        ## Scale the actual grid spacing by the exponent;
+        ## the UI spacing field follows through onGridStateChanged
+        self.gtFuncs.grow(setManip=True, log=log, exponent=self.getExponentFromUi())
 
         ## Check to make sure the spacing isn't too big
         ## if the grid spacing is too large, adjust the whole grid size to accomadate
-        spacingOfActualGrid = cmds.grid(query=True, spacing=True) / cmds.grid(query=True, divisions=True)
-        wholeSizeOfActualGrid = cmds.grid(query=True, size=True)
-        multiplier = self.getMultiplierFromUi()
-
-        if spacingOfActualGrid > wholeSizeOfActualGrid:
-            spacing = self.getSpacingFromUi()
-            newWholeSizeNoMultiplier = spacing
-            newWholeSizeWithMultiplier = newWholeSizeNoMultiplier * self.getMultiplierFromUi()
-            cmds.grid(size=newWholeSizeWithMultiplier)
-            cmds.floatField(self.widgets['wholeSizeFloatField'], edit=True, value=newWholeSizeNoMultiplier)
+        state = self.gridState
+        if state.snappableSpacing > state.wholeSize:
+            state.set(wholeSize=state.snappableSpacing)
 
 
     def shrinkWithWarning(self, log=False):
         self.applyUiNumbers()
 
-        exponent = self.getExponentFromUi()
-        ## Scale the UI spacing field down by the exponent
-        currentSpacing = cmds.floatField(self.widgets['spacingFloatField'], query=True, value=True)
-        cmds.floatField(self.widgets['spacingFloatField'], edit=True, value=currentSpacing / float(exponent))
-
-        self.gtFuncs.shrink(setManip=True, log=log, exponent=exponent)
-
-        ## Half the actual Maya size
+        ## Scale the actual grid spacing down by the exponent;
+        ## the UI spacing field follows through onGridStateChanged
+        self.gtFuncs.shrink(setManip=True, log=log, exponent=self.getExponentFromUi())
 
     def onChangedField(self):
         self.applyUiNumbers()
@@ -508,6 +1618,12 @@ if T33d_GridTools_CmdPrefix == '__main__':
 else:
     T33d_GridTools_CmdPrefix = T33d_GridTools_CmdPrefix + '.T33d_GridToolsFuncs'
 
+T33d_NearestVertSnap_CmdPrefix = __name__
+if T33d_NearestVertSnap_CmdPrefix == '__main__':
+    T33d_NearestVertSnap_CmdPrefix = "T33d_NearestVertSnapFuncs"
+else:
+    T33d_NearestVertSnap_CmdPrefix = T33d_NearestVertSnap_CmdPrefix + '.T33d_NearestVertSnapFuncs'
+
 runTimeCommands = {
     'T33d_GridTools_Grow':
         T33d_GridTools_CmdPrefix + ".grow(log=True)",
@@ -517,6 +1633,18 @@ runTimeCommands = {
         T33d_GridTools_CmdPrefix + ".putSelectedObjsOnGrid()",
     'T33d_GridTools_SnapVertsToGrid':
         T33d_GridTools_CmdPrefix + ".snapVertsToGrid()",
+    'T33d_GridTools_DropObjsOnGrid':
+        T33d_GridTools_CmdPrefix + ".alignSelectedObjsToGrid(anchor='bottomCenter', axes=(False, True, False))",
+    'T33d_GridTools_PreviewSnapVerts':
+        T33d_GridTools_CmdPrefix + ".previewSnapVerts()",
+    'T33d_GridTools_GridFromSelected':
+        T33d_GridTools_CmdPrefix + ".setGridFromSelected()",
+    'T33d_GridTools_UseMayaGrid':
+        T33d_GridTools_CmdPrefix + ".useMayaGrid()",
+    'T33d_GridTools_SetNearestVertTargets':
+        T33d_NearestVertSnap_CmdPrefix + ".setTargetsFromSelection()",
+    'T33d_GridTools_SnapVertsToNearestVert':
+        T33d_NearestVertSnap_CmdPrefix + ".snapSelectedVerts()",
 }
 for k, v in runTimeCommands.items():
     if cmds.runTimeCommand(k, query=True, exists=True):
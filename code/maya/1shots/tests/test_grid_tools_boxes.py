@@ -0,0 +1,46 @@
+"""
+Checks for t33d_1shot_grid_tools that need a Maya session; skipped without
+one.  Run them with mayapy:
+
+    mayapy -m pytest code/maya/1shots/tests
+"""
+
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+standalone = pytest.importorskip('maya.standalone')
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 't33d_1shot_grid_tools.py')
+
+
+@pytest.fixture(scope='module')
+def gridTools():
+    standalone.initialize(name='python')
+    spec = importlib.util.spec_from_file_location('t33d_1shot_grid_tools', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def getDagPath(name):
+    import maya.api.OpenMaya as om
+    return om.MSelectionList().add(name).getDagPath(0)
+
+
+@pytest.mark.parametrize('parentTranslate', [None, (1.0, -4.0, 2.0)])
+def test_grid_boxes_match_xform_ws(gridTools, parentTranslate):
+    import maya.cmds as cmds
+    cmds.file(new=True, force=True)
+    cube = cmds.polyCube(width=2, height=1, depth=3)[0]
+    if parentTranslate is not None:
+        parent = cmds.group(empty=True)
+        cmds.xform(parent, translation=parentTranslate)
+        cube = cmds.parent(cube, parent)[0]
+    cmds.xform(cube, translation=(5.0, 2.0, -3.0), rotation=(30.0, 45.0, 10.0))
+
+    boxMin, boxMax = gridTools.T33d_GridToolsFuncs.getGridBoxes([getDagPath(cube)], gridTools.T33d_GridDef())
+    expected = cmds.xform(cube, query=True, boundingBox=True, worldSpace=True)
+    np.testing.assert_allclose(np.concatenate([boxMin[0], boxMax[0]]), expected, atol=1e-6)
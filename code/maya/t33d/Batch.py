@@ -0,0 +1,375 @@
+"""
+Batch -- run one function over many Maya scene files in parallel.
+
+Validation and export jobs run the same function over hundreds of .ma/.mb
+files.  Doing that one scene at a time in the GUI (like the old 'fbx'
+hotstring) is slow and ties up the artist's Maya.  This module fans the
+scenes out over a bounded pool of headless mayapy worker processes and
+streams the results back as each scene finishes.
+
+Example, from a notebook cell or the Script Editor::
+
+    import t33d.Batch
+
+    def countMeshes(scenePath):
+        import maya.cmds as cmds
+        return len(cmds.ls(type='mesh'))
+
+    for r in t33d.Batch.mapScenes(countMeshes, paths, workers=6, timeout=300):
+        print(r.path, r.value if r.ok else r.error)
+
+    total, failures = t33d.Batch.reduceScenes(
+        countMeshes, paths, lambda acc, n: acc + n, initial=0)
+
+The function
+------------
+It is called as ``func(scenePath)`` with the scene already open, and its
+return value must be picklable.  Functions from importable modules are sent
+by reference.  Functions defined in ``__main__`` (a notebook cell, the
+Script Editor) are sent as their compiled code, so they must not rely on
+closures or on globals the worker does not have -- do imports inside the
+function, as in the example above.
+
+Workers
+-------
+Each worker is ``mayapy BatchWorker.py``: it initialises maya.standalone
+once, then opens scene after scene.  Workers talk to this process over a
+localhost socket (their stdout is left alone, since Maya and user code
+print to it freely).  A scene that exceeds ``timeout`` gets its worker
+killed and replaced; failed scenes are retried up to ``retries`` times.
+"""
+
+import marshal
+import os
+import pickle
+import queue
+import secrets
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import types
+
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BatchWorker.py')
+
+
+class SceneResult(object):
+    """The outcome of running the batch function on one scene."""
+
+    def __init__(self, index, path, ok, value=None, error=None, attempts=1, seconds=0.0):
+        self.index    = index      ## position in the submitted list
+        self.path     = path
+        self.ok       = ok
+        self.value    = value      ## the function's return value when ok
+        self.error    = error      ## traceback / reason text when not ok
+        self.attempts = attempts
+        self.seconds  = seconds    ## time for the final attempt, open included
+
+    def __repr__(self):
+        state = 'ok' if self.ok else 'FAILED'
+        return '<SceneResult #{} {} {} ({} attempt(s), {:.2f}s)>'.format(
+            self.index, self.path, state, self.attempts, self.seconds)
+
+
+class BatchWorkerError(RuntimeError):
+    """A worker died, timed out or could not be started."""
+
+
+def defaultMayapy():
+    """
+    Best guess at mayapy: inside Maya or mayapy, it sits next to
+    sys.executable (maya.exe / maya.bin / mayapy) in Maya's bin folder.
+    """
+    exe = 'mayapy.exe' if sys.platform == 'win32' else 'mayapy'
+    candidate = os.path.join(os.path.dirname(sys.executable), exe)
+    return candidate if os.path.exists(candidate) else exe
+
+
+def _packFunction(func):
+    """Describe ``func`` so a worker can rebuild it."""
+    module = getattr(func, '__module__', None)
+    if module and module != '__main__':
+        return {'kind': 'ref', 'module': module, 'qualname': func.__qualname__}
+    if func.__closure__:
+        raise ValueError(
+            'Batch functions defined in __main__ cannot use closures; move it '
+            'to a module or pass values through the scene path instead.')
+    return {'kind': 'code', 'name': func.__name__, 'code': marshal.dumps(func.__code__),
+            'defaults': func.__defaults__}
+
+
+def _loadFunction(spec, cache):
+    """Rebuild a function from _packFunction()'s description (in a worker)."""
+    key = (spec['kind'], spec.get('module'), spec.get('qualname'), spec.get('code'))
+    if key in cache:
+        return cache[key]
+    if spec['kind'] == 'ref':
+        import importlib
+        obj = importlib.import_module(spec['module'])
+        for part in spec['qualname'].split('.'):
+            obj = getattr(obj, part)
+    else:
+        namespace = {'__name__': '__batch__', '__builtins__': __builtins__}
+        obj = types.FunctionType(marshal.loads(spec['code']), namespace,
+                                 spec['name'], spec.get('defaults'))
+    cache[key] = obj
+    return obj
+
+
+# ---------------------------------------------------------------------------
+# Framing: 8-byte big-endian length + pickle
+# ---------------------------------------------------------------------------
+
+def sendFrame(sock, obj):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(struct.pack('>Q', len(data)) + data)
+
+
+def _recvExact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(min(size - len(buf), 1 << 20))
+        if not chunk:
+            raise BatchWorkerError('worker connection closed')
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def recvFrame(sock):
+    size, = struct.unpack('>Q', _recvExact(sock, 8))
+    return pickle.loads(_recvExact(sock, size))
+
+
+# ---------------------------------------------------------------------------
+# One worker process
+# ---------------------------------------------------------------------------
+
+class _Worker(object):
+
+    def __init__(self, mayapy, plugins, startupTimeout):
+        token    = secrets.token_hex(16)
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        listener.settimeout(startupTimeout)
+        port = listener.getsockname()[1]
+
+        argv = [mayapy, WORKER_SCRIPT, '--port', str(port), '--token', token]
+        for plugin in plugins:
+            argv += ['--plugin', plugin]
+        try:
+            self.proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL)
+        except OSError:
+            listener.close()
+            raise
+        try:
+            self.sock, _ = listener.accept()
+        except socket.timeout:
+            self.kill()
+            raise BatchWorkerError(
+                'mayapy worker did not connect within {}s'.format(startupTimeout))
+        finally:
+            listener.close()
+
+        ## Any failure from here on must not leave the mayapy behind.
+        try:
+            self.sock.settimeout(startupTimeout)
+            hello = recvFrame(self.sock)
+        except socket.timeout:
+            self.kill()
+            raise BatchWorkerError(
+                'mayapy worker did not finish starting within {}s'.format(startupTimeout))
+        except Exception as exc:
+            self.kill()
+            raise BatchWorkerError('mayapy worker failed during startup: {}'.format(exc))
+        if not isinstance(hello, dict) or hello.get('token') != token:
+            self.kill()
+            raise BatchWorkerError('unexpected process connected to the batch listener')
+        if hello.get('error'):
+            self.kill()
+            raise BatchWorkerError('worker failed to start:\n' + hello['error'])
+        self.initSeconds = hello.get('initSeconds')
+
+    def run(self, job, timeout):
+        self.sock.settimeout(timeout)
+        sendFrame(self.sock, job)
+        return recvFrame(self.sock)
+
+    def close(self):
+        try:
+            sendFrame(self.sock, None)     ## None = exit cleanly
+            self.proc.wait(10)
+        except Exception:
+            self.kill()
+        finally:
+            self.sock.close()
+
+    def kill(self):
+        try:
+            self.proc.kill()
+            self.proc.wait(10)
+        except Exception:
+            pass
+        sock = getattr(self, 'sock', None)
+        if sock is not None:
+            sock.close()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def mapScenes(func, scenePaths, workers=4, retries=0, timeout=None, ordered=False,
+              mayapy=None, plugins=(), startupTimeout=300.0):
+    """
+    Run ``func(scenePath)`` on every scene in its own open-scene context and
+    yield a SceneResult per scene as soon as it is done.
+
+    Parameters
+    ----------
+    func : callable
+        Called with the scene path after the scene is opened.
+    scenePaths : list[str]
+        .ma / .mb files.
+    workers : int
+        Maximum number of mayapy processes running at once.
+    retries : int
+        Extra attempts for a scene that raised, timed out, or crashed its worker.
+    timeout : float or None
+        Seconds allowed per scene (open + func).  The worker is killed and
+        replaced when it is exceeded.
+    ordered : bool
+        Yield in submission order instead of completion order.  Results that
+        finish early are held back until their turn.
+    mayapy : str or None
+        mayapy executable (default: defaultMayapy()).
+    plugins : list[str]
+        Plugins each worker loads before its first scene.
+    """
+    funcSpec = _packFunction(func)
+    mayapy   = mayapy or defaultMayapy()
+    paths    = list(scenePaths)
+    workers  = max(1, min(int(workers), len(paths) or 1))
+
+    jobs    = queue.Queue()
+    results = queue.Queue()
+    for index, path in enumerate(paths):
+        jobs.put((index, path))
+    for _ in range(workers):
+        jobs.put(None)
+
+    ## Set when the caller stops iterating early: slots stop taking scenes
+    ## and the workers still busy with one are killed (see the finally below).
+    stop        = threading.Event()
+    liveWorkers = set()
+    liveLock    = threading.Lock()
+
+    def slotLoop():
+        worker = None
+        try:
+            while not stop.is_set():
+                item = jobs.get()
+                if item is None:
+                    return
+                index, path = item
+                attempt = 0
+                while not stop.is_set():
+                    attempt += 1
+                    started = time.perf_counter()
+                    try:
+                        if worker is None:
+                            worker = _Worker(mayapy, plugins, startupTimeout)
+                            with liveLock:
+                                liveWorkers.add(worker)
+                            if stop.is_set():
+                                break
+                        reply = worker.run({'path': path, 'func': funcSpec}, timeout)
+                        ok, value, error = reply['ok'], reply.get('value'), reply.get('error')
+                    except socket.timeout:
+                        ok, value, error = False, None, 'timed out after {}s'.format(timeout)
+                        if worker is not None:
+                            worker.kill()
+                            worker = None
+                    except (BatchWorkerError, OSError, EOFError) as exc:
+                        ok, value, error = False, None, 'worker failure: {}'.format(exc)
+                        if worker is not None:
+                            worker.kill()
+                            worker = None
+                    except Exception as exc:
+                        ## e.g. a reply that does not unpickle here.  The
+                        ## scene still gets its result; the worker is suspect.
+                        ok, value, error = False, None, 'batch failure: {!r}'.format(exc)
+                        if worker is not None:
+                            worker.kill()
+                            worker = None
+                    if ok or attempt > retries:
+                        break
+                if stop.is_set():
+                    return
+                results.put(SceneResult(index, path, ok, value, error, attempt,
+                                        time.perf_counter() - started))
+        finally:
+            if worker is not None:
+                worker.close()
+            results.put(None)   ## one sentinel per slot
+
+    threads = [threading.Thread(target=slotLoop, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+
+    finishedSlots = 0
+    pending       = {}
+    nextIndex     = 0
+    try:
+        while finishedSlots < workers:
+            result = results.get()
+            if result is None:
+                finishedSlots += 1
+                continue
+            if not ordered:
+                yield result
+                continue
+            pending[result.index] = result
+            while nextIndex in pending:
+                yield pending.pop(nextIndex)
+                nextIndex += 1
+        ## Only reached with a gap if a slot thread died; do not drop the rest.
+        for index in sorted(pending):
+            yield pending[index]
+    finally:
+        ## Also runs when the caller breaks out of the loop (generator close).
+        stop.set()
+        try:
+            while True:
+                jobs.get_nowait()
+        except queue.Empty:
+            pass
+        for _ in range(workers):
+            jobs.put(None)
+        with liveLock:
+            busy = list(liveWorkers)
+        for worker in busy:
+            worker.kill()
+
+
+def reduceScenes(func, scenePaths, reducer, initial=None, **kwargs):
+    """
+    mapScenes() then fold the successful values with ``reducer(acc, value)``.
+
+    Values are folded in submission order so the result is deterministic.
+    Returns ``(accumulated, failures)`` where ``failures`` is the list of
+    SceneResults that did not succeed.  Extra keyword arguments go to
+    mapScenes().
+    """
+    kwargs['ordered'] = True
+    acc      = initial
+    failures = []
+    for result in mapScenes(func, scenePaths, **kwargs):
+        if result.ok:
+            acc = reducer(acc, result.value)
+        else:
+            failures.append(result)
+    return acc, failures
@@ -0,0 +1,79 @@
+"""
+BatchWorker -- the mayapy side of t33d.Batch.
+
+Started by Batch.mapScenes() as ``mayapy BatchWorker.py --port N --token T``;
+not meant to be run by hand.  It connects back to the parent, initialises
+maya.standalone once, then loops:
+
+    receive {'path', 'func'} -> open the scene -> func(path) -> send the reply
+
+until it receives None.  After each scene it switches to a new empty scene so
+memory from the previous file is released before the next one opens.
+"""
+
+import argparse
+import os
+import socket
+import sys
+import time
+import traceback
+
+## Run by file path, so this folder is sys.path[0] and the framing helpers
+## can be shared with Batch.py without importing the whole t33d package.
+from Batch import _loadFunction, recvFrame, sendFrame
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--token', required=True)
+    parser.add_argument('--plugin', action='append', default=[])
+    args = parser.parse_args()
+
+    sock = socket.create_connection(('127.0.0.1', args.port))
+
+    started = time.perf_counter()
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+        import maya.cmds as cmds
+        for plugin in args.plugin:
+            cmds.loadPlugin(plugin, quiet=True)
+    except BaseException:
+        sendFrame(sock, {'token': args.token, 'error': traceback.format_exc()})
+        sock.close()
+        return 1
+    sendFrame(sock, {'token': args.token, 'pid': os.getpid(),
+                     'initSeconds': time.perf_counter() - started})
+
+    functions = {}
+    while True:
+        job = recvFrame(sock)
+        if job is None:
+            break
+        reply = {'ok': False}
+        try:
+            func = _loadFunction(job['func'], functions)
+            cmds.file(job['path'], open=True, force=True)
+            value = func(job['path'])
+            try:
+                sendFrame(sock, {'ok': True, 'value': value})
+                reply = None
+            except Exception:
+                reply['error'] = ('result could not be pickled:\n' + traceback.format_exc())
+        except BaseException:
+            reply['error'] = traceback.format_exc()
+        if reply is not None:
+            sendFrame(sock, reply)
+        try:
+            cmds.file(new=True, force=True)
+        except Exception:
+            pass
+
+    sock.close()
+    maya.standalone.uninitialize()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
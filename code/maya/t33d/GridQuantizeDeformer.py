@@ -0,0 +1,196 @@
+"""
+GridQuantizeDeformer -- a live "snap to grid" deformer node.
+
+Grid Tools' snaps are one-shot edits: change the geometry upstream and it
+has to be snapped again.  This deformer keeps the snap in the history
+instead, so the points stay quantised as the input changes.
+
+Example, from a tool or the Script Editor::
+
+    import t33d.GridQuantizeDeformer as gqd
+
+    node = gqd.create('floorTile_geo', spacing=(2.0, 0.25, 2.0))
+    cmds.setAttr(node + '.envelope', 0.5)              ## half way to the grid
+
+    gqd.create('rock_geo.vtx[0:99]')                    ## only these points
+
+Attributes
+----------
+``spacingX`` / ``spacingY`` / ``spacingZ``
+    Grid step per axis (default 1.0).
+``worldSpace``
+    Quantise in world space (default) or in the geometry's object space.
+``envelope``
+    The standard deformer envelope: 0 leaves the points alone, 1 puts them
+    on the grid, values in between blend linearly.
+
+Membership is the deformer's own: create it on components (or edit its
+membership later) and only those points are quantised.
+
+The per-point math is done on all member points at once with NumPy, using
+MItGeometry.allPositions / setAllPositions, so there is no Python loop per
+point.
+
+Registration
+------------
+The plugin file is ``plugins/t33dGridQuantize.py``, which only imports the
+entry points below.  ``register()`` loads it with cmds.loadPlugin
+(``create()`` does so on demand); ``unregister()`` unloads it.
+
+``register()`` also puts that folder on MAYA_PLUG_IN_PATH, so a scene saved
+with the node finds the plugin again by name when it is reopened later in
+the session.
+"""
+
+import os
+
+import numpy as np
+
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+import maya.cmds as cmds
+
+
+NODE_TYPE = 't33dGridQuantize'
+NODE_ID   = om.MTypeId(0x0007F3D1)    ## local-use range; change if it collides
+
+
+maya_useNewAPI = True
+
+
+class GridQuantizeDeformer(oma.MPxDeformerNode):
+
+    spacingX   = om.MObject()
+    spacingY   = om.MObject()
+    spacingZ   = om.MObject()
+    worldSpace = om.MObject()
+
+    @staticmethod
+    def creator():
+        return GridQuantizeDeformer()
+
+    @staticmethod
+    def initialize():
+        nAttr = om.MFnNumericAttribute()
+        cls = GridQuantizeDeformer
+
+        for name, shortName in (('spacingX', 'spx'), ('spacingY', 'spy'), ('spacingZ', 'spz')):
+            attr = nAttr.create(name, shortName, om.MFnNumericData.kDouble, 1.0)
+            nAttr.setMin(1e-6)
+            nAttr.keyable = True
+            setattr(cls, name, attr)
+            cls.addAttribute(attr)
+
+        cls.worldSpace = nAttr.create('worldSpace', 'ws', om.MFnNumericData.kBoolean, True)
+        nAttr.keyable = True
+        cls.addAttribute(cls.worldSpace)
+
+        outputGeom = oma.MPxGeometryFilter.outputGeom
+        for attr in (cls.spacingX, cls.spacingY, cls.spacingZ, cls.worldSpace):
+            cls.attributeAffects(attr, outputGeom)
+
+    def deform(self, dataBlock, geomIter, matrix, multiIndex):
+        envelope = dataBlock.inputValue(oma.MPxGeometryFilter.envelope).asFloat()
+        if envelope == 0.0:
+            return
+
+        spacing = np.array([
+            dataBlock.inputValue(GridQuantizeDeformer.spacingX).asDouble(),
+            dataBlock.inputValue(GridQuantizeDeformer.spacingY).asDouble(),
+            dataBlock.inputValue(GridQuantizeDeformer.spacingZ).asDouble(),
+        ])
+        useWorld = dataBlock.inputValue(GridQuantizeDeformer.worldSpace).asBool()
+
+        points = np.array(geomIter.allPositions(), dtype=np.float64).reshape(-1, 4)[:, :3]
+        if not len(points):
+            return
+
+        if useWorld:
+            ## Maya matrices act on row vectors: p * M, translation in row 3.
+            toWorld = np.array(list(matrix), dtype=np.float64).reshape(4, 4)
+            toLocal = np.linalg.inv(toWorld)
+            snapped = quantize(points.dot(toWorld[:3, :3]) + toWorld[3, :3], spacing)
+            snapped = snapped.dot(toLocal[:3, :3]) + toLocal[3, :3]
+        else:
+            snapped = quantize(points, spacing)
+
+        if envelope != 1.0:
+            snapped = points + (snapped - points) * envelope
+        geomIter.setAllPositions(om.MPointArray(snapped.tolist()))
+
+
+def quantize(points, spacing):
+    """Round an (N, 3) array to the nearest multiples of ``spacing`` (scalar or per axis)."""
+    spacing = np.asarray(spacing, dtype=np.float64)
+    return np.round(np.asarray(points, dtype=np.float64) / spacing) * spacing
+
+
+# ---------------------------------------------------------------------------
+# Plugin
+# ---------------------------------------------------------------------------
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin, 'T33d', '1.0').registerNode(
+        NODE_TYPE, NODE_ID,
+        GridQuantizeDeformer.creator, GridQuantizeDeformer.initialize,
+        om.MPxNode.kDeformerNode,
+    )
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterNode(NODE_ID)
+
+
+PLUGIN_DIR  = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plugins')
+PLUGIN_NAME = 't33dGridQuantize'
+
+
+def _pluginPath():
+    return os.path.join(PLUGIN_DIR, PLUGIN_NAME + '.py')
+
+
+def _addPlugInPath():
+    ## Lets a scene's "requires" line load the plugin by name, even after it
+    ## was unloaded.  Only done here, not on import, so importing t33d leaves
+    ## the environment alone.
+    plugInPath = os.environ.get('MAYA_PLUG_IN_PATH', '')
+    if PLUGIN_DIR not in plugInPath.split(os.pathsep):
+        os.environ['MAYA_PLUG_IN_PATH'] = os.pathsep.join(p for p in (plugInPath, PLUGIN_DIR) if p)
+
+
+def register():
+    """Load this file as a plugin, if it is not loaded yet."""
+    _addPlugInPath()
+    path = _pluginPath()
+    if not cmds.pluginInfo(path, query=True, loaded=True):
+        cmds.loadPlugin(path, quiet=True)
+
+
+def unregister():
+    """Unload the plugin.  Maya refuses while the scene still has the node."""
+    path = _pluginPath()
+    if cmds.pluginInfo(path, query=True, loaded=True):
+        cmds.unloadPlugin(PLUGIN_NAME)
+
+
+def create(geometry=None, spacing=(1.0, 1.0, 1.0), worldSpace=True, name=None):
+    """
+    Add a grid quantize deformer to ``geometry`` (objects or components;
+    the selection when None) and return the node name.
+
+    ``spacing`` is a number or an (x, y, z) triple.
+    """
+    register()
+    if isinstance(spacing, (int, float)):
+        spacing = (spacing, spacing, spacing)
+
+    args = [geometry] if geometry else []
+    kwargs = {'type': NODE_TYPE}
+    if name:
+        kwargs['name'] = name
+    node = cmds.deformer(*args, **kwargs)[0]
+
+    for axis, value in zip('XYZ', spacing):
+        cmds.setAttr('{}.spacing{}'.format(node, axis), float(value))
+    cmds.setAttr(node + '.worldSpace', bool(worldSpace))
+    return node
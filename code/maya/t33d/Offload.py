@@ -0,0 +1,286 @@
+"""
+Offload -- spread CPU-heavy Python over NumPy chunks to helper processes.
+
+Pure-Python geometry code in Maya (snapping, UV work, per-point math that
+does not vectorise) runs on one core because of the GIL.  This module runs
+a function over chunks of an array in a pool of helper interpreters, so it
+scales with cores instead.
+
+Example, from a tool or a notebook cell::
+
+    import numpy as np
+    import t33d.Offload
+
+    pts = np.array(fnMesh.getPoints(om.MSpace.kWorld))[:, :3]
+    out = t33d.Offload.mapArray(relaxPoints, pts, 0.5)       ## same shape as pts
+    sums = t33d.Offload.mapChunks(np.sum, pts)                ## one value per chunk
+
+Helpers
+-------
+The helpers are plain Python interpreters -- ``mayapy`` started through
+multiprocessing's "spawn" context -- not Maya sessions: no
+maya.standalone.initialize(), no scene, no maya.cmds.  They are started on
+first use and kept for later calls (``shutdown()`` stops them; they also go
+when Maya exits).  The first call pays the interpreter startup, including
+the import of ``t33d`` itself; later calls do not.
+
+Data
+----
+Arrays never go through pickle.  The input is copied once into a
+``multiprocessing.shared_memory`` block; each helper maps the block, works on
+its rows and (for mapArray) writes its result rows into a second shared
+block, which is copied back into a normal array at the end.  Only the small
+job description -- block names, shapes, the row range, ``args`` -- is pickled.
+
+The function
+------------
+Called as ``func(chunk, *args)``, where ``chunk`` is a row slice (axis 0) of
+the array.  It must be picklable -- defined at module level in a module the
+helper can import from disk -- or defined in ``__main__`` (a notebook cell,
+the Script Editor) without closures, in which case its compiled code is sent
+the same way t33d.Batch does it.  It cannot use maya.cmds / OpenMaya.
+"""
+
+import atexit
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from t33d.Batch import _loadFunction, _packFunction, defaultMayapy
+
+
+_pool        = None
+_poolWorkers = 0
+
+
+# ---------------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------------
+
+def getPool(workers=None):
+    """
+    The shared helper pool, started on first use.  Asking for a different
+    ``workers`` count restarts it.
+    """
+    global _pool, _poolWorkers
+    workers = int(workers or os.cpu_count() or 2)
+    if _pool is not None and _poolWorkers == workers:
+        return _pool
+    shutdown()
+
+    ctx = multiprocessing.get_context('spawn')
+    ## Inside Maya, sys.executable is maya.exe / maya.bin, which cannot act as
+    ## a plain interpreter; mayapy next to it can.
+    if not os.path.basename(sys.executable).lower().startswith(('python', 'mayapy')):
+        ctx.set_executable(defaultMayapy())
+    _pool        = ctx.Pool(workers)
+    _poolWorkers = workers
+    return _pool
+
+
+def shutdown():
+    """Stop the helper processes.  The next call starts new ones."""
+    global _pool, _poolWorkers
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+    _pool        = None
+    _poolWorkers = 0
+
+
+atexit.register(shutdown)
+
+
+# ---------------------------------------------------------------------------
+# Shared memory
+# ---------------------------------------------------------------------------
+
+def _attach(name):
+    """
+    Map an existing shared memory block in a helper.  Helpers share the
+    parent's resource tracker (they are spawned by multiprocessing), so the
+    block stays registered once and the parent's unlink() cleans it up.
+    """
+    from multiprocessing import shared_memory
+    return shared_memory.SharedMemory(name=name)
+
+
+class _SharedArray(object):
+    """A shared memory block holding one array; owned by the parent."""
+
+    def __init__(self, shape, dtype):
+        from multiprocessing import shared_memory
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size       = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        self.shm   = shared_memory.SharedMemory(create=True, size=size)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    def describe(self):
+        return (self.shm.name, self.shape, self.dtype.str)
+
+    def release(self):
+        del self.array      ## drop the view first, or close() refuses
+        self.shm.close()
+        self.shm.unlink()
+
+
+_functions = {}   ## per helper: packed function -> rebuilt function
+
+
+def _runChunk(job):
+    """Helper side: run the function on one row range of the shared input."""
+    funcSpec, inDesc, outDesc, start, stop, args = job
+    func  = _loadFunction(funcSpec, _functions)
+    inShm = _attach(inDesc[0])
+    src   = None
+    try:
+        src   = np.ndarray(inDesc[1], dtype=np.dtype(inDesc[2]), buffer=inShm.buf)
+        value = func(src[start:stop], *args)
+        if outDesc is None:
+            ## A view into the block must be copied out before it is closed.
+            if isinstance(value, np.ndarray) and np.shares_memory(value, src):
+                value = value.copy()
+            return value
+        outShm = _attach(outDesc[0])
+        try:
+            dst = np.ndarray(outDesc[1], dtype=np.dtype(outDesc[2]), buffer=outShm.buf)
+            dst[start:stop] = value
+            del dst
+        finally:
+            outShm.close()
+        return None
+    finally:
+        del src
+        inShm.close()
+
+
+def _chunkRanges(rows, chunks):
+    chunks = max(1, min(int(chunks), rows or 1))
+    bounds = np.linspace(0, rows, chunks + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _run(func, array, args, outShape, outDtype, chunks, workers):
+    array    = np.ascontiguousarray(array)
+    pool     = getPool(workers)
+    chunks   = chunks or _poolWorkers * 4    ## a few per helper, for balance
+    funcSpec = _packFunction(func)
+
+    src = _SharedArray(array.shape, array.dtype)
+    dst = None
+    try:
+        src.array[...] = array
+        if outShape is not None:
+            dst = _SharedArray(outShape, outDtype)
+        jobs = [(funcSpec, src.describe(), dst.describe() if dst else None, a, b, tuple(args))
+                for a, b in _chunkRanges(array.shape[0], chunks)]
+        values = pool.map(_runChunk, jobs, chunksize=1)
+        if dst is None:
+            return values
+        return dst.array.copy()
+    finally:
+        src.release()
+        if dst is not None:
+            dst.release()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def mapArray(func, array, *args, **kwargs):
+    """
+    Apply ``func(chunk, *args)`` to row chunks of ``array`` in the helpers
+    and return the assembled result array.
+
+    ``func`` must return an array with the chunk's number of rows.  The
+    result has ``array``'s shape and dtype unless ``outShape`` / ``outDtype``
+    say otherwise (``outShape[0]`` must equal ``len(array)``).
+
+    Keyword arguments: ``outShape``, ``outDtype``, ``chunks`` (default four
+    per helper), ``workers`` (default: one per core).
+    """
+    array    = np.asarray(array)
+    outShape = tuple(kwargs.pop('outShape', array.shape))
+    outDtype = kwargs.pop('outDtype', array.dtype)
+    if outShape[0] != array.shape[0]:
+        raise ValueError('outShape must keep the number of rows ({} != {})'.format(
+            outShape[0], array.shape[0]))
+    return _run(func, array, args, outShape, outDtype,
+                kwargs.pop('chunks', None), kwargs.pop('workers', None))
+
+
+def mapChunks(func, array, *args, **kwargs):
+    """
+    Call ``func(chunk, *args)`` on row chunks of ``array`` in the helpers and
+    return the list of return values, in row order.  For reductions: the
+    values are pickled back, so keep them small (a bbox, a count, ...).
+
+    Keyword arguments: ``chunks``, ``workers`` (as for mapArray).
+    """
+    return _run(func, np.asarray(array), args, None, None,
+                kwargs.pop('chunks', None), kwargs.pop('workers', None))
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def _benchRelax(chunk, iterations):
+    """Deliberately pure-Python per-point work, like an unvectorised tool."""
+    out = chunk.copy()
+    for i in range(len(chunk)):
+        x, y, z = (float(v) for v in chunk[i])
+        for _ in range(iterations):
+            x, y, z = (x * 0.9 + y * 0.05 + z * 0.05,
+                       y * 0.9 + x * 0.05 + z * 0.05,
+                       z * 0.9 + x * 0.05 + y * 0.05)
+        out[i] = (x, y, z)
+    return out
+
+
+def benchmarkScaling(points=200000, iterations=20, maxWorkers=None, func=None, doPrint=True):
+    """
+    Time mapArray() over ``points`` xyz rows with 1, 2, 4 ... ``maxWorkers``
+    helpers, against running ``func`` in-process.
+
+    Each worker count is timed after a warm-up call, so helper startup is
+    not counted (it is paid once per session).  Returns a list of dicts:
+    ``workers``, ``seconds``, ``speedup`` (versus in-process).
+    """
+    func       = func or _benchRelax
+    maxWorkers = int(maxWorkers or os.cpu_count() or 2)
+    rng        = np.random.default_rng(0)
+    data       = rng.uniform(-10, 10, size=(int(points), 3))
+
+    started  = time.perf_counter()
+    expected = func(data, iterations)
+    inProcess = time.perf_counter() - started
+
+    counts = []
+    n = 1
+    while n < maxWorkers:
+        counts.append(n)
+        n *= 2
+    counts.append(maxWorkers)
+
+    rows = [{'workers': 0, 'seconds': inProcess, 'speedup': 1.0}]
+    for workers in counts:
+        mapArray(func, data[:workers * 8], iterations, workers=workers)    ## warm-up
+        started = time.perf_counter()
+        result  = mapArray(func, data, iterations, workers=workers)
+        seconds = time.perf_counter() - started
+        if not np.allclose(result, expected):
+            raise RuntimeError('offloaded result differs from the in-process one')
+        rows.append({'workers': workers, 'seconds': seconds, 'speedup': inProcess / seconds})
+
+    if doPrint:
+        print('t33d.Offload scaling: {:,} points x {} iterations'.format(int(points), iterations))
+        for row in rows:
+            label = 'in-process' if row['workers'] == 0 else '{} helper(s)'.format(row['workers'])
+            print('  {:<14}{:>9.3f}s  {:>5.2f}x'.format(label, row['seconds'], row['speedup']))
+    return rows
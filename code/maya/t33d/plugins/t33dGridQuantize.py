@@ -0,0 +1,11 @@
+"""
+Maya plugin file for the t33dGridQuantize deformer (see
+t33d.GridQuantizeDeformer).
+
+t33d.GridQuantizeDeformer.register() puts this folder on
+MAYA_PLUG_IN_PATH, so a scene saved with the node loads this plugin again by
+name through its ``requires`` line.  Only plugin files belong in this folder: Maya's Plug-in
+Manager lists every .py file in it.
+"""
+
+from t33d.GridQuantizeDeformer import maya_useNewAPI, initializePlugin, uninitializePlugin  # noqa: F401
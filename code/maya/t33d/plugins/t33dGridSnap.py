@@ -0,0 +1,85 @@
+"""
+Maya plugin file for the ``t33dGridSnap`` command, which the grid tools 1shot
+(t33d_1shot_grid_tools.py) uses to apply its snaps as one undoable step.
+
+The 1shot loads this plugin by name the first time it snaps and leaves it
+loaded: unloading a plugin flushes Maya's undo queue.  Only plugin files
+belong in this folder: Maya's Plug-in Manager lists every .py file in it.
+"""
+
+import numpy as np
+import maya.api.OpenMaya as om
+
+
+maya_useNewAPI = True
+
+
+class T33d_GridSnapCmd(om.MPxCommand):
+    """
+    ``t33dGridSnap`` -- applies the edits handed to it in ``_Pending``
+    (see T33d_GridToolsFuncs.applyEdits in the 1shot) as one undoable step.
+
+    ``_Pending`` is ``(pointEdits, translateEdits)``: point edits are
+    ``(dagPath, indices, oldLocal, newLocal)`` tuples, translate edits are
+    ``(dagPaths, oldTranslates, newTranslates)`` or None.
+
+    Only what moves is kept, as packed NumPy arrays: vertex indices with
+    their old and new object-space positions, and transforms with their
+    old and new translates.  The undo record therefore grows with the
+    number of moved points and objects, not with the meshes.  undoIt and
+    redoIt write each mesh back with a single MFnMesh.setPoints.
+    """
+
+    kCommandName = 't33dGridSnap'
+
+    _Pending = None
+
+    def __init__(self):
+        om.MPxCommand.__init__(self)
+        self.pointEdits = []
+        self.translateEdits = None
+
+    @staticmethod
+    def creator():
+        return T33d_GridSnapCmd()
+
+    def isUndoable(self):
+        return True
+
+    def doIt(self, args):
+        ## Raising keeps a call with nothing to apply off the undo queue.
+        if T33d_GridSnapCmd._Pending is None:
+            raise RuntimeError(
+                '{} has no edits to apply; it is run by '
+                'T33d_GridToolsFuncs.applyEdits'.format(self.kCommandName))
+        self.pointEdits, self.translateEdits = T33d_GridSnapCmd._Pending
+        T33d_GridSnapCmd._Pending = None
+        self.redoIt()
+
+    def redoIt(self):
+        self.setValues(useNew=True)
+
+    def undoIt(self):
+        self.setValues(useNew=False)
+
+    def setValues(self, useNew):
+        for dagPath, indices, oldLocal, newLocal in self.pointEdits:
+            fnMesh = om.MFnMesh(dagPath)
+            points = np.array(fnMesh.getPoints(om.MSpace.kObject), dtype=np.float64).reshape(-1, 4)[:, :3]
+            points[indices] = newLocal if useNew else oldLocal
+            fnMesh.setPoints(om.MPointArray(points.tolist()), om.MSpace.kObject)
+        if self.translateEdits is not None:
+            dagPaths, oldTranslates, newTranslates = self.translateEdits
+            values = newTranslates if useNew else oldTranslates
+            for dagPath, value in zip(dagPaths, values.tolist()):
+                om.MFnTransform(dagPath).setTranslation(om.MVector(value), om.MSpace.kTransform)
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin, 'T33d', '1.0').registerCommand(
+        T33d_GridSnapCmd.kCommandName, T33d_GridSnapCmd.creator
+    )
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(T33d_GridSnapCmd.kCommandName)
@@ -0,0 +1,200 @@
+"""
+maya_jupyter/bench.py
+=====================
+Micro-benchmarks for the kernel <-> Maya transport.  Runs OUTSIDE Maya with
+plain Python; nothing here imports maya.
+
+Usage
+-----
+    python -m maya_jupyter.bench encoding [--size 1000000]
+    python -m maya_jupyter.bench latency  [--rounds 2000] [--payload 0]
+
+encoding
+    Round-trips a large list the two ways a notebook can get data back:
+
+      repr  : what _jupyter_exec used to do -- repr() in Maya, then the
+              notebook calls ast.literal_eval() on the string;
+      json  : the application/json MIME path -- json.dumps() in Maya (as part
+              of the reply), json.loads() in the kernel.
+
+    Reports encode, decode and total seconds plus payload size for each.
+
+latency
+    Starts a stand-in worker (worker.py --standin, plain Python) listening
+    on both TCP loopback and a Unix socket, then times full round trips --
+    connect, send ``_jupyter_exec(...)``, read the JSON reply, close -- over
+    each.  Reports median / p90 / p99 microseconds.  POSIX only.
+"""
+
+import argparse
+import ast
+import base64
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker.py')
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    value   = fn(*args)
+    return value, time.perf_counter() - started
+
+
+def bench_encoding(size: int = 1_000_000, seed: int = 0) -> dict:
+    """
+    Compare repr + literal_eval with json.dumps + json.loads on a list shaped
+    like typical cell output: ``size`` xyz float triples plus node names.
+
+    Returns ``{'repr': {...}, 'json': {...}}`` with encode/decode/total
+    seconds and payload bytes.
+    """
+    rng   = random.Random(seed)
+    value = {
+        'points': [[rng.uniform(-100, 100) for _ in range(3)] for _ in range(size // 3)],
+        'nodes':  [f'|group{i // 100}|pCube{i}' for i in range(size // 100)],
+    }
+
+    results = {}
+
+    text, enc = _timed(repr, value)
+    back, dec = _timed(ast.literal_eval, text)
+    assert back == value
+    results['repr'] = {'encode_s': enc, 'decode_s': dec, 'total_s': enc + dec,
+                       'bytes': len(text.encode('utf-8'))}
+
+    text, enc = _timed(json.dumps, value)
+    back, dec = _timed(json.loads, text)
+    assert back == value
+    results['json'] = {'encode_s': enc, 'decode_s': dec, 'total_s': enc + dec,
+                       'bytes': len(text.encode('utf-8'))}
+
+    return results
+
+
+def _round_trip(family, address, command: bytes) -> float:
+    started = time.perf_counter()
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.connect(address)
+        sock.sendall(command)
+        while sock.recv(65536):
+            pass
+    return time.perf_counter() - started
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def bench_latency(rounds: int = 2000, payload: int = 0) -> dict:
+    """
+    Round-trip ``rounds`` cells through a stand-in worker over TCP loopback
+    and over a Unix socket, alternating so both see the same conditions.
+
+    ``payload`` pads the cell with a comment of that many bytes, to see
+    where bandwidth starts to matter more than per-connection overhead.
+    Returns ``{'tcp': {...}, 'unix': {...}}`` with median/p90/p99 seconds.
+    """
+    if not hasattr(socket, 'AF_UNIX') or os.name != 'posix':
+        raise RuntimeError('the latency benchmark needs Unix sockets (Linux/macOS)')
+
+    tmp        = tempfile.mkdtemp(prefix='mjbench-')     # mode 0700
+    ready_file = os.path.join(tmp, 'worker.json')
+    unix_path  = os.path.join(tmp, 'worker.sock')
+    proc = subprocess.Popen([
+        sys.executable, WORKER_PATH, '--standin',
+        '--ready-file', ready_file, '--unix-socket', unix_path, '--idle-timeout', '60',
+    ])
+    try:
+        deadline = time.monotonic() + 30
+        while not os.path.exists(ready_file):
+            if proc.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError('stand-in worker did not start')
+            time.sleep(0.02)
+        with open(ready_file, 'r', encoding='utf-8') as fh:
+            info = json.load(fh)
+
+        code    = '1 + 1' + ('\n#' + 'x' * payload if payload else '')
+        command = '_jupyter_exec("{}")\n'.format(
+            base64.b64encode(code.encode('utf-8')).decode('ascii')).encode('utf-8')
+        targets = {
+            'tcp':  (socket.AF_INET, (info['host'], info['port'])),
+            'unix': (socket.AF_UNIX, unix_path),
+        }
+        samples = {name: [] for name in targets}
+        for name, (family, address) in targets.items():     # warm-up
+            for _ in range(20):
+                _round_trip(family, address, command)
+        for _ in range(rounds):
+            for name, (family, address) in targets.items():
+                samples[name].append(_round_trip(family, address, command))
+
+        _round_trip(socket.AF_UNIX, unix_path, b'_jupyter_worker_exit()\n')
+        proc.wait(10)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    results = {}
+    for name, values in samples.items():
+        values.sort()
+        results[name] = {'median_s': _percentile(values, 0.5),
+                         'p90_s':    _percentile(values, 0.9),
+                         'p99_s':    _percentile(values, 0.99)}
+    return results
+
+
+def _print_table(title: str, results: dict) -> None:
+    print(title)
+    print(f"  {'method':<8}{'encode s':>12}{'decode s':>12}{'total s':>12}{'MB':>10}")
+    for name, r in results.items():
+        print(f"  {name:<8}{r['encode_s']:>12.4f}{r['decode_s']:>12.4f}"
+              f"{r['total_s']:>12.4f}{r['bytes'] / 1e6:>10.2f}")
+
+
+def main(argv=None):
+    """Command-line entry point: ``python -m maya_jupyter.bench``"""
+    parser = argparse.ArgumentParser(prog='python -m maya_jupyter.bench')
+    sub    = parser.add_subparsers(dest='bench', required=True)
+
+    p_enc = sub.add_parser('encoding', help='repr+literal_eval vs JSON for large results')
+    p_enc.add_argument('--size', type=int, default=1_000_000,
+                       help='number of floats in the test value (default 1e6)')
+
+    p_lat = sub.add_parser('latency', help='TCP loopback vs Unix socket round trips (stand-in worker)')
+    p_lat.add_argument('--rounds', type=int, default=2000,
+                       help='round trips per transport (default 2000)')
+    p_lat.add_argument('--payload', type=int, default=0,
+                       help='extra bytes of cell source per request (default 0)')
+
+    args = parser.parse_args(argv)
+
+    if args.bench == 'encoding':
+        results = bench_encoding(args.size)
+        _print_table(f'[maya_jupyter] result encoding, {args.size:,} floats', results)
+        speedup = results['repr']['total_s'] / results['json']['total_s']
+        print(f'  json is {speedup:.1f}x faster end to end')
+
+    elif args.bench == 'latency':
+        results = bench_latency(args.rounds, args.payload)
+        print(f'[maya_jupyter] round-trip latency, {args.rounds:,} rounds, '
+              f'{args.payload:,} byte payload')
+        print(f"  {'transport':<10}{'median us':>12}{'p90 us':>12}{'p99 us':>12}")
+        for name, r in results.items():
+            print(f"  {name:<10}{r['median_s'] * 1e6:>12.1f}{r['p90_s'] * 1e6:>12.1f}"
+                  f"{r['p99_s'] * 1e6:>12.1f}")
+        speedup = results['tcp']['median_s'] / results['unix']['median_s']
+        print(f'  unix socket median is {speedup:.2f}x faster than TCP loopback')
+
+
+if __name__ == '__main__':
+    main()
@@ -23,7 +23,7 @@ Architecture / data flow
        │  5. parse JSON
        │
        ├──► ZMQ stream          (stdout/stderr text)
-       ├──► ZMQ execute_result  (expression repr value)
+       ├──► ZMQ execute_result  (expression value as a MIME bundle)
        └──► ZMQ error           (traceback on exception)
             │
             ▼
@@ -54,6 +54,66 @@ For multiple simultaneous Maya instances, run maya_init.py in each with
 a different JUPYTER_PORT, then create a separate kernel.json per instance
 (or launch kernels with different MAYA_KERNEL_PORT env vars).
 
+Same-host Unix socket
+---------------------
+On Linux/macOS maya_init.py also opens a commandPort on a Unix socket,
+``/tmp/maya_jupyter-<uid>/commandport-<port>``, inside a directory only
+its owner can enter.  When maya_host is local, ``_connect()`` uses that
+socket and skips the TCP/IP stack; if it is missing it falls back to TCP.
+``python -m maya_jupyter.bench latency`` compares the two.
+
+Headless backend (mayapy)
+-------------------------
+With ``--MayaKernel.backend=mayapy`` (or MAYA_KERNEL_BACKEND=mayapy) the
+kernel does not need an interactive Maya.  It launches ``mayapy worker.py``,
+which runs ``maya.standalone`` with maya_init.py's functions preloaded and
+speaks the same line-in / JSON-out protocol as commandPort, so everything
+below works unchanged.  pool.py keeps ``warm_spares`` initialised workers
+running as detached processes; after a kernel restart the new kernel adopts
+one instead of paying the ``maya.standalone.initialize()`` cost again.
+``--MayaKernel.worker_standin=True`` swaps in a plain-Python worker for
+testing without Maya.
+
+Widget comms (sliders bound to Maya attributes)
+-----------------------------------------------
+``maya_slider('pCube1.tx', -10, 10)`` in a cell creates the widget inside
+Maya; the reply carries a ``comm_opens`` list and this kernel opens the
+matching Jupyter comms with the frontend.  Slider drags come back as
+``comm_msg`` updates, are coalesced to the latest value per widget every
+``widget_sync_interval`` seconds, and are sent to Maya in one
+``_jupyter_comm_apply(...)`` call per interval.
+
+Off-main-thread cells
+---------------------
+A ``%%maya_thread`` cell runs in a thread pool inside Maya.  _jupyter_exec
+replies at once with ``thread_job``; _wait_thread_job() then polls
+``_jupyter_thread_poll(id)`` every ``thread_poll_interval`` seconds,
+streaming output, until the job is done.
+
+Local module sync
+-----------------
+Before each cell, modsync.py looks for local modules the cell imports
+(``import mytool`` with ``mytool.py`` next to the notebook).  Their source is
+sent to Maya, which serves it from an import hook at the front of
+``sys.meta_path`` and reloads only modules whose content hash changed.  Edit
+``mytool.py``, re-run the cell, and Maya sees the new code -- no shared drive
+or ``sys.path`` edits needed.  Turn off with ``--MayaKernel.sync_local_modules=False``.
+
+File transfer
+-------------
+``%maya_put local remote`` and ``%maya_get remote local`` are handled in this
+process (they need the notebook host's files) and move the file through
+transfer.py's chunked, hash-checked, resumable protocol over the same
+commandPort channel.
+
+Telemetry
+---------
+Every commandPort call records kernel-side phases (encode, connect, send,
+wait, recv, decode) and bytes each way; _jupyter_exec adds Maya-side
+phases (queue, decode, compile, exec, serialize) in its reply's "timing".
+``%maya_stats`` shows the last cell's breakdown and session histograms;
+``--MayaKernel.metrics_port=N`` serves them in Prometheus format.
+
 Extending for rich output (future work)
 ----------------------------------------
 The JSON payload returned by _jupyter_exec() is designed to be extended.
@@ -77,10 +137,102 @@ renders, etc.):
 import base64
 import json
 import os
+import shlex
 import socket
+import sys
+import threading
+import time
 
+import comm
+import ipykernel.ipkernel  # noqa: F401  (points comm.create_comm / get_comm_manager at ipykernel)
 from ipykernel.kernelbase import Kernel
-from traitlets import Int, Unicode
+from traitlets import Bool, Float, Int, Unicode
+
+from . import metrics, modsync, transfer
+from .pool import MayapyPool, WorkerStartError
+from .worker import unix_socket_path
+
+
+_LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+
+# ---------------------------------------------------------------------------
+# Telemetry: metric descriptions and the %maya_stats report
+# ---------------------------------------------------------------------------
+
+_METRIC_HELP = {
+    'maya_jupyter_calls_total':          'commandPort calls made to Maya.',
+    'maya_jupyter_call_errors_total':    'commandPort calls whose reply carried an error.',
+    'maya_jupyter_bytes_sent_total':     'Request bytes sent to Maya.',
+    'maya_jupyter_bytes_received_total': 'Reply bytes received from Maya.',
+    'maya_jupyter_request_bytes':        'Size of each request sent to Maya.',
+    'maya_jupyter_response_bytes':       'Size of each reply from Maya.',
+    'maya_jupyter_call_seconds':         'Wall time of each commandPort call, kernel side.',
+    'maya_jupyter_phase_seconds':        'Seconds per phase of a call (side=kernel) or a cell in Maya (side=maya).',
+    'maya_jupyter_cells_total':          'Cells executed in Maya.',
+    'maya_jupyter_cell_errors_total':    'Cells that raised.',
+    'maya_jupyter_cell_seconds':         'Wall time of each cell, as seen by the kernel.',
+}
+
+# Phases in the order a cell goes through them.
+_CELL_PHASES = (
+    ('kernel', 'encode_s',    'encode (b64 + command)'),
+    ('kernel', 'connect_s',   'connect'),
+    ('kernel', 'send_s',      'send'),
+    ('maya',   'queue_s',     'queue (transfer + main thread)'),
+    ('maya',   'decode_s',    'decode'),
+    ('maya',   'compile_s',   'compile'),
+    ('maya',   'exec_s',      'exec'),
+    ('maya',   'serialize_s', 'serialize result'),
+    ('kernel', 'wait_s',      'wait for first reply byte'),
+    ('kernel', 'recv_s',      'receive'),
+    ('kernel', 'decode_s',    'decode JSON'),
+)
+
+
+def _format_stats(last_cell, registry) -> str:
+    """Plain-text report for %maya_stats."""
+    lines = []
+    if last_cell:
+        lines.append(
+            f"[maya_jupyter] last cell [{last_cell['execution_count']}]: "
+            f"{last_cell['seconds'] * 1e3:.1f} ms, "
+            f"{last_cell['bytes_out']:,} bytes out, {last_cell['bytes_in']:,} bytes in"
+        )
+        for side, key, label in _CELL_PHASES:
+            value = last_cell[side].get(key)
+            if value is not None:
+                lines.append(f'  {side:<7}{label:<32}{value * 1e3:>10.2f} ms')
+        lines.append('  (kernel wait spans the maya phases; queue needs synced clocks)')
+    else:
+        lines.append('[maya_jupyter] no cell has run in Maya yet')
+
+    counters = registry.counters()
+    totals   = {}
+    for (name, _labels), value in counters.items():
+        totals[name] = totals.get(name, 0) + value
+    lines.append('')
+    lines.append(
+        f"session: {int(totals.get('maya_jupyter_cells_total', 0))} cells "
+        f"({int(totals.get('maya_jupyter_cell_errors_total', 0))} errors), "
+        f"{int(totals.get('maya_jupyter_calls_total', 0))} calls, "
+        f"{totals.get('maya_jupyter_bytes_sent_total', 0) / 1e6:.2f} MB out, "
+        f"{totals.get('maya_jupyter_bytes_received_total', 0) / 1e6:.2f} MB in"
+    )
+
+    phases = sorted(
+        (dict(labels), h) for (name, labels), h in registry.histograms().items()
+        if name == 'maya_jupyter_phase_seconds'
+    )
+    if phases:
+        lines.append(f"  {'side':<7}{'phase':<12}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for labels, h in phases:
+            mean = h['sum'] / h['count'] if h['count'] else 0.0
+            lines.append(
+                f"  {labels.get('side', ''):<7}{labels.get('phase', ''):<12}{h['count']:>8}"
+                f"{mean * 1e3:>10.2f}{(h['p50'] or 0) * 1e3:>10.2f}{(h['p95'] or 0) * 1e3:>10.2f}"
+            )
+    return '\n'.join(lines) + '\n'
 
 
 # ---------------------------------------------------------------------------
@@ -122,6 +274,38 @@ def _parse_exception(tb_text: str) -> tuple:
     return 'Error', tb_text
 
 
+def _format_scene_changes(changes: dict) -> str:
+    """
+    One compact text block for a ``scene_changes`` summary from Maya.
+
+    Example::
+
+        [maya] +2 created, -0 deleted, 3 plugs changed (on selected or created nodes)
+          created: pCube1, pCubeShape1
+          plugs:   pCube1.translateX, ...
+
+    The plug count is not scene-wide: Maya only watches attributes on nodes
+    selected or created during the cell, which ``plug_scope`` names.
+    """
+    counts = changes.get('counts', {})
+    scope  = changes.get('plug_scope')
+    lines  = [
+        f"[maya] +{counts.get('created', 0)} created, "
+        f"-{counts.get('deleted', 0)} deleted, "
+        f"{counts.get('changed_plugs', 0)} plugs changed"
+        + (f' (on {scope})' if scope else '')
+    ]
+    for label, key in (('created', 'created'),
+                       ('deleted', 'deleted'),
+                       ('plugs',   'changed_plugs')):
+        names = changes.get(key) or []
+        if names:
+            more = counts.get(key, len(names)) - len(names)
+            tail = f', ... (+{more} more)' if more > 0 else ''
+            lines.append(f'  {label + ":":<9}{", ".join(names)}{tail}')
+    return '\n'.join(lines)
+
+
 # ---------------------------------------------------------------------------
 # Kernel
 # ---------------------------------------------------------------------------
@@ -161,6 +345,17 @@ class MayaKernel(Kernel):
         ),
     ).tag(config=True)
 
+    unix_socket = Unicode(
+        'auto',
+        help=(
+            "Same-host transport.  'auto' connects through the per-user Unix "
+            'socket maya_init.py opens next to the TCP port when maya_host is '
+            "local (POSIX only), falling back to TCP; 'off' always uses TCP; "
+            'any other value is a socket path to use. '
+            'Override with the MAYA_KERNEL_SOCKET environment variable.'
+        ),
+    ).tag(config=True)
+
     maya_port = Int(
         7001,
         help=(
@@ -180,28 +375,185 @@ class MayaKernel(Kernel):
         ),
     ).tag(config=True)
 
+    backend = Unicode(
+        'gui',
+        help=(
+            "'gui' attaches to an interactive Maya that has run maya_init.py. "
+            "'mayapy' launches and owns a headless mayapy worker "
+            "(maya.standalone) instead, keeping warm spares for restarts. "
+            'Override with the MAYA_KERNEL_BACKEND environment variable.'
+        ),
+    ).tag(config=True)
+
+    mayapy = Unicode(
+        'mayapy',
+        help=(
+            'mayapy executable for the mayapy backend. '
+            'Override with the MAYA_KERNEL_MAYAPY environment variable.'
+        ),
+    ).tag(config=True)
+
+    worker_standin = Bool(
+        False,
+        help=(
+            'Run the mayapy backend with the plain-Python stand-in worker '
+            '(no Maya needed; uses this kernel\'s Python unless mayapy is set).'
+        ),
+    ).tag(config=True)
+
+    warm_spares = Int(
+        1,
+        help=(
+            'Initialised, unclaimed mayapy workers to keep running so a kernel '
+            'restart adopts one instead of paying maya.standalone startup.'
+        ),
+    ).tag(config=True)
+
+    report_scene_changes = Bool(
+        False,
+        help=(
+            'Arm DG callbacks in Maya for each cell and show which nodes were '
+            'created / deleted and which plugs changed. Plug changes are only '
+            'seen on nodes selected or created during the cell. '
+            'Override with the MAYA_KERNEL_SCENE_CHANGES environment variable.'
+        ),
+    ).tag(config=True)
+
+    undo_chunk_per_cell = Bool(
+        True,
+        help=(
+            'Wrap each cell in its own named undo chunk in Maya, so a cell is '
+            'one undo step and %maya_undo_cell N can roll back to before it.'
+        ),
+    ).tag(config=True)
+
+    widget_sync_interval = Float(
+        1.0 / 30.0,
+        help=(
+            'Seconds between widget -> Maya flushes.  Slider drags arriving '
+            'within one interval are coalesced so only the latest value per '
+            'widget is sent to Maya.'
+        ),
+    ).tag(config=True)
+
+    sync_local_modules = Bool(
+        True,
+        help=(
+            'Before each cell, send the source of local modules it imports '
+            '(from module_sync_root) to Maya and reload the ones that changed.'
+        ),
+    ).tag(config=True)
+
+    module_sync_root = Unicode(
+        '',
+        help=(
+            'Folder searched for local modules to sync.  Empty means the '
+            "kernel's working directory, which Jupyter sets to the notebook's folder."
+        ),
+    ).tag(config=True)
+
+    thread_poll_interval = Float(
+        0.1,
+        help=(
+            'Seconds between polls of a running %%maya_thread cell.  Each poll '
+            "is a short call that briefly uses Maya's main thread."
+        ),
+    ).tag(config=True)
+
+    metrics_port = Int(
+        0,
+        help=(
+            'Serve Prometheus-format metrics at http://127.0.0.1:<port>/metrics '
+            '(0 = off). Override with the MAYA_KERNEL_METRICS_PORT environment variable.'
+        ),
+    ).tag(config=True)
+
+    transfer_chunk_kib = Int(
+        256,
+        help=(
+            'Chunk size in KiB for %maya_put / %maya_get (each chunk is one commandPort call). '
+            'Capped at 512 so a chunk fits the commandPort buffer maya_init.py opens.'
+        ),
+    ).tag(config=True)
+
+    transfer_max_rate = Float(
+        0.0,
+        help='Default %maya_put / %maya_get rate cap in MB/s; 0 means unlimited.',
+    ).tag(config=True)
+
     # ------------------------------------------------------------------------
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+        # The plain Kernel base class has no comm support (only IPythonKernel
+        # wires one up), so register the handlers the same way it does.  It
+        # must be the process-wide manager: comm.create_comm() registers new
+        # comms there, and frontend messages are looked up by comm_id.
+        self.comm_manager = comm.get_comm_manager()
+        for msg_type in ('comm_open', 'comm_msg', 'comm_close'):
+            self.shell_handlers[msg_type] = getattr(self.comm_manager, msg_type)
+
+        self._widget_comms   = {}     # comm_id -> comm (from comm.create_comm)
+        self._widget_states  = {}     # comm_id -> last known state dict
+        self._widget_pending = {}     # comm_id -> latest unsent value
+        self._widget_lock    = threading.Lock()
+        self._widget_timer   = None
+
+        # Widget flushes run on a timer thread; this keeps their commandPort
+        # calls from interleaving with a running cell's.
+        self._maya_lock = threading.RLock()
+
         # Environment variable overrides let users set the connection details
         # in shell profiles or launch scripts without editing kernel.json.
         host    = os.environ.get('MAYA_KERNEL_HOST')
         port    = os.environ.get('MAYA_KERNEL_PORT')
         timeout = os.environ.get('MAYA_KERNEL_TIMEOUT')
+        changes = os.environ.get('MAYA_KERNEL_SCENE_CHANGES')
+        backend = os.environ.get('MAYA_KERNEL_BACKEND')
+        mayapy  = os.environ.get('MAYA_KERNEL_MAYAPY')
+        usock   = os.environ.get('MAYA_KERNEL_SOCKET')
         if host:
             self.maya_host = host
         if port:
             self.maya_port = int(port)
         if timeout:
             self.recv_timeout = int(timeout)
+        if changes:
+            self.report_scene_changes = changes.lower() not in ('0', 'false', 'no', '')
+        if backend:
+            self.backend = backend
+        if mayapy:
+            self.mayapy = mayapy
+        if usock:
+            self.unix_socket = usock
+
+        # Telemetry: see metrics.py and %maya_stats.
+        self.metrics    = metrics.Registry()
+        self._last_cell = None
+        for name, text in _METRIC_HELP.items():
+            self.metrics.describe(name, text)
+        metrics_port = os.environ.get('MAYA_KERNEL_METRICS_PORT')
+        if metrics_port:
+            self.metrics_port = int(metrics_port)
+        if self.metrics_port:
+            try:
+                metrics.serve_http(self.metrics, self.metrics_port)
+                self.log.info('[maya_jupyter] Metrics at http://127.0.0.1:%s/metrics', self.metrics_port)
+            except OSError as exc:
+                self.log.warning('[maya_jupyter] Metrics endpoint not started: %s', exc)
+
+        # mayapy backend: the worker is started (or adopted) on first use so
+        # kernel startup itself stays fast.
+        self._pool        = None
+        self._worker      = None
+        self._worker_lock = threading.Lock()
 
     # -------------------------------------------------------------------------
     # Internal: TCP communication with Maya
     # -------------------------------------------------------------------------
 
-    def _send_to_maya(self, code: str) -> dict:
+    def _send_to_maya(self, code: str, record: dict = None, **options) -> dict:
         """
         Send ``code`` to Maya via the commandPort and return the parsed JSON.
 
@@ -209,7 +561,9 @@ class MayaKernel(Kernel):
         --------
         1. Base64-encode the code (handles any mix of quotes/backslashes/
            newlines inside the cell without breaking the outer function call).
-        2. Build the command string:  ``_jupyter_exec("<b64>")\n``
+           Keyword ``options`` (e.g. ``track_changes=True``) travel alongside
+           as a second base64 JSON argument.
+        2. Build the command string:  ``_jupyter_exec("<b64>", "<opts>")\n``
            This is a valid Python expression that Maya evaluates.  Maya calls
            our wrapper, which returns a JSON string; commandPort returns that
            JSON string as its reply.
@@ -226,21 +580,174 @@ class MayaKernel(Kernel):
 
         Notes on commandPort buffer limits
         -----------------------------------
-        Maya's commandPort may have an undocumented maximum message size.
-        Very large cells (tens of KB of source code) could potentially be
-        truncated.  In practice this is rarely an issue for interactive work.
+        Maya's commandPort truncates messages longer than its buffer, 4096
+        characters unless the port was opened with ``-bufferSize``.
+        maya_init.py opens it with 1 MiB (``COMMAND_PORT_BUFFER_SIZE``).
         Base64 encoding inflates size by ~33%, so a 30 KB cell becomes ~40 KB.
-        If truncation occurs, split the cell into smaller pieces.
+        If truncation occurs (a cell of several hundred KB), split the cell
+        into smaller pieces.
+
+        ``record``, when given, is filled with the call's metrics record
+        (see ``_call_maya``).
+        """
+        started     = time.perf_counter()
+        options['sent_at'] = time.time()
+        code_b64    = base64.b64encode(code.encode('utf-8')).decode('ascii')
+        options_b64 = base64.b64encode(json.dumps(options).encode('utf-8')).decode('ascii')
+        encode_s    = time.perf_counter() - started
+        return self._call_maya('_jupyter_exec', code_b64, options_b64, encode_s=encode_s, record=record)
+
+    def _sync_modules(self, code: str):
+        """
+        Push local modules imported by ``code`` to Maya (see modsync.py).
+
+        Two round trips, and only when the cell imports something local:
+        Maya is sent ``{name: hash}`` and answers with the names it needs,
+        then gets just those sources.  Returns an error string or None.
+        """
+        root = self.module_sync_root or os.getcwd()
+        try:
+            modules = modsync.collect_local_modules(code, root)
+        except OSError as exc:
+            return f'[maya_jupyter] Module sync skipped: {exc}'
+        if not modules:
+            return None
+
+        def b64json(obj):
+            return base64.b64encode(json.dumps(obj).encode('utf-8')).decode('ascii')
+
+        reply = self._call_maya(
+            '_jupyter_sync_manifest',
+            b64json({name: info['hash'] for name, info in modules.items()}),
+        )
+        if reply.get('error'):
+            return reply['error']
+        need = reply.get('need') or []
+        if not need:
+            return None
+
+        reply = self._call_maya('_jupyter_sync_push', b64json({name: modules[name] for name in need}))
+        if reply.get('reloaded'):
+            self.log.info('[maya_jupyter] Reloaded in Maya: %s', ', '.join(reply['reloaded']))
+        return reply.get('error')
+
+    def _unix_socket_path(self):
+        """The Unix socket to try first, or None to go straight to TCP."""
+        if self.unix_socket in ('', 'off') or not hasattr(socket, 'AF_UNIX') or os.name != 'posix':
+            return None
+        if self.unix_socket != 'auto':
+            return self.unix_socket
+        if self._worker is not None:
+            return self._worker.get('unix_socket')
+        if self.maya_host not in _LOCAL_HOSTS:
+            return None
+        try:
+            return unix_socket_path(self.maya_port)
+        except OSError:
+            return None
+
+    def _connect(self) -> socket.socket:
+        """
+        Connect to Maya: over the Unix socket when Maya is on this machine
+        and listening on one, otherwise over TCP.
+
+        A missing or dead Unix socket (an older maya_init.py, Windows, Maya
+        on another host) is not an error -- it just means TCP.
+        """
+        path = self._unix_socket_path()
+        if path and os.path.exists(path):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.recv_timeout)
+            try:
+                sock.connect(path)
+                return sock
+            except OSError:
+                sock.close()
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.recv_timeout)
+        try:
+            sock.connect((self.maya_host, self.maya_port))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _call_maya(self, func_name: str, *args: str, encode_s: float = 0.0, record: dict = None) -> dict:
+        """
+        Call ``func_name(*args)`` inside Maya and return its parsed JSON reply.
+
+        Every ``_jupyter_*`` entry point installed by maya_init.py takes only
+        string arguments (base64 where the content is arbitrary) and returns
+        a JSON string, so one transport serves them all.  Failures come back
+        as the same synthetic ``{'stdout', 'result', 'error'}`` dicts that
+        ``_send_to_maya`` documents.
+
+        Each call's kernel-side phases and byte counts are recorded in
+        ``self.metrics`` (see metrics.py); pass a dict as ``record`` to also
+        get this call's own record in it.  ``encode_s`` is encoding the
+        caller already did (``_send_to_maya``'s base64), added to the call's
+        encode phase.
+
+        Calls are serialised: widget flushes come from a timer thread and
+        must not share the socket, or the record, with a running cell.
+        """
+        call    = {'function': func_name, 'bytes_out': 0, 'bytes_in': 0, 'kernel': {}}
+        with self._maya_lock:
+            started = time.perf_counter()
+            reply   = self._round_trip(func_name, args, call)
+            seconds = time.perf_counter() - started + encode_s
+        if encode_s:
+            call['kernel']['encode_s'] = call['kernel'].get('encode_s', 0.0) + encode_s
+
+        m = self.metrics
+        m.inc('maya_jupyter_calls_total', function=func_name)
+        if reply.get('error'):
+            m.inc('maya_jupyter_call_errors_total', function=func_name)
+        m.inc('maya_jupyter_bytes_sent_total', call['bytes_out'], function=func_name)
+        m.inc('maya_jupyter_bytes_received_total', call['bytes_in'], function=func_name)
+        m.observe('maya_jupyter_request_bytes', call['bytes_out'], metrics.BYTES_BUCKETS, function=func_name)
+        m.observe('maya_jupyter_response_bytes', call['bytes_in'], metrics.BYTES_BUCKETS, function=func_name)
+        m.observe('maya_jupyter_call_seconds', seconds, function=func_name)
+        for phase, value in call['kernel'].items():
+            m.observe('maya_jupyter_phase_seconds', value, side='kernel', phase=phase[:-2])
+
+        call['seconds'] = seconds
+        if record is not None:
+            record.update(call)
+        return reply
+
+    def _round_trip(self, func_name: str, args: tuple, call: dict) -> dict:
+        """
+        The transport behind ``_call_maya``.  Fills ``call`` with byte counts
+        and ``call['kernel']`` with seconds per phase: encode, connect, send,
+        wait (request sent -> first reply byte: Maya's work plus the
+        network), recv (first -> last byte) and decode.
         """
-        code_b64 = base64.b64encode(code.encode('utf-8')).decode('ascii')
-        command  = f'_jupyter_exec("{code_b64}")\n'
+        worker_error = self._ensure_worker()
+        if worker_error:
+            return {'stdout': '', 'result': None, 'error': worker_error}
+
+        timing = call['kernel']
+        mark   = time.perf_counter()
+
+        def lap(phase):
+            nonlocal mark
+            now = time.perf_counter()
+            timing[phase] = now - mark
+            mark = now
+
+        arg_text = ', '.join(f'"{a}"' for a in args)
+        command  = f'{func_name}({arg_text})\n'.encode('utf-8')
+        call['bytes_out'] = len(command)
+        lap('encode_s')
 
         raw = b''
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.settimeout(self.recv_timeout)
-                sock.connect((self.maya_host, self.maya_port))
-                sock.sendall(command.encode('utf-8'))
+            with self._connect() as sock:
+                lap('connect_s')
+                sock.sendall(command)
+                lap('send_s')
 
                 # Read response chunks until the connection closes.
                 # Maya closes the connection after sending its complete reply,
@@ -256,11 +763,21 @@ class MayaKernel(Kernel):
                         break
                     if not chunk:
                         break   # Connection closed — normal end of reply.
+                    if not chunks:
+                        lap('wait_s')
                     chunks.append(chunk)
+                lap('recv_s' if chunks else 'wait_s')
 
                 raw = b''.join(chunks)
+                call['bytes_in'] = len(raw)
 
         except ConnectionRefusedError:
+            if self._worker is not None:
+                return {
+                    'stdout': '',
+                    'result': None,
+                    'error': self._drop_dead_worker(),
+                }
             return {
                 'stdout': '',
                 'result': None,
@@ -287,13 +804,15 @@ class MayaKernel(Kernel):
                 'result': None,
                 'error': (
                     '[maya_jupyter] Maya returned an empty response.\n'
-                    'This usually means _jupyter_exec() is not installed — '
+                    f'This usually means {func_name}() is not installed — '
                     'run maya_init.py inside Maya first.'
                 ),
             }
 
         try:
-            return json.loads(raw_text)
+            reply = json.loads(raw_text)
+            lap('decode_s')
+            return reply
         except json.JSONDecodeError as exc:
             return {
                 'stdout': '',
@@ -304,6 +823,270 @@ class MayaKernel(Kernel):
                 ),
             }
 
+    # -------------------------------------------------------------------------
+    # Internal: headless mayapy backend
+    # -------------------------------------------------------------------------
+
+    def _ensure_worker(self):
+        """
+        For ``backend='mayapy'``, make sure we own a running worker and point
+        maya_host/maya_port at it.  Returns an error string, or None.
+        """
+        if self.backend == 'gui':
+            return None
+        if self.backend != 'mayapy':
+            return (f"[maya_jupyter] Unknown backend {self.backend!r}; "
+                    f"use 'gui' or 'mayapy'.")
+        with self._worker_lock:
+            if self._worker is not None:
+                return None
+            if self._pool is None:
+                mayapy = self.mayapy
+                if self.worker_standin and mayapy == 'mayapy':
+                    mayapy = sys.executable
+                self._pool = MayapyPool(
+                    mayapy,
+                    spares=self.warm_spares,
+                    standin=self.worker_standin,
+                    startup_timeout=max(self.recv_timeout, 300),
+                    log=self.log,
+                )
+            try:
+                self._worker = self._pool.acquire()
+            except (OSError, WorkerStartError) as exc:
+                return f'[maya_jupyter] Could not start a mayapy worker: {exc}'
+
+            self.maya_host = self._worker['host']
+            self.maya_port = self._worker['port']
+            how = 'adopted warm spare' if self._worker['adopted'] else 'cold start'
+            self.log.info(
+                '[maya_jupyter] mayapy worker pid=%s on %s:%s (%s, waited %.2fs)',
+                self._worker['pid'], self.maya_host, self.maya_port,
+                how, self._worker['wait_seconds'],
+            )
+        return None
+
+    def _drop_dead_worker(self) -> str:
+        """Forget a worker that stopped answering; the next cell gets a new one."""
+        pid = self._worker['pid']
+        self._worker = None
+        return (
+            f'[maya_jupyter] The headless mayapy worker (pid {pid}) is gone.\n'
+            f'The next cell will start or adopt a fresh one; variables and '
+            f'scene state from this session are lost.'
+        )
+
+    # -------------------------------------------------------------------------
+    # Internal: widget comms bridged to Maya attributes
+    # -------------------------------------------------------------------------
+
+    def _open_widget_comms(self, comm_opens: list) -> None:
+        """
+        Open a Jupyter comm for each widget Maya created during the cell and
+        display it.  Maya picked the comm_id, so both sides already agree on
+        which attribute each comm drives.
+        """
+        for item in comm_opens:
+            comm_id = item['comm_id']
+            widget_comm = comm.create_comm(
+                comm_id=comm_id,
+                target_name=item['target_name'],
+                data=item['data'],
+                metadata=item['metadata'],
+            )
+            widget_comm.on_msg(lambda msg, cid=comm_id: self._on_widget_msg(cid, msg))
+            widget_comm.on_close(lambda msg, cid=comm_id: self._on_widget_close(cid))
+            self._widget_comms[comm_id]  = widget_comm
+            self._widget_states[comm_id] = dict(item['data']['state'])
+
+            self.send_response(self.iopub_socket, 'display_data', {
+                'data':     item['display'],
+                'metadata': {},
+            })
+
+    def _on_widget_msg(self, comm_id: str, msg: dict) -> None:
+        """Record the latest value from the frontend; flush on a timer."""
+        data   = msg['content']['data']
+        method = data.get('method')
+
+        if method == 'request_state':
+            self._widget_comms[comm_id].send({
+                'method':       'update',
+                'state':        self._widget_states[comm_id],
+                'buffer_paths': [],
+            })
+            return
+
+        if method != 'update' or 'value' not in data.get('state', {}):
+            return
+
+        value = data['state']['value']
+        self._widget_states[comm_id]['value'] = value
+
+        # Only the newest value per widget survives until the next flush, so
+        # a fast drag costs one commandPort round trip per frame interval no
+        # matter how many update messages the frontend sends.
+        with self._widget_lock:
+            self._widget_pending[comm_id] = value
+            if self._widget_timer is None:
+                self._widget_timer = threading.Timer(
+                    self.widget_sync_interval, self._flush_widget_values
+                )
+                self._widget_timer.daemon = True
+                self._widget_timer.start()
+
+    def _flush_widget_values(self) -> None:
+        """Send the coalesced batch of widget values to Maya."""
+        with self._widget_lock:
+            pending = self._widget_pending
+            self._widget_pending = {}
+            self._widget_timer   = None
+        if not pending:
+            return
+        payload  = base64.b64encode(json.dumps(pending).encode('utf-8')).decode('ascii')
+        response = self._call_maya('_jupyter_comm_apply', payload)
+        if response.get('error'):
+            self.log.warning('[maya_jupyter] Widget sync: %s', response['error'])
+
+    def _on_widget_close(self, comm_id: str) -> None:
+        """The frontend closed a widget; drop it on both sides."""
+        self._widget_comms.pop(comm_id, None)
+        self._widget_states.pop(comm_id, None)
+        with self._widget_lock:
+            self._widget_pending.pop(comm_id, None)
+        self._call_maya('_jupyter_comm_close', comm_id)
+
+    # -------------------------------------------------------------------------
+    # %%maya_thread jobs
+    # -------------------------------------------------------------------------
+
+    def _wait_thread_job(self, response: dict, silent: bool) -> dict:
+        """
+        Poll a ``%%maya_thread`` job until it is done, streaming its output
+        as it arrives.  Returns the final reply, minus the output already
+        streamed, for do_execute() to relay like any other.
+
+        Each poll is one short commandPort call, so Maya's main thread is
+        free in between -- which is what lets the job's ``main(...)`` calls
+        run there.
+        """
+        job_id = response['thread_job']
+        stdout = response.get('stdout') or ''
+        while True:
+            if stdout and not silent:
+                self.send_response(self.iopub_socket, 'stream', {
+                    'name': 'stdout',
+                    'text': stdout,
+                })
+            reply  = self._call_maya('_jupyter_thread_poll', job_id)
+            stdout = reply.get('stdout') or ''
+            if reply.get('done', True):     # no 'done' = transport error
+                break
+            time.sleep(self.thread_poll_interval)
+
+        # Keep the cell's own scene changes / widgets from the first reply.
+        for key in ('scene_changes', 'comm_opens'):
+            if key in response:
+                reply.setdefault(key, response[key])
+        reply['stdout'] = stdout
+        return reply
+
+    # -------------------------------------------------------------------------
+    # Kernel-side magics: %maya_put / %maya_get / %maya_stats
+    # -------------------------------------------------------------------------
+
+    def _magic_stats(self, args: list) -> dict:
+        """
+        %maya_stats               last cell's phase breakdown + session totals
+        %maya_stats --prometheus  the raw metrics, as the HTTP endpoint serves them
+        %maya_stats --reset       clear the counters and histograms
+        """
+        if args == ['--reset']:
+            self.metrics.reset()
+            return {'stdout': '[maya_jupyter] metrics reset\n', 'result': None, 'error': None}
+        if args == ['--prometheus']:
+            return {'stdout': self.metrics.render(), 'result': None, 'error': None}
+        if args:
+            return {'stdout': '', 'result': None,
+                    'error': 'ValueError: usage: %maya_stats [--prometheus | --reset]'}
+        return {'stdout': _format_stats(self._last_cell, self.metrics), 'result': None, 'error': None}
+
+    def _record_cell(self, started: float, response: dict, call) -> None:
+        """Metrics for one executed cell; ``call`` is its _jupyter_exec call."""
+        seconds = time.perf_counter() - started
+        m = self.metrics
+        m.inc('maya_jupyter_cells_total')
+        if response.get('error'):
+            m.inc('maya_jupyter_cell_errors_total')
+        m.observe('maya_jupyter_cell_seconds', seconds)
+        maya_timing = response.get('timing') or {}
+        for phase, value in maya_timing.items():
+            m.observe('maya_jupyter_phase_seconds', value, side='maya', phase=phase[:-2])
+        if call is not None:
+            self._last_cell = {
+                'execution_count': self.execution_count,
+                'seconds':         seconds,
+                'kernel':          call['kernel'],
+                'maya':            maya_timing,
+                'bytes_out':       call['bytes_out'],
+                'bytes_in':        call['bytes_in'],
+            }
+
+    def _run_kernel_magic(self, code: str):
+        """
+        Run ``%maya_put`` / ``%maya_get`` / ``%maya_stats`` and return a reply
+        shaped like ``_send_to_maya``'s, or None if ``code`` is not one of them.
+
+            %maya_put <local path> <path in Maya> [--chunk KiB] [--max-rate MB/s]
+            %maya_get <path in Maya> <local path> [--chunk KiB] [--max-rate MB/s]
+
+        Relative Maya paths resolve against Maya's working directory.
+        """
+        stripped = code.strip()
+        if not stripped.startswith('%') or stripped.startswith('%%') or '\n' in stripped:
+            return None
+        name, _, arg_text = stripped[1:].partition(' ')
+        if name == 'maya_stats':
+            return self._magic_stats(arg_text.split())
+        if name not in ('maya_put', 'maya_get'):
+            return None
+
+        try:
+            tokens = shlex.split(arg_text, posix=(os.name != 'nt'))
+            options = {'chunk_size': self.transfer_chunk_kib * 1024,
+                       'max_rate':   self.transfer_max_rate * 1e6 or None}
+            paths = []
+            while tokens:
+                token = tokens.pop(0)
+                if token == '--chunk':
+                    options['chunk_size'] = int(float(tokens.pop(0)) * 1024)
+                elif token == '--max-rate':
+                    options['max_rate'] = float(tokens.pop(0)) * 1e6 or None
+                else:
+                    paths.append(os.path.expanduser(token.strip('"\'')))
+            if len(paths) != 2:
+                raise ValueError(f'usage: %{name} <source> <destination> [--chunk KiB] [--max-rate MB/s]')
+            if options['chunk_size'] <= 0:
+                raise ValueError('--chunk must be positive')
+
+            if name == 'maya_put':
+                summary = transfer.put(self._call_maya, paths[0], paths[1], **options)
+            else:
+                summary = transfer.get(self._call_maya, paths[0], paths[1], **options)
+        except (IndexError, ValueError, OSError, transfer.TransferError) as exc:
+            return {'stdout': '', 'result': None,
+                    'error': f'{type(exc).__name__}: {exc}'}
+
+        seconds = max(summary['seconds'], 1e-9)
+        stdout  = (
+            f"[maya_jupyter] {summary['path']}: {summary['bytes'] / 1e6:.1f} MB, "
+            f"sent {summary['sent'] / 1e6:.1f} MB in {seconds:.2f}s "
+            f"({summary['sent'] / 1e6 / seconds:.1f} MB/s)"
+        )
+        if summary['resumed_from']:
+            stdout += f", resumed at {summary['resumed_from'] / 1e6:.1f} MB"
+        return {'stdout': stdout + '\n', 'result': None, 'error': None}
+
     # -------------------------------------------------------------------------
     # Jupyter kernel protocol — the one method we really need to implement
     # -------------------------------------------------------------------------
@@ -347,10 +1130,39 @@ class MayaKernel(Kernel):
                 'user_expressions': {},
             }
 
-        response = self._send_to_maya(code)
+        started   = time.perf_counter()
+        exec_call = None
+
+        # Magics that need the notebook host's filesystem run here, in the
+        # kernel; every other magic is handled inside Maya.
+        response = self._run_kernel_magic(code)
+
+        if response is None:
+            if self.sync_local_modules:
+                sync_error = self._sync_modules(code)
+                if sync_error and not silent:
+                    self.send_response(self.iopub_socket, 'stream', {
+                        'name': 'stderr',
+                        'text': sync_error + '\n',
+                    })
+
+            exec_call = {}
+            response = self._send_to_maya(
+                code,
+                record=exec_call,
+                track_changes=self.report_scene_changes,
+                undo_chunk=self.undo_chunk_per_cell,
+                execution_count=self.execution_count,
+                session=self.session.session,
+            )
+
+        # %%maya_thread: the cell is running in a Maya worker thread; poll
+        # until it finishes.  Its reply then stands in for this one.
+        if response.get('thread_job'):
+            response = self._wait_thread_job(response, silent)
 
         stdout = response.get('stdout') or ''
-        result = response.get('result')    # repr() string, or None
+        result = response.get('result')    # text/plain string, or None
         error  = response.get('error')    # traceback string, or None
 
         # --- Relay output to JupyterLab (skipped when silent=True) ----------
@@ -363,16 +1175,35 @@ class MayaKernel(Kernel):
                     'text': stdout,
                 })
 
-            # 2. Execute result — the repr() of an expression's return value.
+            # 2. Execute result — the expression's value as a MIME bundle.
             #    Only present when the cell was a single evaluable expression
             #    (eval path in _jupyter_exec).  Statements produce result=None.
-            if result is not None:
+            #    The bundle is forwarded unchanged; older maya_init.py
+            #    versions only send the repr() string, so fall back to that.
+            data = response.get('data')
+            if data is None and result is not None:
+                data = {'text/plain': result}
+            if data:
                 self.send_response(self.iopub_socket, 'execute_result', {
                     'execution_count': self.execution_count,
-                    'data':            {'text/plain': result},
+                    'data':            data,
                     'metadata':        {},
                 })
 
+            # 3. Scene change report, when report_scene_changes is on.
+            changes = response.get('scene_changes')
+            if changes:
+                self.send_response(self.iopub_socket, 'display_data', {
+                    'data': {
+                        'text/plain':       _format_scene_changes(changes),
+                        'application/json': changes,
+                    },
+                    'metadata': {},
+                })
+
+            # 4. Widgets created by the cell (maya_slider() etc.).
+            self._open_widget_comms(response.get('comm_opens') or [])
+
             # --- Future rich output hook ------------------------------------
             # When _jupyter_exec() is extended to capture display() calls,
             # uncomment this block to relay them to JupyterLab:
@@ -383,6 +1214,9 @@ class MayaKernel(Kernel):
             #         'metadata': item.get('metadata', {}),
             #     })
 
+        if exec_call is not None:
+            self._record_cell(started, response, exec_call)
+
         # --- Error handling -------------------------------------------------
         # Note: stdout is shown BEFORE the error.  A cell that prints something
         # and then raises an exception correctly shows both the output and the
@@ -415,9 +1249,17 @@ class MayaKernel(Kernel):
 
     def do_shutdown(self, restart):
         """
-        Clean shutdown.  Maya manages its own process, so we have nothing to
-        tear down on the kernel side.  The commandPort stays open in Maya.
+        Clean shutdown.  An interactive Maya manages its own process, so we
+        have nothing to tear down on the kernel side; the commandPort stays
+        open in Maya.  With the mayapy backend, the owned worker is stopped.
+        Any widget values still waiting for the flush timer are sent first.
         """
+        self._flush_widget_values()
+        # A headless worker's state belongs to this session: stop it.  Warm
+        # spares are left running for the next kernel to adopt.
+        if self._worker is not None:
+            self._pool.release(self._worker)
+            self._worker = None
         return {'status': 'ok', 'restart': restart}
 
 
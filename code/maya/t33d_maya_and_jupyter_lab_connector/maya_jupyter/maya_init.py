@@ -45,11 +45,13 @@ The fix: a wrapper function that captures stdout/stderr internally
 ------------------------------------------------------------------
 _jupyter_exec(code_b64) does the following inside Maya:
 
-  1. Saves sys.stdout and sys.stderr.
-  2. Replaces them with a StringIO buffer (capturing all print() output).
-  3. Executes the user's code (eval-then-exec pattern, mirroring IPython).
-  4. Restores sys.stdout and sys.stderr.
-  5. Returns a JSON string: {"stdout": "...", "result": "...", "error": "..."}
+  1. Points the current context's capture target at a StringIO buffer.
+     sys.stdout / sys.stderr are context-routed proxies installed once
+     (see "Output capture" below), so only this execution's print() output
+     lands in the buffer -- not that of Maya's or a tool's other threads.
+  2. Executes the user's code (eval-then-exec pattern, mirroring IPython).
+  3. Resets the capture target.
+  4. Returns a JSON string: {"stdout": "...", "result": "...", "error": "..."}
 
 The JSON string is the function's return value, which commandPort sends back
 to the kernel as its response.  No -echoOutput needed.  Both print output and
@@ -68,6 +70,19 @@ Execution model (eval-then-exec, like IPython)
 - Any other exception is caught and returned in the "error" field as a full
   formatted traceback string.
 
+Per-cell undo chunks
+--------------------
+Each cell runs inside one named undo chunk (``jupyter_cell_<N>``), so a cell
+that issues thousands of commands is still one Ctrl+Z.  ``%maya_undo_cell N``
+rolls the scene back to just before cell N in a single operation.
+
+Turbo cells
+-----------
+A cell starting with ``%%maya_turbo`` runs with viewport refresh suspended
+and, optionally, the evaluation manager paused/serialised (``--eval=``) and
+undo recording off (``--no-undo``).  Everything is restored even if the cell
+raises; the reply reports how long each subsystem was off.
+
 Namespace persistence
 ---------------------
 All code is executed in ``__main__.__dict__``, so variables and imports
@@ -75,10 +90,21 @@ persist across Jupyter cells exactly like a normal Python interactive session
 or Maya's own Script Editor.
 """
 
+import os
 import sys
 import io
 import json
+import time
+import uuid
 import base64
+import hashlib
+import reprlib
+import contextlib
+import contextvars
+import threading
+import importlib
+import importlib.abc
+import importlib.util
 import traceback as _traceback
 import __main__
 
@@ -89,12 +115,19 @@ import __main__
 JUPYTER_PORT = 7001  # Change this if you need a different port.
                      # Match with MAYA_KERNEL_PORT on the kernel side.
 
+# commandPort's own buffer defaults to 4096 characters, which truncates long
+# cells and every %maya_put / %maya_get chunk (a 256 KiB chunk is ~350 KB of
+# base64 on one line).  1 MiB fits chunks up to 512 KiB with room to spare;
+# keep transfer.MAX_CHUNK_SIZE on the kernel side in step with it.
+COMMAND_PORT_BUFFER_SIZE = 1 << 20
+
 # ---------------------------------------------------------------------------
 # Guard: this script must be executed inside Autodesk Maya
 # ---------------------------------------------------------------------------
 
 try:
     import maya.cmds as cmds
+    import maya.api.OpenMaya as om
 except ImportError:
     raise RuntimeError(
         "maya_init.py must be run inside Autodesk Maya's Script Editor, "
@@ -102,11 +135,1254 @@ except ImportError:
     )
 
 
+# ---------------------------------------------------------------------------
+# Main-thread helper
+# ---------------------------------------------------------------------------
+
+def _in_main_thread(fn, *args, **kwargs):
+    """
+    Call ``fn(*args, **kwargs)`` on Maya's main thread and return its result.
+
+    commandPort requests are already evaluated on the main thread, so in the
+    common case this is a plain call.  From any other thread the call is
+    marshalled through ``maya.utils.executeInMainThreadWithResult``, which is
+    the only safe way to touch ``maya.cmds`` / the API off the main thread.
+    """
+    if threading.current_thread() is threading.main_thread():
+        return fn(*args, **kwargs)
+    import maya.utils
+    return maya.utils.executeInMainThreadWithResult(fn, *args, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Output capture -- context-local, installed once
+# ---------------------------------------------------------------------------
+#
+# sys.stdout / sys.stderr are wrapped ONCE in _CaptureStream proxies around
+# whatever Maya had there (its Script Editor streams).  Each write looks up
+# _capture_target, a ContextVar: set, the text goes to that buffer; unset,
+# it goes to Maya's stream exactly as if the proxy were not there.  Nothing
+# swaps the process-wide streams per cell any more.
+#
+# A new thread starts with an empty context, so output from Maya's own
+# threads or a tool's background thread is never attributed to the cell
+# that happens to be running; a %%maya_thread job sets its own target in its
+# worker thread.  With no capture active a write costs one ContextVar.get().
+
+_capture_target = contextvars.ContextVar('maya_jupyter_capture', default=None)
+
+
+class _CaptureStream(object):
+    """sys.stdout / sys.stderr proxy routed by ``_capture_target``."""
+
+    # Running this file again defines a new class (and a new _capture_target),
+    # so isinstance() no longer recognises the old proxies; this marker does.
+    _maya_jupyter_capture = True
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def write(self, text):
+        target = _capture_target.get()
+        if target is None:
+            return self.fallback.write(text)
+        return target.write(text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        target = _capture_target.get()
+        if target is None:
+            return self.fallback.flush()
+        return target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.fallback, name)
+
+
+def _capture_stream(stream):
+    """``stream`` wrapped in this run's _CaptureStream, unwrapping older runs' proxies."""
+    if type(stream) is _CaptureStream:
+        return stream
+    while getattr(type(stream), '_maya_jupyter_capture', False):
+        stream = stream.fallback
+    return _CaptureStream(stream)
+
+
+def _install_capture_streams():
+    """
+    Wrap sys.stdout / sys.stderr in _CaptureStream.  Idempotent and cheap, so
+    it is also called per cell, re-wrapping if something replaced the
+    streams since (Maya does when the Script Editor is rebuilt).  Proxies
+    left by an earlier run of this file are replaced, not wrapped again.
+    """
+    sys.stdout = _capture_stream(sys.stdout)
+    sys.stderr = _capture_stream(sys.stderr)
+
+
+@contextlib.contextmanager
+def _captured(target):
+    """Send this context's stdout/stderr writes to ``target`` (None = Maya's)."""
+    token = _capture_target.set(target)
+    try:
+        yield target
+    finally:
+        _capture_target.reset(token)
+
+
+# ---------------------------------------------------------------------------
+# Comm bridge -- JupyterLab widgets bound to Maya attributes
+# ---------------------------------------------------------------------------
+#
+# Maya cannot talk to the JupyterLab frontend directly; only the kernel
+# process can.  So widgets are split in two:
+#
+#   Maya side (here)  -- remembers which comm_id drives which attribute, and
+#                        queues a "comm_open" description that rides back to
+#                        the kernel on the next _jupyter_exec reply.
+#   Kernel side       -- opens the real Jupyter comm with the frontend,
+#                        coalesces slider drags to the latest value per
+#                        frame interval, and forwards each batch here via
+#                        _jupyter_comm_apply().
+#
+# The widget state follows the ipywidgets 8 protocol (@jupyter-widgets/
+# controls 2.0.0), so JupyterLab's stock widget manager renders it.  The
+# ipywidgets Python package is NOT needed on either side.
+
+_WIDGET_PROTOCOL_VERSION = '2.1.0'
+_WIDGET_VIEW_MIMETYPE    = 'application/vnd.jupyter.widget-view+json'
+
+_comm_outbox   = []   # comm_open descriptions waiting for the next reply
+_comm_bindings = {}   # comm_id -> 'node.attr'
+
+
+class _MayaAttrWidget(object):
+    """Handle returned by ``maya_slider()``; the slider is already displayed."""
+
+    def __init__(self, comm_id, attr):
+        self.comm_id = comm_id
+        self.attr    = attr
+
+    def close(self):
+        """Unbind the widget.  Later drags from the frontend are ignored."""
+        _comm_bindings.pop(self.comm_id, None)
+
+    def __repr__(self):
+        return f'<maya_slider {self.attr} comm_id={self.comm_id}>'
+
+
+def maya_slider(attr, min=0.0, max=1.0, step=None, description=None):
+    """
+    Display a FloatSlider in the notebook that drives ``attr`` in Maya.
+
+    Call this from a notebook cell, e.g. ``maya_slider('pCube1.tx', -10, 10)``.
+    Drags are throttled by the kernel and applied with the undo queue
+    suspended, so interactive tuning leaves no undo entries behind.
+    """
+    comm_id = uuid.uuid4().hex
+    value   = cmds.getAttr(attr)
+    if step is None:
+        step = (max - min) / 100.0
+
+    state = {
+        '_model_module':         '@jupyter-widgets/controls',
+        '_model_module_version': '2.0.0',
+        '_model_name':           'FloatSliderModel',
+        '_view_module':          '@jupyter-widgets/controls',
+        '_view_module_version':  '2.0.0',
+        '_view_name':            'FloatSliderView',
+        '_dom_classes':          [],
+        'behavior':              'drag-tap',
+        'continuous_update':     True,
+        'description':           description if description is not None else attr,
+        'disabled':              False,
+        'max':                   float(max),
+        'min':                   float(min),
+        'orientation':           'horizontal',
+        'readout':               True,
+        'readout_format':        '.3f',
+        'step':                  float(step),
+        'value':                 float(value),
+    }
+
+    _comm_bindings[comm_id] = attr
+    _comm_outbox.append({
+        'comm_id':     comm_id,
+        'target_name': 'jupyter.widget',
+        'data':        {'state': state, 'buffer_paths': []},
+        'metadata':    {'version': _WIDGET_PROTOCOL_VERSION},
+        'display':     {
+            _WIDGET_VIEW_MIMETYPE: {
+                'version_major': 2,
+                'version_minor': 0,
+                'model_id':      comm_id,
+            },
+            'text/plain': f'maya_slider({attr!r})',
+        },
+    })
+    return _MayaAttrWidget(comm_id, attr)
+
+
+def _apply_widget_values(updates):
+    """Apply ``{comm_id: value}`` with the undo queue suspended."""
+    applied = 0
+    errors  = []
+    undo_was_on = cmds.undoInfo(query=True, state=True)
+    # stateWithoutFlush keeps the existing undo history intact -- we only
+    # stop *recording*, so a drag cannot push hundreds of setAttr entries.
+    cmds.undoInfo(stateWithoutFlush=False)
+    try:
+        for comm_id, value in updates.items():
+            attr = _comm_bindings.get(comm_id)
+            if attr is None:
+                continue
+            try:
+                cmds.setAttr(attr, value)
+                applied += 1
+            except Exception as exc:
+                errors.append(f'{attr}: {exc}')
+    finally:
+        cmds.undoInfo(stateWithoutFlush=undo_was_on)
+    return applied, errors
+
+
+def _jupyter_comm_apply(updates_b64: str) -> str:
+    """
+    Apply one coalesced batch of widget values sent by the kernel.
+
+    ``updates_b64`` is base64 JSON of ``{comm_id: latest_value}``; the kernel
+    has already dropped every intermediate value from the frame interval.
+    """
+    try:
+        updates = json.loads(base64.b64decode(updates_b64.encode('ascii')))
+    except Exception as exc:
+        return json.dumps({'applied': 0, 'error': f'Bad comm payload: {exc}'})
+    applied, errors = _in_main_thread(_apply_widget_values, updates)
+    return json.dumps({
+        'applied': applied,
+        'error':   '\n'.join(errors) if errors else None,
+    })
+
+
+def _jupyter_comm_close(comm_id: str) -> str:
+    """Forget a widget binding after the frontend closed its comm."""
+    _comm_bindings.pop(comm_id, None)
+    return json.dumps({'closed': comm_id})
+
+
+def _take_comm_outbox():
+    """Pop all queued comm_open descriptions (and their display items)."""
+    opens = list(_comm_outbox)
+    del _comm_outbox[:]
+    return opens
+
+
+# ---------------------------------------------------------------------------
+# Per-cell scene change report (DG callbacks)
+# ---------------------------------------------------------------------------
+
+class _SceneChangeRecorder(object):
+    """
+    Record what a cell touched using DG callbacks armed only for the cell.
+
+    Diffing ``cmds.ls()`` before and after costs O(scene) twice per cell.
+    Here the work is done by callbacks, so the cost scales with what changed:
+
+    - ``MDGMessage`` node added / removed   -- scene-wide, one call per node.
+    - ``MDGMessage`` connection made/broken -- scene-wide, one call per plug.
+    - ``MNodeMessage`` attribute changed    -- per node, armed on the nodes
+      selected when the cell starts (what most tool cells operate on), on
+      nodes the cell selects and on nodes created by the cell itself.
+      Arming it on every node would put the O(scene) cost right back.
+
+    So created / deleted nodes and connections are complete, but changed
+    plugs are not: ``cmds.setAttr('pCube1.tx', 5)`` on a node that was never
+    selected or created during the cell is not seen.  The summary says so
+    (``plug_scope``) and the kernel prints that next to the plug count.
+
+    Changed plugs go into a set, so a loop setting the same attribute ten
+    thousand times reports it once.
+    """
+
+    MAX_LISTED = 200   # longer lists are truncated; the counts stay exact
+
+    def __init__(self):
+        self._callback_ids = []
+        self._created      = {}      # MObjectHandle hash -> MObjectHandle
+        self._deleted      = []
+        self._plugs        = set()
+        self._watched      = set()   # MObjectHandle hashes with attr callbacks
+
+    def __enter__(self):
+        self._callback_ids.append(
+            om.MDGMessage.addNodeAddedCallback(self._on_added, 'dependNode'))
+        self._callback_ids.append(
+            om.MDGMessage.addNodeRemovedCallback(self._on_removed, 'dependNode'))
+        self._callback_ids.append(
+            om.MDGMessage.addConnectionCallback(self._on_connection))
+        self._callback_ids.append(
+            om.MEventMessage.addEventCallback('SelectionChanged', self._on_selection))
+
+        self._watch_selection()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._callback_ids:
+            om.MMessage.removeCallbacks(self._callback_ids)
+        self._callback_ids = []
+        return False
+
+    # --- callbacks ----------------------------------------------------------
+
+    def _watch(self, node):
+        key = om.MObjectHandle(node).hashCode()
+        if key in self._watched:
+            return
+        self._watched.add(key)
+        self._callback_ids.append(
+            om.MNodeMessage.addAttributeChangedCallback(node, self._on_attr))
+
+    def _watch_selection(self):
+        selection = om.MGlobal.getActiveSelectionList()
+        for i in range(selection.length()):
+            self._watch(selection.getDependNode(i))
+
+    def _on_selection(self, client_data):
+        self._watch_selection()
+
+    def _on_added(self, node, client_data):
+        handle = om.MObjectHandle(node)
+        self._created[handle.hashCode()] = handle
+        self._watch(node)
+
+    def _on_removed(self, node, client_data):
+        key = om.MObjectHandle(node).hashCode()
+        if self._created.pop(key, None) is not None:
+            return   # created and deleted inside the same cell: net no-op
+        self._deleted.append(om.MFnDependencyNode(node).name())
+
+    def _on_attr(self, msg, plug, other_plug, client_data):
+        if msg & (om.MNodeMessage.kAttributeSet
+                  | om.MNodeMessage.kConnectionMade
+                  | om.MNodeMessage.kConnectionBroken):
+            self._plugs.add(plug.name())
+
+    def _on_connection(self, src_plug, dst_plug, made, client_data):
+        self._plugs.add(dst_plug.name())
+
+    # --- report -------------------------------------------------------------
+
+    def summary(self):
+        created = [
+            om.MFnDependencyNode(h.object()).name()
+            for h in self._created.values() if h.isValid()
+        ]
+        plugs = sorted(self._plugs)
+        cap   = self.MAX_LISTED
+        return {
+            'created':       created[:cap],
+            'deleted':       self._deleted[:cap],
+            'changed_plugs': plugs[:cap],
+            # Plugs are only tracked on the nodes armed above, not scene-wide.
+            'plug_scope':    'selected or created nodes',
+            'counts': {
+                'created':       len(created),
+                'deleted':       len(self._deleted),
+                'changed_plugs': len(plugs),
+            },
+        }
+
+
+class _NullRecorder(object):
+    """Stand-in used when change tracking is off: no callbacks, no cost."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def summary(self):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Per-cell undo chunks and one-shot rollback
+# ---------------------------------------------------------------------------
+#
+# Each cell runs inside its own named undo chunk, so however many commands
+# it issues, Maya's undo queue gains ONE entry per cell.  _undo_cells keeps
+# the chunk boundaries in execution order so ``%maya_undo_cell N`` can walk
+# the queue back to just before cell N without guessing how many Ctrl+Z
+# presses that takes.
+#
+# Execution counts restart with the kernel but Maya (and this list) does
+# not, so entries carry the kernel's session id: after a restart, cell 3
+# means the new session's cell 3, never the old one's.
+
+_undo_cells = []     # [(kernel session, execution_count, chunk_name)], oldest first
+
+# Duration of the most recent scene open/new, for comparing a rollback with
+# the alternative of reloading the scene.  Filled by MSceneMessage callbacks.
+_scene_load_timing = {'started': None, 'seconds': None}
+# Kept on __main__ so running this file again finds and removes the
+# callbacks the previous run registered.
+_scene_callback_ids = getattr(__main__, '_jupyter_scene_callback_ids', [])
+__main__._jupyter_scene_callback_ids = _scene_callback_ids
+
+
+class _CellUndoChunk(object):
+    """Wrap one cell in a named undo chunk and remember its boundary."""
+
+    def __init__(self, execution_count, session=None):
+        self.execution_count = execution_count
+        self.session         = session
+        self.chunk_name      = f'jupyter_cell_{execution_count}'
+        if session:
+            self.chunk_name += '_' + session[:8]
+        self._open           = False
+
+    def __enter__(self):
+        if self.execution_count is not None and cmds.undoInfo(query=True, state=True):
+            cmds.undoInfo(openChunk=True, chunkName=self.chunk_name)
+            self._open = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self._open:
+            return False
+        # Always close, even on error -- an unclosed chunk breaks the undo
+        # queue for the rest of the session.
+        cmds.undoInfo(closeChunk=True)
+        # Maya drops empty chunks; only record cells that left an entry.
+        if cmds.undoInfo(query=True, undoName=True) == self.chunk_name:
+            _undo_cells.append((self.session, self.execution_count, self.chunk_name))
+        return False
+
+
+def _undo_cell(execution_count, session=None):
+    """
+    Undo everything back to just before cell ``execution_count`` ran.
+
+    Walks the undo queue newest-first, calling ``cmds.undo()`` once per
+    entry, until cell N's chunk has been undone.  Entries that are not
+    notebook chunks (edits made by hand in Maya after cell N) are undone too,
+    since they sit on top of cell N in the queue; they are counted in the
+    report.  Viewport refresh is suspended for the walk.
+
+    Only chunks of kernel ``session`` count as cell N; chunks newer than it
+    are undone whichever session they came from.
+    """
+    first = next(
+        (i for i, entry in enumerate(_undo_cells)
+         if entry[0] == session and entry[1] >= execution_count),
+        None,
+    )
+    if first is None:
+        raise ValueError(
+            f'No undo chunk recorded for cell {execution_count} or later in this '
+            f'kernel session (cells that changed nothing undoable leave no chunk).'
+        )
+    target_name = _undo_cells[first][2]
+    chunk_names = {entry[2] for entry in _undo_cells[first:]}
+
+    started  = time.perf_counter()
+    undone   = 0
+    foreign  = 0
+    reached  = False
+    cmds.refresh(suspend=True)
+    try:
+        while True:
+            name = cmds.undoInfo(query=True, undoName=True)
+            if not name:
+                break   # queue exhausted (flushed, or undo limit reached)
+            cmds.undo()
+            undone += 1
+            if name not in chunk_names:
+                foreign += 1
+            if name == target_name:
+                reached = True
+                break
+    finally:
+        cmds.refresh(suspend=False)
+        cmds.refresh()
+    seconds = time.perf_counter() - started
+
+    # Forget the chunks we rolled back; a redo does not re-record them.
+    del _undo_cells[first:]
+
+    if not reached:
+        raise RuntimeError(
+            f'Undo queue ran out after {undone} step(s) before reaching cell '
+            f'{execution_count}; the queue may have been flushed or hit its limit.'
+        )
+
+    report = {
+        'cell':               execution_count,
+        'undo_steps':         undone,
+        'foreign_steps':      foreign,
+        'rollback_seconds':   seconds,
+        'scene_open_seconds': _scene_load_timing['seconds'],
+    }
+    reload_text = (
+        f"{report['scene_open_seconds']:.2f}s"
+        if report['scene_open_seconds'] is not None
+        else 'not measured this session'
+    )
+    print(
+        f'[maya_jupyter] Rolled back to before cell {execution_count}: '
+        f'{undone} undo step(s) ({foreign} not from the notebook) in '
+        f'{seconds:.3f}s.  Last scene open took {reload_text}.'
+    )
+    return report
+
+
+def _on_scene_open_started(client_data=None):
+    _scene_load_timing['started'] = time.perf_counter()
+
+
+def _on_scene_open_finished(client_data=None):
+    started = _scene_load_timing['started']
+    if started is not None:
+        _scene_load_timing['seconds'] = time.perf_counter() - started
+        _scene_load_timing['started'] = None
+    # A new scene starts with a fresh undo queue; old boundaries are stale.
+    del _undo_cells[:]
+
+
+def _install_scene_callbacks():
+    """(Re)register the MSceneMessage callbacks that time scene opens."""
+    if _scene_callback_ids:
+        om.MMessage.removeCallbacks(_scene_callback_ids)
+        del _scene_callback_ids[:]
+    for before, after in ((om.MSceneMessage.kBeforeOpen, om.MSceneMessage.kAfterOpen),
+                          (om.MSceneMessage.kBeforeNew,  om.MSceneMessage.kAfterNew)):
+        _scene_callback_ids.append(om.MSceneMessage.addCallback(before, _on_scene_open_started))
+        _scene_callback_ids.append(om.MSceneMessage.addCallback(after,  _on_scene_open_finished))
+
+
+# ---------------------------------------------------------------------------
+# Magics handled inside Maya
+# ---------------------------------------------------------------------------
+#
+#   %name args          -- line magic: the whole cell is one line.
+#   %%name args\n body  -- cell magic: the first line picks a cell mode and
+#                          the rest of the cell is ordinary Python.
+#
+# Magics that only need kernel-side state are intercepted by kernel.py and
+# never reach Maya.
+
+def _magic_undo_cell(args, options):
+    """%maya_undo_cell N -- roll the scene back to before cell N."""
+    try:
+        execution_count = int(args.split()[0])
+    except (IndexError, ValueError):
+        raise ValueError('Usage: %maya_undo_cell N   (N = a cell execution count)')
+    _undo_cell(execution_count, options.get('session'))
+
+
+_TURBO_EVAL_MODES = {
+    'keep':   None,       # leave the evaluation manager alone
+    'pause':  'off',      # plain DG evaluation, no graph (re)builds
+    'serial': 'serial',   # EM graph, but single-threaded
+}
+
+
+def _parse_turbo_args(args):
+    """Parse ``[--eval=keep|pause|serial] [--no-undo]`` for %%maya_turbo."""
+    opts = {'eval': 'keep', 'no_undo': False}
+    for token in args.split():
+        if token == '--no-undo':
+            opts['no_undo'] = True
+        elif token.startswith('--eval='):
+            opts['eval'] = token.split('=', 1)[1]
+            if opts['eval'] not in _TURBO_EVAL_MODES:
+                raise ValueError(
+                    f"%%maya_turbo: --eval must be one of "
+                    f"{', '.join(sorted(_TURBO_EVAL_MODES))}, not {opts['eval']!r}"
+                )
+        else:
+            raise ValueError(
+                f'%%maya_turbo: unknown option {token!r}.  '
+                f'Usage: %%maya_turbo [--eval=keep|pause|serial] [--no-undo]'
+            )
+    return opts
+
+
+def _magic_turbo(args, body, options):
+    """
+    %%maya_turbo [--eval=keep|pause|serial] [--no-undo]
+
+    Run the cell with the expensive interactive subsystems switched off:
+
+    - viewport refresh is always suspended (one redraw at the end);
+    - ``--eval=pause`` drops the evaluation manager to DG mode, ``serial``
+      keeps the EM graph but single-threaded;
+    - ``--no-undo`` stops undo recording for the cell (the existing history
+      is kept, but the cell itself cannot be undone).
+
+    Every subsystem is restored in a ``finally`` block, newest first, so a
+    cell that raises still leaves Maya exactly as it found it.  How long each
+    one was off goes into the reply as ``"turbo"``.
+    """
+    opts     = _parse_turbo_args(args)
+    restores = []    # (subsystem, switched_off_at, restore_fn), oldest first
+
+    try:
+        cmds.refresh(suspend=True)
+        restores.append(('refresh', time.perf_counter(),
+                         lambda: cmds.refresh(suspend=False)))
+
+        em_mode = _TURBO_EVAL_MODES[opts['eval']]
+        if em_mode is not None:
+            old_mode = cmds.evaluationManager(query=True, mode=True)[0]
+            cmds.evaluationManager(mode=em_mode)
+            restores.append(('evaluation', time.perf_counter(),
+                             lambda: cmds.evaluationManager(mode=old_mode)))
+
+        if opts['no_undo']:
+            undo_was_on = cmds.undoInfo(query=True, state=True)
+            cmds.undoInfo(stateWithoutFlush=False)
+            restores.append(('undo', time.perf_counter(),
+                             lambda: cmds.undoInfo(stateWithoutFlush=undo_was_on)))
+            # Nothing will be recorded, so there is no chunk to open.
+            options = dict(options, undo_chunk=False)
+
+        return _run_cell_body(body, options)
+
+    finally:
+        timings  = {}
+        failures = []
+        for subsystem, started, restore in reversed(restores):
+            try:
+                restore()
+            except Exception as exc:
+                failures.append(f'{subsystem}: {exc}')
+            timings[subsystem] = time.perf_counter() - started
+        cmds.refresh()
+
+        _cell_reply['turbo'] = timings
+        print('[maya_jupyter] turbo: ' + ', '.join(
+            f'{name} off {seconds:.3f}s' for name, seconds in timings.items()
+        ))
+        if failures:
+            print('[maya_jupyter] turbo: FAILED to restore ' + '; '.join(failures))
+
+
+# ---------------------------------------------------------------------------
+# %%maya_thread -- run a cell in a worker thread, off Maya's main thread
+# ---------------------------------------------------------------------------
+#
+# For cells that crunch arrays already pulled out of Maya.  The cell is
+# submitted to a thread pool and _jupyter_exec returns at once with a job id;
+# the kernel then polls _jupyter_thread_poll(id) until it is done.  Between
+# polls Maya's main thread is idle, so the UI stays responsive and can run
+# the main(fn, ...) calls the cell makes for the few bits that need Maya:
+#
+#     %%maya_thread
+#     pts = np.asarray(main(get_points, 'pSphere1'))   # main thread
+#     pts = smooth(pts, iterations=200)                # worker thread, GIL-free numpy
+#     main(set_points, 'pSphere1', pts)                # main thread
+#
+# Output: the job sets its own capture target in its worker thread (see
+# "Output capture"), so its prints go to its own buffer -- never into
+# whichever cell happens to be running on the main thread -- and arrive with
+# the next poll.  main() carries that target across to the main thread.
+#
+# The cell runs in __main__ like any other, so it can share variables with
+# later cells; it is up to the cell not to race with them.  No undo chunk is
+# opened around it (cmds must not be called off the main thread anyway).
+
+_thread_jobs = {}    # job id -> _ThreadJob
+_thread_pool = None
+
+
+class _ThreadBuffer(object):
+    """Thread-safe text buffer; the poller takes what accumulated so far."""
+
+    def __init__(self):
+        self._lock  = threading.Lock()
+        self._parts = []
+
+    def write(self, text):
+        with self._lock:
+            self._parts.append(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        with self._lock:
+            text, self._parts = ''.join(self._parts), []
+        return text
+
+
+class _ThreadJob(object):
+
+    def __init__(self, code):
+        self.id      = uuid.uuid4().hex
+        self.code    = code
+        self.output  = _ThreadBuffer()
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.future  = None
+
+    def run(self):
+        try:
+            with _captured(self.output):
+                return _run_cell_code(self.code)
+        finally:
+            self.seconds = time.perf_counter() - self.started
+
+
+def main(fn, *args, **kwargs):
+    """
+    Call ``fn(*args, **kwargs)`` on Maya's main thread and return its result.
+
+    For ``%%maya_thread`` cells: wrap each maya.cmds / OpenMaya call (or a
+    small function doing several) in ``main(...)``.  Harmless on the main
+    thread, where it is a plain call.  Anything ``fn`` prints goes to the
+    caller's output, not to whatever the main thread is capturing.
+    """
+    target = _capture_target.get()
+
+    def call():
+        with _captured(target):
+            return fn(*args, **kwargs)
+    return _in_main_thread(call)
+
+
+def _magic_thread(args, body, options):
+    global _thread_pool
+    if args:
+        raise ValueError(f'%%maya_thread takes no arguments, got {args!r}')
+    if cmds.about(batch=True):
+        # mayapy has no idle loop to service main() calls from other
+        # threads, so a job could deadlock; run it in place instead.
+        print('[maya_jupyter] %%maya_thread: batch mode, running on the main thread')
+        return _run_cell_code(body)
+
+    if _thread_pool is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _thread_pool = ThreadPoolExecutor(thread_name_prefix='maya_jupyter')
+
+    job = _ThreadJob(body)
+    job.future = _thread_pool.submit(job.run)
+    _thread_jobs[job.id] = job
+    _cell_reply['thread_job'] = job.id
+    return None
+
+
+def _jupyter_thread_poll(job_id: str) -> str:
+    """
+    Report on a ``%%maya_thread`` job: output printed since the last poll,
+    and once ``done``, the cell's result / error like ``_jupyter_exec``.
+    """
+    job = _thread_jobs.get(job_id)
+    if job is None:
+        return json.dumps({'done': True, 'stdout': '', 'result': None,
+                           'error': f'Unknown %%maya_thread job {job_id!r}'})
+    if not job.future.done():
+        return json.dumps({'done': False, 'stdout': job.output.take()})
+
+    del _thread_jobs[job_id]
+    result = error = None
+    try:
+        result = job.future.result()
+    except BaseException:
+        error = _traceback.format_exc()
+    # Serialise here, on the main thread: some serializers touch the API.
+    data = _result_bundle(result)
+    return json.dumps({
+        'done':    True,
+        'stdout':  job.output.take(),
+        'result':  data['text/plain'] if data else None,
+        'data':    data,
+        'error':   error,
+        'seconds': job.seconds,
+    })
+
+
+_LINE_MAGICS = {
+    'maya_undo_cell': _magic_undo_cell,
+}
+
+_CELL_MAGICS = {
+    'maya_turbo':  _magic_turbo,
+    'maya_thread': _magic_thread,
+}
+
+# Extra reply fields set by magics during a cell (e.g. "turbo" timings).
+# _jupyter_exec clears it before the cell and merges it into the JSON after.
+_cell_reply = {}
+
+
+def _split_magic(code):
+    """
+    Return ``(kind, name, args, body)`` if ``code`` starts with a magic,
+    else None.  ``kind`` is 'line' or 'cell'.
+    """
+    stripped = code.lstrip()
+    if stripped.startswith('%%'):
+        first, _, body = stripped[2:].partition('\n')
+        name, _, args = first.strip().partition(' ')
+        return 'cell', name, args.strip(), body
+    if stripped.startswith('%') and '\n' not in stripped.strip():
+        name, _, args = stripped[1:].strip().partition(' ')
+        return 'line', name, args.strip(), ''
+    return None
+
+
+def _run_magic(kind, name, args, body, options):
+    table = _CELL_MAGICS if kind == 'cell' else _LINE_MAGICS
+    handler = table.get(name)
+    if handler is None:
+        prefix = '%%' if kind == 'cell' else '%'
+        known  = ', '.join(prefix + n for n in sorted(table)) or 'none'
+        raise NameError(f'Unknown magic {prefix}{name} (known: {known})')
+    if kind == 'cell':
+        return handler(args, body, options)
+    return handler(args, options)
+
+
+# Per-execution phase timings (compile_s / exec_s) that _run_cell_code adds
+# to; set by _jupyter_exec.  Unset in %%maya_thread jobs, which are not timed.
+_phase_timing = contextvars.ContextVar('maya_jupyter_phase_timing', default=None)
+
+
+@contextlib.contextmanager
+def _timed_phases(timing):
+    token = _phase_timing.set(timing)
+    try:
+        yield timing
+    finally:
+        _phase_timing.reset(token)
+
+
+def _run_cell_code(code):
+    """
+    Eval-then-exec ``code`` in __main__, like IPython.
+
+    compile() with mode='eval' raises SyntaxError for statements, so we use
+    that as the branch condition rather than guessing.  Returns the
+    expression value, or None for statements.
+    """
+    started = time.perf_counter()
+    try:
+        compiled, is_expression = compile(code, '<jupyter-cell>', 'eval'), True
+    except SyntaxError:
+        compiled, is_expression = compile(code, '<jupyter-cell>', 'exec'), False
+    compiled_at = time.perf_counter()
+
+    timing = _phase_timing.get()
+    try:
+        if is_expression:
+            return eval(compiled, vars(__main__))
+        exec(compiled, vars(__main__))  # noqa: S102
+        return None
+    finally:
+        if timing is not None:
+            timing['compile_s'] += compiled_at - started
+            timing['exec_s']    += time.perf_counter() - compiled_at
+
+
+def _run_cell_body(code, options):
+    """Run ordinary cell code inside the cell's undo chunk."""
+    execution_count = options.get('execution_count') if options.get('undo_chunk') else None
+    with _CellUndoChunk(execution_count, options.get('session')):
+        return _run_cell_code(code)
+
+
+# ---------------------------------------------------------------------------
+# Structured results -- MIME bundles instead of repr()-only strings
+# ---------------------------------------------------------------------------
+#
+# A cell's value goes back as a Jupyter MIME bundle:
+#
+#   "application/json" -- when the value (after the conversions below) is
+#                         JSON-able, so the notebook gets real data back
+#                         instead of having to literal_eval a huge repr();
+#   "text/plain"       -- always; a size-capped reprlib view for JSON-able
+#                         values, the full repr() for everything else.
+#
+# Conversions are looked up by exact type in _RESULT_SERIALIZERS, then by
+# isinstance() in registration order.  Each serializer returns something
+# json.dumps() can handle (it may contain values that need converting too).
+
+_RESULT_SERIALIZERS = {}
+
+_plain_repr = reprlib.Repr()
+_plain_repr.maxlist   = 100
+_plain_repr.maxtuple  = 100
+_plain_repr.maxdict   = 50
+_plain_repr.maxstring = 2000
+_plain_repr.maxother  = 2000
+
+
+def register_result_serializer(type_, fn):
+    """
+    Teach ``_jupyter_exec`` how to send values of ``type_`` as JSON.
+
+    ``fn(value)`` must return a JSON-able value; nested values are converted
+    recursively.  Later registrations for the same type replace earlier ones.
+    """
+    _RESULT_SERIALIZERS[type_] = fn
+
+
+def _register_default_serializers():
+    vector3 = lambda v: [v.x, v.y, v.z]
+    for type_ in (om.MVector, om.MFloatVector):
+        register_result_serializer(type_, vector3)
+    for type_ in (om.MPoint, om.MFloatPoint):
+        register_result_serializer(type_, lambda p: [p.x, p.y, p.z, p.w])
+    for type_ in (om.MMatrix, om.MFloatMatrix):
+        # Row-major, 16 floats -- the same layout as cmds.xform(q=True, m=True).
+        register_result_serializer(type_, lambda m: [m.getElement(r, c)
+                                                     for r in range(4) for c in range(4)])
+    for type_ in (om.MVectorArray, om.MFloatVectorArray):
+        register_result_serializer(type_, lambda a: [[v.x, v.y, v.z] for v in a])
+    for type_ in (om.MPointArray, om.MFloatPointArray):
+        register_result_serializer(type_, lambda a: [[p.x, p.y, p.z] for p in a])
+    for type_ in (om.MIntArray, om.MDoubleArray, om.MFloatArray):
+        register_result_serializer(type_, list)
+    register_result_serializer(om.MDagPath, lambda d: d.fullPathName())
+    register_result_serializer(om.MObject,
+                               lambda o: om.MFnDependencyNode(o).name() if not o.isNull() else None)
+    # Node lists: cmds.ls() already returns plain strings; an
+    # MSelectionList becomes the same kind of list of names.
+    register_result_serializer(om.MSelectionList, lambda s: s.getSelectionStrings())
+
+
+class _NotJsonable(Exception):
+    pass
+
+
+def _jsonable(value, depth=0):
+    """Convert ``value`` to plain JSON types or raise _NotJsonable."""
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        # NaN / inf are not valid JSON; let those fall back to text/plain.
+        if value != value or value in (float('inf'), float('-inf')):
+            raise _NotJsonable()
+        return value
+    if depth > 32:
+        raise _NotJsonable()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v, depth + 1) for v in value]
+    if isinstance(value, dict):
+        return {
+            _dict_key(k): _jsonable(v, depth + 1)
+            for k, v in value.items()
+        }
+    fn = _RESULT_SERIALIZERS.get(type(value))
+    if fn is None:
+        for type_, candidate in _RESULT_SERIALIZERS.items():
+            if isinstance(value, type_):
+                fn = candidate
+                break
+    if fn is None:
+        raise _NotJsonable()
+    return _jsonable(fn(value), depth + 1)
+
+
+def _dict_key(key):
+    if isinstance(key, str):
+        return key
+    if isinstance(key, (int, float, bool)) or key is None:
+        return json.dumps(key)
+    raise _NotJsonable()
+
+
+def _result_bundle(result):
+    """Build the MIME bundle for a cell's value (None -> no bundle)."""
+    if result is None:
+        return None
+    try:
+        data = _jsonable(result)
+    except _NotJsonable:
+        return {'text/plain': repr(result)}
+    except Exception as exc:
+        # A serializer blew up; the cell itself succeeded, so fall back
+        # rather than turning it into an error.
+        return {'text/plain': f'{result!r}\n[maya_jupyter] JSON serializer failed: {exc}'}
+    return {
+        'text/plain':       _plain_repr.repr(result),
+        'application/json': data,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Module sync -- notebook-host modules served from memory
+# ---------------------------------------------------------------------------
+#
+# The kernel finds local modules a cell imports (modsync.py) and ships their
+# source here, keyed by content hash.  _SyncedModuleFinder sits at the front
+# of sys.meta_path and serves them from memory, so a stale copy on the T:
+# share or elsewhere on sys.path never wins.
+#
+# Two round trips, only when a cell imports local modules:
+#   _jupyter_sync_manifest({name: hash})   -> names whose hash we lack
+#   _jupyter_sync_push({name: description}) -> install, reload the changed
+
+class _SyncedModuleFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Meta-path finder + loader for modules synced from the notebook host."""
+
+    _maya_jupyter_finder = True    # recognised across runs of this file
+
+    def __init__(self):
+        self.modules = {}    # dotted name -> {'source', 'hash', 'is_package', 'path'}
+
+    def find_spec(self, fullname, path=None, target=None):
+        info = self.modules.get(fullname)
+        if info is None:
+            return None
+        return importlib.util.spec_from_loader(
+            fullname, self,
+            origin=info['path'],
+            is_package=info['is_package'],
+        )
+
+    def create_module(self, spec):
+        return None     # default module creation
+
+    def exec_module(self, module):
+        info = self.modules[module.__name__]
+        module.__file__ = info['path']
+        code = compile(info['source'], info['path'], 'exec')
+        exec(code, module.__dict__)  # noqa: S102
+
+    def get_source(self, fullname):
+        # Lets linecache show the right lines in tracebacks, even though the
+        # file path only exists on the notebook host.
+        info = self.modules.get(fullname)
+        return info['source'] if info else None
+
+
+_synced_modules = _SyncedModuleFinder()
+
+
+def _install_module_finder():
+    sys.meta_path[:] = [f for f in sys.meta_path
+                        if not getattr(type(f), '_maya_jupyter_finder', False)]
+    sys.meta_path.insert(0, _synced_modules)
+
+
+def _jupyter_sync_manifest(manifest_b64: str) -> str:
+    """Return the names from ``{name: hash}`` that are missing or out of date."""
+    manifest = json.loads(base64.b64decode(manifest_b64.encode('ascii')))
+    need = [
+        name for name, digest in manifest.items()
+        if _synced_modules.modules.get(name, {}).get('hash') != digest
+    ]
+    return json.dumps({'need': need})
+
+
+def _jupyter_sync_push(modules_b64: str) -> str:
+    """
+    Install new module sources and reload only those that changed.
+
+    Modules not imported yet are just registered; the cell's own ``import``
+    loads them.  Already-imported ones are reloaded parents first, so a
+    package's __init__ is fresh before its submodules re-run.
+    """
+    modules  = json.loads(base64.b64decode(modules_b64.encode('ascii')))
+    reloaded = []
+    errors   = []
+    for name in sorted(modules, key=lambda n: n.count('.')):
+        _synced_modules.modules[name] = modules[name]
+        module = sys.modules.get(name)
+        if module is None:
+            continue
+        if getattr(module, '__loader__', None) is not _synced_modules:
+            # Imported earlier from disk; re-point it at the synced source.
+            module.__spec__   = _synced_modules.find_spec(name)
+            module.__loader__ = _synced_modules
+        try:
+            importlib.reload(module)
+            reloaded.append(name)
+        except Exception:
+            errors.append(_traceback.format_exc())
+    return json.dumps({
+        'installed': sorted(modules),
+        'reloaded':  reloaded,
+        'error':     '\n'.join(errors) if errors else None,
+    })
+
+
+# ---------------------------------------------------------------------------
+# File transfer -- Maya side of %maya_put / %maya_get
+# ---------------------------------------------------------------------------
+#
+# See transfer.py for the protocol.  In short: fixed-size chunks, each with
+# its sha256; the receiver appends verified chunks to <dest>.part (whose
+# length is the resume point) next to a <dest>.part.json sidecar describing
+# the source; at the end the whole file is hashed and os.replace()d into
+# place.  Nothing here holds more than one chunk in memory.
+#
+# These run on Maya's main thread, so the whole-file hash is built up chunk
+# by chunk as the data passes through rather than by re-reading the file in
+# one go.  Only a transfer that did not pass every chunk through this Maya
+# session (a resumed one) falls back to reading the file at the end.
+
+def _b64json_arg(arg):
+    return json.loads(base64.b64decode(arg.encode('ascii')))
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_transfer_digests = {}     # (direction, path) -> [next offset, sha256, stamp]
+
+
+def _digest_feed(key, stamp, offset, data):
+    """Add the chunk at ``offset`` to the running hash for ``key``, if in sequence."""
+    if offset == 0:
+        _transfer_digests[key] = [0, hashlib.sha256(), stamp]
+    entry = _transfer_digests.get(key)
+    if entry is None or entry[0] != offset or entry[2] != stamp:
+        _transfer_digests.pop(key, None)      # out of sequence: hash at the end
+        return
+    entry[1].update(data)
+    entry[0] += len(data)
+
+
+def _digest_result(key, stamp, path):
+    """The sha256 of ``path``: the running hash if it covers the file, else read it."""
+    entry = _transfer_digests.pop(key, None)
+    if entry is not None and entry[2] == stamp and entry[0] == os.path.getsize(path):
+        return entry[1].hexdigest()
+    return _file_sha256(path)
+
+
+def _transfer_reply(fn, *args):
+    try:
+        return json.dumps(fn(*args))
+    except Exception:
+        return json.dumps({'error': _traceback.format_exc()})
+
+
+def _put_begin(request):
+    path    = os.path.abspath(os.path.expanduser(request['path']))
+    part    = path + '.part'
+    sidecar = part + '.json'
+    meta    = {k: request[k] for k in ('size', 'sha256', 'chunk_size')}
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as fh:
+            resumable = json.load(fh) == meta and os.path.exists(part)
+    except (OSError, ValueError):
+        resumable = False
+
+    if resumable:
+        # Drop a chunk that was only partly written when we were cut off.
+        offset = os.path.getsize(part) // meta['chunk_size'] * meta['chunk_size']
+        with open(part, 'r+b') as fh:
+            fh.truncate(offset)
+    else:
+        offset = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(sidecar, 'w', encoding='utf-8') as fh:
+            json.dump(meta, fh)
+        open(part, 'wb').close()
+    _transfer_digests.pop(('put', path), None)
+    return {'path': path, 'offset': offset}
+
+
+def _put_chunk(request, data_b64):
+    path = os.path.abspath(os.path.expanduser(request['path']))
+    part = path + '.part'
+    data = base64.b64decode(data_b64.encode('ascii'))
+    if hashlib.sha256(data).hexdigest() != request['sha256']:
+        raise ValueError(f"chunk at {request['offset']} failed its hash check")
+    have = os.path.getsize(part)
+    if request['offset'] > have:
+        return {'offset': have}     # a gap: tell the sender where to resume
+    # offset < have: the reply to an earlier attempt was lost; rewrite it.
+    with open(part, 'r+b') as fh:
+        fh.truncate(request['offset'])
+        fh.seek(request['offset'])
+        fh.write(data)
+    _digest_feed(('put', path), None, request['offset'], data)
+    return {'offset': request['offset'] + len(data)}
+
+
+def _put_end(request):
+    path = os.path.abspath(os.path.expanduser(request['path']))
+    part = path + '.part'
+    with open(part + '.json', 'r', encoding='utf-8') as fh:
+        meta = json.load(fh)
+    if _digest_result(('put', path), None, part) != meta['sha256']:
+        for leftover in (part, part + '.json'):
+            os.remove(leftover)
+        raise ValueError(f'{path}: content hash mismatch after transfer; run it again.')
+    os.replace(part, path)
+    os.remove(part + '.json')
+    return {'path': path}
+
+
+def _get_begin(request):
+    path = os.path.abspath(os.path.expanduser(request['path']))
+    st   = os.stat(path)
+    _transfer_digests.pop(('get', path), None)
+    return {'path': path, 'size': st.st_size, 'mtime': st.st_mtime}
+
+
+def _get_chunk(request):
+    path = os.path.abspath(os.path.expanduser(request['path']))
+    if os.stat(path).st_mtime != request['mtime']:
+        raise ValueError(f'{path} changed during the transfer')
+    with open(path, 'rb') as fh:
+        fh.seek(request['offset'])
+        data = fh.read(request['size'])
+    _digest_feed(('get', path), request['mtime'], request['offset'], data)
+    return {'data': base64.b64encode(data).decode('ascii'),
+            'sha256': hashlib.sha256(data).hexdigest()}
+
+
+def _get_end(request):
+    path = os.path.abspath(os.path.expanduser(request['path']))
+    if os.stat(path).st_mtime != request['mtime']:
+        raise ValueError(f'{path} changed during the transfer')
+    return {'path': path, 'sha256': _digest_result(('get', path), request['mtime'], path)}
+
+
+def _jupyter_put_begin(request_b64: str) -> str:
+    return _transfer_reply(_put_begin, _b64json_arg(request_b64))
+
+
+def _jupyter_put_chunk(request_b64: str, data_b64: str) -> str:
+    return _transfer_reply(_put_chunk, _b64json_arg(request_b64), data_b64)
+
+
+def _jupyter_put_end(request_b64: str) -> str:
+    return _transfer_reply(_put_end, _b64json_arg(request_b64))
+
+
+def _jupyter_get_begin(request_b64: str) -> str:
+    return _transfer_reply(_get_begin, _b64json_arg(request_b64))
+
+
+def _jupyter_get_chunk(request_b64: str) -> str:
+    return _transfer_reply(_get_chunk, _b64json_arg(request_b64))
+
+
+def _jupyter_get_end(request_b64: str) -> str:
+    return _transfer_reply(_get_end, _b64json_arg(request_b64))
+
+
 # ---------------------------------------------------------------------------
 # The core wrapper — installed into __main__ so it is callable from the socket
 # ---------------------------------------------------------------------------
 
-def _jupyter_exec(code_b64: str) -> str:
+def _jupyter_exec(code_b64: str, options_b64: str = '') -> str:
     """
     Execute base64-encoded Python code in Maya's __main__ namespace.
 
@@ -123,6 +1399,18 @@ def _jupyter_exec(code_b64: str) -> str:
         single quotes, double quotes, backslashes, and newlines — all of
         which would break the outer ``_jupyter_exec("...")`` call if the
         code were embedded as a raw string literal.
+    options_b64 : str
+        Optional base64 JSON dict of per-cell options from the kernel:
+
+        "track_changes" : bool -- arm _SceneChangeRecorder for the cell and
+                                  return its summary as "scene_changes".
+        "undo_chunk"      : bool -- wrap the cell in one named undo chunk
+                                    (see %maya_undo_cell).
+        "execution_count" : int  -- the cell's number, used to name the chunk.
+        "session"         : str  -- the kernel's session id; keeps cell
+                                    numbers from different kernel runs apart.
+        "sent_at"         : float -- kernel's time.time() when sending, for
+                                     the "queue_s" timing.
 
     Returns
     -------
@@ -131,10 +1419,23 @@ def _jupyter_exec(code_b64: str) -> str:
 
         "stdout"  : str        -- everything written to stdout / stderr
                                   during the cell's execution.
-        "result"  : str | null -- repr() of the expression's return value,
+        "result"  : str | null -- text/plain form of the expression's value,
                                   or null for statements / None results.
+        "data"    : dict | null -- MIME bundle for the value: "text/plain"
+                                  always, "application/json" when the value
+                                  is JSON-able (see _RESULT_SERIALIZERS).
         "error"   : str | null -- full formatted traceback if an exception
                                   was raised, or null on success.
+        "scene_changes" : dict | null -- created / deleted nodes and changed
+                                  plugs, when "track_changes" was requested.
+        "turbo"   : dict       -- only after %%maya_turbo: seconds each
+                                  suspended subsystem was off.
+        "comm_opens" : list   -- widgets created by the cell (see
+                                  maya_slider()); the kernel opens a Jupyter
+                                  comm and displays each one.
+        "timing"  : dict       -- seconds per phase: queue_s (only if the
+                                  kernel sent "sent_at"), decode_s,
+                                  compile_s, exec_s, serialize_s, total_s.
 
     Notes on future rich-output support
     ------------------------------------
@@ -149,6 +1450,9 @@ def _jupyter_exec(code_b64: str) -> str:
     to append items to a local list, then include that list in the JSON.
     """
 
+    entered_at = time.time()
+    started    = time.perf_counter()
+
     # --- Decode the cell code from base64 -----------------------------------
     try:
         code = base64.b64decode(code_b64.encode('ascii')).decode('utf-8')
@@ -158,58 +1462,164 @@ def _jupyter_exec(code_b64: str) -> str:
             'result': None,
             'error':  f'[maya_jupyter] Failed to base64-decode cell code: {exc}',
         })
+    try:
+        options = json.loads(base64.b64decode(options_b64.encode('ascii'))) if options_b64 else {}
+    except Exception as exc:
+        return json.dumps({
+            'stdout': '',
+            'result': None,
+            'error':  f'[maya_jupyter] Failed to decode cell options: {exc}',
+        })
 
-    # --- Redirect stdout and stderr to capture all print() output -----------
-    old_stdout = sys.stdout
-    old_stderr = sys.stderr
-    capture    = io.StringIO()
-    sys.stdout = capture
-    sys.stderr = capture
+    timing = {
+        'decode_s':  time.perf_counter() - started,
+        'compile_s': 0.0,
+        'exec_s':    0.0,
+    }
+    if options.get('sent_at'):
+        # Kernel send -> here: transfer plus waiting for the main thread.
+        # Only meaningful when both clocks agree (same host, or NTP).
+        timing['queue_s'] = max(0.0, entered_at - options['sent_at'])
+
+    recorder = _SceneChangeRecorder() if options.get('track_changes') else _NullRecorder()
+
+    # --- Capture this execution's print() output ---------------------------
+    # Only writes made in this context (this call, on this thread) reach
+    # ``capture``; see "Output capture" above.
+    _install_capture_streams()
+    capture = io.StringIO()
 
     result = None
     error  = None
 
-    try:
-        # --- eval path: single expressions (value is displayed in Jupyter) --
-        # compile() with mode='eval' raises SyntaxError for statements,
-        # so we use that as the branch condition rather than guessing.
+    _cell_reply.clear()
+
+    with _captured(capture), _timed_phases(timing):
         try:
-            result = eval(
-                compile(code, '<jupyter-cell>', 'eval'),
-                vars(__main__)
-            )
-        except SyntaxError:
-            # --- exec path: statements, multi-line blocks, definitions -------
-            exec(  # noqa: S102
-                compile(code, '<jupyter-cell>', 'exec'),
-                vars(__main__)
-            )
+            with recorder:
+                magic = _split_magic(code)
+                if magic is not None:
+                    result = _run_magic(*magic, options)
+                else:
+                    result = _run_cell_body(code, options)
 
-    except BaseException:
-        # Catch everything — including KeyboardInterrupt and SystemExit — so
-        # that exceptions in user code never propagate up into Maya itself and
-        # potentially destabilise the session.
-        error = _traceback.format_exc()
+        except BaseException:
+            # Catch everything — including KeyboardInterrupt and SystemExit — so
+            # that exceptions in user code never propagate up into Maya itself and
+            # potentially destabilise the session.
+            error = _traceback.format_exc()
 
-    finally:
-        # Always restore stdout/stderr, even if something went horribly wrong.
-        captured_output = capture.getvalue()
-        sys.stdout = old_stdout
-        sys.stderr = old_stderr
+    captured_output = capture.getvalue()
 
-    return json.dumps({
+    # A widget handle has already been displayed via its comm_open, so its
+    # repr() would just be noise under the slider.
+    if isinstance(result, _MayaAttrWidget):
+        result = None
+
+    # Don't emit None as a result — matches Python REPL / IPython behaviour
+    # where ``x = 5`` shows nothing, but ``x`` shows ``5``.
+    serialize_started = time.perf_counter()
+    data = _result_bundle(result)
+    timing['serialize_s'] = time.perf_counter() - serialize_started
+
+    reply = {
         'stdout': captured_output,
-        # Don't emit None as a result — matches Python REPL / IPython behaviour
-        # where ``x = 5`` shows nothing, but ``x`` shows ``5``.
-        'result': repr(result) if result is not None else None,
+        'result': data['text/plain'] if data else None,
+        'data':   data,
         'error':  error,
-    })
+        'scene_changes': recorder.summary(),
+        # Widgets created during the cell; the kernel opens the real comms.
+        'comm_opens': _take_comm_outbox(),
+    }
+    reply.update(_cell_reply)
+    # Everything but the final json.dumps() below, which cannot time itself.
+    timing['total_s'] = time.perf_counter() - started
+    reply['timing'] = timing
+    return json.dumps(reply)
 
 
 # ---------------------------------------------------------------------------
 # Open the commandPort and register the wrapper
 # ---------------------------------------------------------------------------
 
+def install_jupyter_functions() -> None:
+    """
+    Install ``_jupyter_exec`` and the other kernel entry points into
+    __main__, and register the Maya callbacks they rely on.
+
+    Split out of setup_jupyter_connection() so that maya_jupyter.worker
+    (headless mayapy) can install the same functions behind its own socket
+    server -- commandPort needs the GUI event loop, which mayapy lacks.
+    """
+    # Install the wrapper function into __main__ so the commandPort evaluator
+    # can find it.  Maya's commandPort (-sourceType python) evaluates
+    # expressions in __main__'s namespace, so assigning here is all we need.
+    __main__._jupyter_exec       = _jupyter_exec
+    __main__._jupyter_comm_apply = _jupyter_comm_apply
+    __main__._jupyter_comm_close = _jupyter_comm_close
+    __main__.maya_slider         = maya_slider
+    __main__.main                = main
+    __main__._jupyter_thread_poll   = _jupyter_thread_poll
+    __main__._jupyter_sync_manifest = _jupyter_sync_manifest
+    __main__._jupyter_sync_push     = _jupyter_sync_push
+    __main__._jupyter_put_begin     = _jupyter_put_begin
+    __main__._jupyter_put_chunk     = _jupyter_put_chunk
+    __main__._jupyter_put_end       = _jupyter_put_end
+    __main__._jupyter_get_begin     = _jupyter_get_begin
+    __main__._jupyter_get_chunk     = _jupyter_get_chunk
+    __main__._jupyter_get_end       = _jupyter_get_end
+
+    _install_module_finder()
+    _install_capture_streams()
+
+    _install_scene_callbacks()
+    _register_default_serializers()
+    __main__.register_result_serializer = register_result_serializer
+
+
+def _unix_socket_path(port):
+    """
+    ``/tmp/maya_jupyter-<uid>/commandport-<port>``, creating the directory
+    with mode 0700 so only this user can reach the socket inside it.
+    Mirrors worker.unix_socket_path(), which the kernel uses to find it.
+    """
+    directory = os.path.join('/tmp', f'maya_jupyter-{os.getuid()}')
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.lstat(directory)
+    if not os.path.isdir(directory) or os.path.islink(directory) or st.st_uid != os.getuid():
+        raise PermissionError(f'{directory} is not a directory owned by this user')
+    if st.st_mode & 0o077:
+        os.chmod(directory, 0o700)
+    return os.path.join(directory, f'commandport-{port}')
+
+
+def _open_unix_command_port(port):
+    """
+    Open a second commandPort on a per-user Unix socket (Linux/macOS).
+
+    A commandPort name without a colon is a local socket path rather than a
+    TCP port.  Same-host kernels prefer it: no TCP/IP stack, and only this
+    user can connect.  Returns the path, or None if it could not be opened
+    (the TCP port still works).
+    """
+    if os.name != 'posix':
+        return None     # on Windows a colon-less name is a named pipe
+    try:
+        path = _unix_socket_path(port)
+        try:
+            cmds.commandPort(name=path, close=True)
+        except Exception:
+            pass
+        if os.path.exists(path):
+            os.remove(path)     # stale socket from a Maya that crashed
+        cmds.commandPort(name=path, sourceType='python', bufferSize=COMMAND_PORT_BUFFER_SIZE)
+        os.chmod(path, 0o600)
+    except Exception as exc:
+        print(f'[maya_jupyter] Unix socket not opened ({exc}); TCP only.')
+        return None
+    return path
+
+
 def setup_jupyter_connection(port: int = JUPYTER_PORT) -> None:
     """
     Open Maya's commandPort on ``port`` and install ``_jupyter_exec`` into
@@ -232,22 +1642,27 @@ def setup_jupyter_connection(port: int = JUPYTER_PORT) -> None:
     except Exception:
         pass  # Nothing was open — that's fine.
 
-    # Install the wrapper function into __main__ so the commandPort evaluator
-    # can find it.  Maya's commandPort (-sourceType python) evaluates
-    # expressions in __main__'s namespace, so assigning here is all we need.
-    __main__._jupyter_exec = _jupyter_exec
+    install_jupyter_functions()
 
     # Open the port in Python mode.
     # !! Do NOT add -echoOutput !!
     # Maya 2025 has a str/bytes bug that crashes the socket handler on every
     # response when -echoOutput is active.  Our wrapper captures output
     # internally via StringIO, so -echoOutput is not needed.
-    cmds.commandPort(name=port_name, sourceType='python')
+    # bufferSize: see COMMAND_PORT_BUFFER_SIZE.
+    cmds.commandPort(name=port_name, sourceType='python', bufferSize=COMMAND_PORT_BUFFER_SIZE)
+    unix_path = _open_unix_command_port(port)
 
     print(f'[maya_jupyter] commandPort opened   : {port_name}')
+    if unix_path:
+        print(f'[maya_jupyter] Unix socket opened   : {unix_path}')
     print(f'[maya_jupyter] _jupyter_exec ready  : __main__._jupyter_exec')
     print(f'[maya_jupyter] Waiting for Jupyter kernel connections...')
 
 
 # Run immediately when this file is executed in Maya's Script Editor.
-setup_jupyter_connection(JUPYTER_PORT)
+# maya_jupyter.worker sets _MAYA_JUPYTER_WORKER before exec'ing this file in
+# headless mayapy; it calls install_jupyter_functions() itself and serves
+# requests over its own socket instead of a commandPort.
+if not globals().get('_MAYA_JUPYTER_WORKER'):
+    setup_jupyter_connection(JUPYTER_PORT)
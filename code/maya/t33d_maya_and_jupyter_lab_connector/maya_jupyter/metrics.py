@@ -0,0 +1,179 @@
+"""
+maya_jupyter/metrics.py
+=======================
+Counters and histograms for MayaKernel, in the Prometheus data model, without
+depending on ``prometheus_client``.
+
+The kernel records every commandPort call (bytes each way, per-phase
+timings) and every cell here.  ``%maya_stats`` prints a summary; with
+``--MayaKernel.metrics_port=N`` the same data is served in the Prometheus
+text format at ``http://127.0.0.1:N/metrics`` for a local Prometheus or a
+quick ``curl``.
+
+Metric names and labels
+-----------------------
+  maya_jupyter_calls_total{function}               counter
+  maya_jupyter_call_errors_total{function}         counter
+  maya_jupyter_bytes_sent_total{function}          counter
+  maya_jupyter_bytes_received_total{function}      counter
+  maya_jupyter_request_bytes{function}             histogram
+  maya_jupyter_response_bytes{function}            histogram
+  maya_jupyter_call_seconds{function}              histogram
+  maya_jupyter_phase_seconds{side, phase}          histogram
+  maya_jupyter_cells_total / _cell_errors_total    counter
+  maya_jupyter_cell_seconds                        histogram
+"""
+
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+SECONDS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+BYTES_BUCKETS   = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+                   16777216, 67108864, math.inf)
+
+
+class _Histogram(object):
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts  = [0] * len(buckets)     # per bucket, not cumulative
+        self.sum     = 0.0
+        self.count   = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum   += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate from the buckets, interpolating linearly inside one."""
+        if not self.count:
+            return None
+        rank  = q * self.count
+        seen  = 0
+        lower = 0.0
+        for bound, n in zip(self.buckets, self.counts):
+            if n and seen + n >= rank:
+                if math.isinf(bound):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / n
+            seen += n
+            if not math.isinf(bound):
+                lower = bound
+        return lower
+
+
+class Registry(object):
+    """Thread-safe store of labelled counters and histograms."""
+
+    def __init__(self):
+        self._lock       = threading.Lock()
+        self._counters   = {}   # (name, labels) -> float
+        self._histograms = {}   # (name, labels) -> _Histogram
+        self._help       = {}   # name -> help text
+
+    def describe(self, name: str, text: str) -> None:
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets=SECONDS_BUCKETS, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def counters(self) -> dict:
+        """``{(name, labels): value}`` snapshot."""
+        with self._lock:
+            return dict(self._counters)
+
+    def histograms(self) -> dict:
+        """``{(name, labels): {'count', 'sum', 'p50', 'p95'}}`` snapshot."""
+        with self._lock:
+            return {
+                key: {'count': h.count, 'sum': h.sum,
+                      'p50': h.quantile(0.5), 'p95': h.quantile(0.95)}
+                for key, h in self._histograms.items()
+            }
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            for kind, store in (('counter', self._counters), ('histogram', self._histograms)):
+                for name in sorted({key[0] for key in store}):
+                    if name in self._help:
+                        lines.append(f'# HELP {name} {self._help[name]}')
+                    lines.append(f'# TYPE {name} {kind}')
+                    for (metric, labels), value in sorted(store.items(), key=lambda kv: kv[0]):
+                        if metric != name:
+                            continue
+                        if kind == 'counter':
+                            lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                            continue
+                        cumulative = 0
+                        for bound, n in zip(value.buckets, value.counts):
+                            cumulative += n
+                            le = '+Inf' if math.isinf(bound) else _number(bound)
+                            lines.append(f'{name}_bucket{_labels(labels + (("le", le),))} {cumulative}')
+                        lines.append(f'{name}_sum{_labels(labels)} {_number(value.sum)}')
+                        lines.append(f'{name}_count{_labels(labels)} {value.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def serve_http(registry: Registry, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Serve ``registry.render()`` at ``http://host:port/metrics`` from a daemon
+    thread.  Binds to loopback by default: the numbers describe one user's
+    session and are not meant to leave the machine.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass    # keep scrapes out of the kernel log
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='maya_jupyter-metrics', daemon=True).start()
+    return server
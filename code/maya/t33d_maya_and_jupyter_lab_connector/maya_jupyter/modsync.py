@@ -0,0 +1,111 @@
+"""
+maya_jupyter/modsync.py
+=======================
+Find the local modules a cell imports, so the kernel can ship their source
+to Maya instead of relying on a network share or hand-edited ``sys.path``.
+
+"Local" means a ``<name>.py`` file or a ``<name>/__init__.py`` package
+directly inside the sync root (by default the kernel's working directory,
+which Jupyter sets to the notebook's folder).  Standard-library and
+site-packages modules are never local, so they are never sent.
+
+Discovery is transitive: if ``mytool.py`` imports ``helpers.py`` from the same
+folder, both are collected, because Maya has no other way to find
+``helpers``.  Relative imports inside local packages are covered by sending
+the whole package.
+
+Each collected module is described as::
+
+    {'source': str, 'hash': sha256 hex, 'is_package': bool, 'path': str}
+
+The hash is what keeps this cheap: the kernel sends ``{name: hash}`` first,
+Maya answers with the names it does not already have at that hash, and only
+those sources cross the wire.
+"""
+
+import ast
+import hashlib
+import os
+
+
+def _imported_roots(source: str) -> set:
+    """Top-level names of every absolute import in ``source``."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return set()    # magics, or broken code that will fail in Maya anyway
+    roots = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                roots.add(alias.name.split('.')[0])
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            roots.add(node.module.split('.')[0])
+    return roots
+
+
+def _read(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as fh:
+        return fh.read()
+
+
+def _describe(path: str, is_package: bool) -> dict:
+    source = _read(path)
+    return {
+        'source':     source,
+        'hash':       hashlib.sha256(source.encode('utf-8')).hexdigest(),
+        'is_package': is_package,
+        'path':       os.path.abspath(path),
+    }
+
+
+def _collect_root(root_dir: str, name: str) -> dict:
+    """All modules for one top-level local name (a module or a package)."""
+    module_path  = os.path.join(root_dir, name + '.py')
+    package_init = os.path.join(root_dir, name, '__init__.py')
+
+    if os.path.isfile(package_init):
+        modules = {}
+        package_dir = os.path.join(root_dir, name)
+        for dirpath, dirnames, filenames in os.walk(package_dir):
+            # Only descend into sub-packages, and skip caches.
+            dirnames[:] = [
+                d for d in dirnames
+                if d != '__pycache__' and os.path.isfile(os.path.join(dirpath, d, '__init__.py'))
+            ]
+            rel   = os.path.relpath(dirpath, root_dir)
+            dotted = rel.replace(os.sep, '.')
+            for filename in filenames:
+                if not filename.endswith('.py'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                if filename == '__init__.py':
+                    modules[dotted] = _describe(path, True)
+                else:
+                    modules[f'{dotted}.{filename[:-3]}'] = _describe(path, False)
+        return modules
+
+    if os.path.isfile(module_path):
+        return {name: _describe(module_path, False)}
+
+    return {}
+
+
+def collect_local_modules(code: str, root_dir: str) -> dict:
+    """
+    Return ``{dotted_name: description}`` for every local module ``code``
+    imports, directly or through other local modules.
+    """
+    modules = {}
+    seen    = set()
+    pending = list(_imported_roots(code))
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        found = _collect_root(root_dir, name)
+        for dotted, info in found.items():
+            modules[dotted] = info
+            pending.extend(_imported_roots(info['source']) - seen)
+    return modules
@@ -0,0 +1,256 @@
+"""
+maya_jupyter/pool.py
+====================
+Warm pool of headless mayapy workers for MayaKernel's ``mayapy`` backend.
+
+``maya.standalone.initialize()`` takes many seconds.  A kernel restart in
+JupyterLab kills the kernel process, so anything the kernel merely *holds*
+dies with it.  The pool therefore keeps spares as independent, detached
+processes and finds them again through the filesystem:
+
+    <jupyter runtime dir>/maya_jupyter_pool/<pool key>/
+        3f2a....json            ready spare   (written by worker.py)
+        3f2a....json.claimed    adopted by a kernel (atomic rename)
+        3f2a....log             the worker's stdout/stderr
+
+Adoption is an ``os.rename`` of the ready file, which is atomic, so two
+kernels starting at once can never adopt the same spare.  A spare that
+nobody adopts exits after ``spare_idle_timeout`` seconds; an adopted one
+exits when the kernel that claimed it is gone (see worker.py).
+
+The pool key hashes the mayapy path and the stand-in flag, so spares from
+different Maya versions never mix.
+
+Lifecycle as seen from the kernel
+---------------------------------
+  acquire()    adopt a ready spare if there is one, else start a worker and
+               wait for it (the cold-start cost); then top spares back up to
+               ``spares`` in the background.
+  release()    ask the owned worker to exit (its state belongs to this
+               kernel session), falling back to killing it.
+
+On a restart the old kernel releases its own worker, and the new kernel
+adopts one of the spares that are already initialised.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+from jupyter_core.paths import jupyter_runtime_dir
+
+from .worker import unix_socket_dir
+
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker.py')
+
+
+class WorkerStartError(RuntimeError):
+    """A worker process exited or timed out before it was ready."""
+
+
+def call_worker(host: str, port: int, expression: str, timeout: float = 10.0) -> str:
+    """Send one commandPort-style expression to a worker and return the reply."""
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(expression.encode('utf-8') + b'\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b''.join(chunks).decode('utf-8', errors='replace')
+
+
+class MayapyPool(object):
+    """
+    Start, adopt and release headless mayapy workers.
+
+    Parameters
+    ----------
+    mayapy : str
+        Interpreter used to run worker.py.  ``mayapy`` normally; with
+        ``standin=True`` any Python 3 (``sys.executable`` is a good choice).
+    spares : int
+        Number of initialised, unclaimed workers to keep around.
+    standin : bool
+        Run workers with ``--standin`` (plain Python, no Maya).
+    spare_idle_timeout : float
+        Seconds an unadopted spare waits before exiting on its own.
+    startup_timeout : float
+        Seconds to wait for a cold-started worker to become ready.
+    """
+
+    def __init__(self, mayapy, spares=1, standin=False,
+                 spare_idle_timeout=600.0, startup_timeout=300.0, log=None):
+        self.mayapy             = mayapy
+        self.spares             = max(0, int(spares))
+        self.standin            = standin
+        self.spare_idle_timeout = spare_idle_timeout
+        self.startup_timeout    = startup_timeout
+        self.log                = log
+
+        key = hashlib.sha1(f'{os.path.abspath(mayapy)}|{standin}'.encode('utf-8')).hexdigest()[:12]
+        self.pool_dir = os.path.join(jupyter_runtime_dir(), 'maya_jupyter_pool', key)
+        os.makedirs(self.pool_dir, exist_ok=True)
+
+        self._starting = {}   # ready-file path -> Popen, spawned by us, not ready yet
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def acquire(self) -> dict:
+        """
+        Return a ready worker's info dict (``pid``, ``host``, ``port``, ...),
+        now owned by the caller.  ``info['adopted']`` says whether it was a
+        warm spare; ``info['wait_seconds']`` is how long the caller waited.
+        """
+        started = time.perf_counter()
+        info = self._adopt_spare()
+        if info is None:
+            # No spare yet -- but one we started earlier may be nearly ready.
+            ready_file = next(iter(self._starting), None) or self._spawn()
+            info = self._wait_ready(ready_file)
+            info = self._claim(ready_file, info)
+            if info is None:
+                raise WorkerStartError('Worker became ready but could not be claimed.')
+            info['adopted'] = False
+        info['wait_seconds'] = time.perf_counter() - started
+        self.replenish()
+        return info
+
+    def replenish(self) -> None:
+        """Start workers (without waiting) until ``spares`` are ready or starting."""
+        for path, proc in list(self._starting.items()):
+            if os.path.exists(path) or proc.poll() is not None:
+                del self._starting[path]
+        available = len(self._ready_files()) + len(self._starting)
+        for _ in range(self.spares - available):
+            self._spawn()
+
+    def release(self, info: dict) -> None:
+        """Stop a worker previously returned by ``acquire()``."""
+        try:
+            call_worker(info['host'], info['port'], '_jupyter_worker_exit()', timeout=5.0)
+        except OSError:
+            self._kill(info['pid'])
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    def _ready_files(self):
+        return sorted(glob.glob(os.path.join(self.pool_dir, '*.json')), key=os.path.getmtime)
+
+    def _spawn(self) -> str:
+        name       = uuid.uuid4().hex
+        ready_file = os.path.join(self.pool_dir, name + '.json')
+        log_file   = os.path.join(self.pool_dir, name + '.log')
+        argv = [
+            self.mayapy, WORKER_PATH,
+            '--ready-file',   ready_file,
+            '--idle-timeout', str(self.spare_idle_timeout),
+        ]
+        if self.standin:
+            argv.append('--standin')
+        if os.name == 'posix':
+            # Same-host traffic skips the TCP stack (see kernel.unix_socket).
+            argv += ['--unix-socket', os.path.join(unix_socket_dir(), f'worker-{name}.sock')]
+
+        # Detach from the kernel so spares survive a kernel restart.
+        kwargs = {}
+        if sys.platform == 'win32':
+            kwargs['creationflags'] = (subprocess.DETACHED_PROCESS
+                                       | subprocess.CREATE_NEW_PROCESS_GROUP)
+        else:
+            kwargs['start_new_session'] = True
+
+        with open(log_file, 'ab') as log:
+            proc = subprocess.Popen(
+                argv,
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                close_fds=True, **kwargs
+            )
+        self._starting[ready_file] = proc
+        if self.log:
+            self.log.info('[maya_jupyter] Starting mayapy worker pid=%s', proc.pid)
+        return ready_file
+
+    def _wait_ready(self, ready_file: str) -> dict:
+        proc     = self._starting.get(ready_file)
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if os.path.exists(ready_file):
+                with open(ready_file, 'r', encoding='utf-8') as fh:
+                    return json.load(fh)
+            if proc is not None and proc.poll() is not None:
+                del self._starting[ready_file]
+                raise WorkerStartError(
+                    f'mayapy worker exited with code {proc.returncode} during startup.\n'
+                    + self._log_tail(ready_file)
+                )
+            time.sleep(0.05)
+        raise WorkerStartError(
+            f'mayapy worker was not ready after {self.startup_timeout:.0f}s.\n'
+            + self._log_tail(ready_file)
+        )
+
+    def _adopt_spare(self):
+        for ready_file in self._ready_files():
+            self._starting.pop(ready_file, None)
+            try:
+                with open(ready_file, 'r', encoding='utf-8') as fh:
+                    info = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            info = self._claim(ready_file, info)
+            if info is not None:
+                info['adopted'] = True
+                return info
+        return None
+
+    def _claim(self, ready_file: str, info: dict):
+        """Atomically take ``ready_file``; return ``info`` or None if lost/dead."""
+        self._starting.pop(ready_file, None)
+        try:
+            os.rename(ready_file, ready_file + '.claimed')
+        except OSError:
+            return None     # another kernel got there first
+        try:
+            # Owned workers must never idle out -- they hold session state --
+            # but they follow this kernel down if it crashes or is killed.
+            call_worker(info['host'], info['port'],
+                        f'_jupyter_worker_claim("0", "{os.getpid()}")', timeout=5.0)
+        except OSError:
+            # Stale file from a spare that already died; clean it up.
+            for path in (ready_file + '.claimed', ready_file[:-len('.json')] + '.log'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return None
+        return info
+
+    def _log_tail(self, ready_file: str, lines: int = 20) -> str:
+        log_file = ready_file[:-len('.json')] + '.log'
+        try:
+            with open(log_file, 'r', encoding='utf-8', errors='replace') as fh:
+                tail = fh.read().splitlines()[-lines:]
+        except OSError:
+            return ''
+        return f'Last lines of {log_file}:\n' + '\n'.join(tail)
+
+    @staticmethod
+    def _kill(pid: int) -> None:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
@@ -0,0 +1,222 @@
+"""
+maya_jupyter/transfer.py
+========================
+Kernel side of ``%maya_put`` / ``%maya_get``: move files between the notebook
+host and the Maya host over the same commandPort channel the cells use, so
+caches, textures and scenes no longer depend on the mapped SMB share.
+
+Protocol
+--------
+Files travel in fixed-size chunks (``CHUNK_SIZE`` by default), one
+commandPort call per chunk, each carrying the chunk's sha256.  Memory on
+both ends is bounded by one chunk, whatever the file size.
+
+The receiving side writes to ``<dest>.part`` next to a ``<dest>.part.json``
+sidecar recording the source's size, chunk size and sha256 (for ``get``,
+its mtime instead: Maya reports the file hash only at the end, see below).  The ``.part``
+length is the progress marker: a chunk is only appended after its hash
+checks out, so after a disconnect (or a kernel restart) running the same
+magic again continues from the last whole chunk.  A sidecar that describes
+a different source file (it changed in the meantime) starts over.
+
+When every chunk is in, the whole ``.part`` file is hashed against the
+source hash and renamed onto the destination with ``os.replace``, which is
+atomic: readers see the old file or the complete new one, never a torn one.
+
+Maya hashes on its main thread, so it builds its whole-file hashes from the
+chunks as they pass (``_jupyter_get_end`` returns the source's), instead of
+reading the file in one go before the first chunk.
+
+Each chunk travels as one base64 line, which must fit in the commandPort
+buffer maya_init.py opens (``COMMAND_PORT_BUFFER_SIZE``, 1 MiB); chunk sizes
+are capped at ``MAX_CHUNK_SIZE`` for that reason.
+
+Maya side: ``_jupyter_put_begin/_chunk/_end`` and
+``_jupyter_get_begin/_chunk/_end`` in maya_init.py implement the same scheme.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import time
+
+
+CHUNK_SIZE     = 256 * 1024     # bytes; ~350 KB per commandPort line once base64'd
+MAX_CHUNK_SIZE = 512 * 1024     # ~700 KB of base64: fits maya_init's 1 MiB port buffer
+RETRIES    = 5              # attempts per chunk before giving up (resumable)
+
+
+class TransferError(RuntimeError):
+    """A transfer failed; running the same magic again resumes it."""
+
+
+def _b64json(obj) -> str:
+    return base64.b64encode(json.dumps(obj).encode('utf-8')).decode('ascii')
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_sha256(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """sha256 of a file, read ``chunk_size`` bytes at a time."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def open_part(dest: str, meta: dict):
+    """
+    Open ``<dest>.part`` for appending, resuming when its sidecar matches
+    ``meta`` (``size``, ``sha256``, ``chunk_size``).
+
+    Returns ``(file object positioned at the resume offset, offset)``.  The
+    file is truncated to a whole number of chunks, dropping a chunk that was
+    only partly written when the connection went away.
+    """
+    part    = dest + '.part'
+    sidecar = part + '.json'
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as fh:
+            resumable = json.load(fh) == meta and os.path.exists(part)
+    except (OSError, ValueError):
+        resumable = False
+
+    if resumable:
+        offset = os.path.getsize(part) // meta['chunk_size'] * meta['chunk_size']
+        fh = open(part, 'r+b')
+        fh.truncate(offset)
+        fh.seek(offset)
+        return fh, offset
+
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    with open(sidecar, 'w', encoding='utf-8') as fh:
+        json.dump(meta, fh)
+    return open(part, 'wb'), 0
+
+
+def finish_part(dest: str, expected_sha256: str) -> None:
+    """Verify the complete ``.part`` file and atomically move it onto ``dest``."""
+    part = dest + '.part'
+    if file_sha256(part) != expected_sha256:
+        # Resuming cannot fix a bad file; make the next attempt start clean.
+        discard_part(dest)
+        raise TransferError(f'{dest}: content hash mismatch after transfer; run it again.')
+    os.replace(part, dest)
+    try:
+        os.remove(part + '.json')
+    except OSError:
+        pass
+
+
+def discard_part(dest: str) -> None:
+    for path in (dest + '.part', dest + '.part.json'):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class _Throttle(object):
+    """Sleep just enough to keep the average rate under ``max_rate`` bytes/s."""
+
+    def __init__(self, max_rate):
+        self.max_rate = max_rate
+        self.started  = time.perf_counter()
+        self.sent     = 0
+
+    def __call__(self, nbytes):
+        if not self.max_rate:
+            return
+        self.sent += nbytes
+        ahead = self.sent / self.max_rate - (time.perf_counter() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def _call(call, func_name, *args):
+    """``call(...)`` with retries; Maya-side and transport errors alike."""
+    error = None
+    for attempt in range(RETRIES):
+        reply = call(func_name, *args)
+        error = reply.get('error')
+        if not error:
+            return reply
+        time.sleep(min(2.0, 0.1 * 2 ** attempt))
+    raise TransferError(f'{func_name} failed {RETRIES} times; run the magic again to resume.\n{error}')
+
+
+def put(call, local: str, remote: str, chunk_size: int = CHUNK_SIZE, max_rate=None) -> dict:
+    """
+    Copy ``local`` (notebook host) to ``remote`` (Maya host).
+
+    ``call(func_name, *str_args)`` is the kernel's ``_call_maya``.  Returns a
+    summary dict: ``path`` (resolved in Maya), ``bytes``, ``sent``,
+    ``resumed_from``, ``seconds``.
+    """
+    started    = time.perf_counter()
+    chunk_size = min(chunk_size, MAX_CHUNK_SIZE)
+    size       = os.path.getsize(local)
+    meta       = {'size': size, 'sha256': file_sha256(local, chunk_size), 'chunk_size': chunk_size}
+
+    reply  = _call(call, '_jupyter_put_begin', _b64json(dict(meta, path=remote)))
+    offset = resumed_from = reply['offset']
+    path   = reply['path']
+
+    throttle = _Throttle(max_rate)
+    with open(local, 'rb') as fh:
+        fh.seek(offset)
+        while offset < size:
+            data  = fh.read(chunk_size)
+            reply = _call(
+                call, '_jupyter_put_chunk',
+                _b64json({'path': remote, 'offset': offset, 'sha256': _sha256(data)}),
+                base64.b64encode(data).decode('ascii'),
+            )
+            if reply['offset'] != offset + len(data):
+                # Maya has a different idea of progress (e.g. its .part was
+                # cleaned up); follow it rather than leaving a gap.
+                fh.seek(reply['offset'])
+            offset = reply['offset']
+            throttle(len(data))
+
+    _call(call, '_jupyter_put_end', _b64json({'path': remote}))
+    return {'path': path, 'bytes': size, 'sent': size - resumed_from,
+            'resumed_from': resumed_from, 'seconds': time.perf_counter() - started}
+
+
+def get(call, remote: str, local: str, chunk_size: int = CHUNK_SIZE, max_rate=None) -> dict:
+    """
+    Copy ``remote`` (Maya host) to ``local`` (notebook host).
+
+    Same arguments and summary as ``put()``; ``path`` is the local path.
+    """
+    started    = time.perf_counter()
+    chunk_size = min(chunk_size, MAX_CHUNK_SIZE)
+    reply      = _call(call, '_jupyter_get_begin', _b64json({'path': remote}))
+    size       = reply['size']
+    mtime      = reply['mtime']
+    meta       = {'size': size, 'mtime': mtime, 'chunk_size': chunk_size}
+
+    throttle   = _Throttle(max_rate)
+    fh, offset = open_part(local, meta)
+    resumed_from = offset
+    with fh:
+        while offset < size:
+            reply = _call(call, '_jupyter_get_chunk', _b64json(
+                {'path': remote, 'offset': offset, 'size': chunk_size, 'mtime': mtime}
+            ))
+            data = base64.b64decode(reply['data'])
+            if _sha256(data) != reply['sha256']:
+                raise TransferError(f'{remote}: chunk at {offset} arrived corrupted; run it again.')
+            fh.write(data)
+            offset += len(data)
+            throttle(len(data))
+
+    reply = _call(call, '_jupyter_get_end', _b64json({'path': remote, 'mtime': mtime}))
+    finish_part(local, reply['sha256'])
+    return {'path': os.path.abspath(local), 'bytes': size, 'sent': size - resumed_from,
+            'resumed_from': resumed_from, 'seconds': time.perf_counter() - started}
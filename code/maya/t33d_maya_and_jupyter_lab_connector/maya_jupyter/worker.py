@@ -0,0 +1,367 @@
+"""
+maya_jupyter/worker.py
+======================
+A headless Maya worker for MayaKernel: runs ``maya.standalone`` inside
+``mayapy`` with the ``_jupyter_exec`` functions from maya_init.py preloaded,
+and answers requests over a socket.
+
+Launched and owned by the kernel (see pool.py); you normally never start it
+by hand.  For debugging:
+
+    mayapy <path>/maya_jupyter/worker.py --ready-file /tmp/w.json
+    python <path>/maya_jupyter/worker.py --standin --ready-file /tmp/w.json
+
+It is started by file path rather than ``-m maya_jupyter.worker`` because the
+package __init__ imports the kernel (and so ipykernel), which mayapy lacks.
+
+Why not commandPort?
+--------------------
+commandPort is serviced by the GUI's event loop, which ``maya.standalone``
+does not run.  So the worker speaks the commandPort wire protocol itself:
+
+  1. Kernel connects and sends one Python expression terminated by ``\\n``,
+     e.g. ``_jupyter_exec("<b64>", "<b64 opts>")``.
+  2. Worker evaluates it in ``__main__`` and sends ``str(result)`` back.
+  3. Worker closes the connection.
+
+That is exactly what MayaKernel already does against a GUI Maya, so the
+kernel's transport code does not care which one it is talking to.  Requests
+are served one at a time on the main thread, like Maya's own commandPort.
+
+Stand-in mode
+-------------
+``--standin`` skips Maya entirely and installs a small plain-Python
+``_jupyter_exec`` that honours the same reply contract (stdout / result /
+data / error).  Any Python 3 interpreter can run it, which makes the backend,
+the warm pool and the transport testable and benchmarkable without a Maya
+licence.
+
+Ready file
+----------
+Once the worker is listening it writes ``--ready-file`` atomically:
+
+    {"pid": 1234, "host": "127.0.0.1", "port": 50123,
+     "unix_socket": "/tmp/maya_jupyter-1000/worker-3f2a....sock",
+     "init_seconds": 7.9, "standin": false, "started": 1700000000.0}
+
+``unix_socket`` is null on Windows or when ``--unix-socket`` was not given.
+
+The pool polls for that file.  A worker nobody has connected to for
+``--idle-timeout`` seconds exits on its own, so spares left behind by a
+kernel that went away do not run forever.  An adopted worker instead
+watches its owner: the kernel passes its pid when it claims the worker,
+and once that process is gone the worker exits too, so a crashed or killed
+kernel does not leave it orphaned.
+"""
+
+import argparse
+import base64
+import ctypes
+import io
+import json
+import os
+import select
+import socket
+import stat
+import sys
+import tempfile
+import time
+import traceback
+import types
+
+
+MAYA_INIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'maya_init.py')
+
+
+# ---------------------------------------------------------------------------
+# Per-user Unix socket directory
+# ---------------------------------------------------------------------------
+
+def unix_socket_dir() -> str:
+    """
+    ``/tmp/maya_jupyter-<uid>``: where same-host sockets live, mode 0700.
+
+    Only the owner can enter the directory, so only they can connect to the
+    sockets inside, whatever mode Maya gives the socket file itself.  A
+    fixed ``/tmp`` path (not ``$TMPDIR``) keeps Maya launched from the desktop
+    and a kernel launched from a shell agreeing on it.  maya_init.py has its
+    own copy of this convention -- keep the two in step.
+    """
+    base = '/tmp' if os.path.isdir('/tmp') else tempfile.gettempdir()
+    path = os.path.join(base, f'maya_jupyter-{os.getuid()}')
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f'{path} is not a directory owned by this user')
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+def unix_socket_path(port: int) -> str:
+    """The socket maya_init.py opens next to TCP port ``port``."""
+    return os.path.join(unix_socket_dir(), f'commandport-{port}')
+
+
+# ---------------------------------------------------------------------------
+# Stand-in for _jupyter_exec (plain Python, no Maya)
+# ---------------------------------------------------------------------------
+
+def _standin_exec(code_b64: str, options_b64: str = '') -> str:
+    """
+    Plain-Python ``_jupyter_exec``: same arguments, same JSON reply keys.
+
+    Only the core eval-then-exec path is provided; Maya-specific extras
+    (undo chunks, scene change reports, widgets, magics) are absent.
+    """
+    code      = base64.b64decode(code_b64.encode('ascii')).decode('utf-8')
+    namespace = vars(sys.modules['__main__'])
+    capture   = io.StringIO()
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = capture
+    result = error = None
+    try:
+        try:
+            result = eval(compile(code, '<jupyter-cell>', 'eval'), namespace)
+        except SyntaxError:
+            exec(compile(code, '<jupyter-cell>', 'exec'), namespace)  # noqa: S102
+    except BaseException:
+        error = traceback.format_exc()
+    finally:
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+
+    data = None
+    if result is not None:
+        data = {'text/plain': repr(result)}
+        try:
+            data['application/json'] = json.loads(json.dumps(result))
+        except (TypeError, ValueError):
+            pass
+    return json.dumps({
+        'stdout': capture.getvalue(),
+        'result': data['text/plain'] if data else None,
+        'data':   data,
+        'error':  error,
+    })
+
+
+# ---------------------------------------------------------------------------
+# Startup
+# ---------------------------------------------------------------------------
+
+def _fresh_main() -> types.ModuleType:
+    """
+    Give user code its own ``__main__`` module.
+
+    When this file runs as a script it IS ``__main__``; without a fresh
+    module, notebook cells would share a namespace with the server loop.
+    maya_init.py does ``import __main__`` when exec'd, so it picks this up.
+    """
+    module = types.ModuleType('__main__')
+    module.__builtins__ = __builtins__
+    sys.modules['__main__'] = module
+    return module
+
+
+def _initialize(standin: bool) -> float:
+    """Bring up Maya (unless stand-in) and install the entry points."""
+    started   = time.perf_counter()
+    main_mod  = _fresh_main()
+    namespace = vars(main_mod)
+    if standin:
+        main_mod._jupyter_exec = _standin_exec
+    else:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+
+        # Exec maya_init.py into __main__ exactly as the Script Editor would,
+        # minus the commandPort (see the guard at the bottom of that file).
+        namespace['_MAYA_JUPYTER_WORKER'] = True
+        with open(MAYA_INIT_PATH, 'r', encoding='utf-8') as fh:
+            exec(compile(fh.read(), MAYA_INIT_PATH, 'exec'), namespace)  # noqa: S102
+        namespace['install_jupyter_functions']()
+
+    main_mod._jupyter_worker_exit  = _request_exit
+    main_mod._jupyter_worker_claim = _claim
+    return time.perf_counter() - started
+
+
+_exit_requested = False
+_idle_timeout    = 0.0
+_owner_pid       = 0
+
+
+def _claim(idle_timeout: str = '0', owner_pid: str = '0') -> str:
+    """
+    Called by the kernel that adopts this worker (``_jupyter_worker_claim()``).
+
+    A spare exits after ``--idle-timeout`` so abandoned spares clean
+    themselves up; an owned worker holds the user's session state and must
+    not, so the owner replaces the timeout (0 = never).  ``owner_pid`` is the
+    kernel's pid: the worker exits once that process is gone (0 = no owner).
+    """
+    global _idle_timeout, _owner_pid
+    _idle_timeout = float(idle_timeout)
+    _owner_pid    = int(owner_pid)
+    return json.dumps({'claimed': os.getpid()})
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether process ``pid`` is still running."""
+    if sys.platform == 'win32':
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows.
+        kernel32 = ctypes.windll.kernel32
+        handle   = kernel32.OpenProcess(0x00100000, False, pid)    # SYNCHRONIZE
+        if not handle:
+            return False
+        try:
+            return kernel32.WaitForSingleObject(handle, 0) == 0x00000102  # WAIT_TIMEOUT
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _request_exit() -> str:
+    """Called by the kernel (``_jupyter_worker_exit()``) to stop the worker."""
+    global _exit_requested
+    _exit_requested = True
+    return json.dumps({'exiting': os.getpid()})
+
+
+def _write_ready_file(path: str, info: dict) -> None:
+    """Write the ready file atomically so the pool never reads half of it."""
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(info, fh)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# commandPort-compatible server
+# ---------------------------------------------------------------------------
+
+def _read_command(conn: socket.socket) -> str:
+    chunks = []
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b'\n'):
+            break
+    return b''.join(chunks).decode('utf-8').strip()
+
+
+def _evaluate(command: str) -> str:
+    try:
+        return str(eval(command, vars(sys.modules['__main__'])))
+    except BaseException:
+        # Like commandPort, report failures as text rather than dying.
+        return json.dumps({
+            'stdout': '',
+            'result': None,
+            'error':  traceback.format_exc(),
+        })
+
+
+def serve(listeners: list, idle_timeout: float) -> None:
+    """
+    Serve requests on every socket in ``listeners`` (TCP and, on POSIX, a
+    Unix socket) until ``_jupyter_worker_exit()`` is called, until no
+    client has connected for ``idle_timeout`` seconds (0 = never time out),
+    or until the kernel that claimed the worker has exited.
+    """
+    global _idle_timeout
+    _idle_timeout = idle_timeout
+    last_activity = time.monotonic()
+    while not _exit_requested:
+        readable, _, _ = select.select(listeners, [], [], 1.0)
+        if not readable:
+            if _idle_timeout and time.monotonic() - last_activity > _idle_timeout:
+                break
+            if _owner_pid and not _pid_alive(_owner_pid):
+                break
+            continue
+        for listener in readable:
+            conn, _ = listener.accept()
+            with conn:
+                conn.settimeout(None)
+                command = _read_command(conn)
+                if command:
+                    conn.sendall(_evaluate(command).encode('utf-8'))
+        last_activity = time.monotonic()
+
+
+def main(argv=None):
+    """Command-line entry point: ``mayapy <path>/worker.py``"""
+    parser = argparse.ArgumentParser(prog='worker.py')
+    parser.add_argument('--ready-file', required=True,
+                        help='path written (atomically) once the worker is listening')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0,
+                        help='TCP port to listen on (default: any free port)')
+    parser.add_argument('--idle-timeout', type=float, default=600.0,
+                        help='exit after this many seconds without a connection (0 = never)')
+    parser.add_argument('--unix-socket', default=None,
+                        help='also listen on this Unix socket path (POSIX only)')
+    parser.add_argument('--standin', action='store_true',
+                        help='plain Python stand-in: do not start Maya')
+    args = parser.parse_args(argv)
+
+    init_seconds = _initialize(args.standin)
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((args.host, args.port))
+    listener.listen(8)
+    listeners = [listener]
+
+    if args.unix_socket and hasattr(socket, 'AF_UNIX') and os.name == 'posix':
+        if os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+        unix_listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        unix_listener.bind(args.unix_socket)
+        os.chmod(args.unix_socket, stat.S_IRUSR | stat.S_IWUSR)
+        unix_listener.listen(8)
+        listeners.append(unix_listener)
+    else:
+        args.unix_socket = None
+
+    _write_ready_file(args.ready_file, {
+        'pid':          os.getpid(),
+        'host':         args.host,
+        'port':         listener.getsockname()[1],
+        'unix_socket':  args.unix_socket,
+        'init_seconds': init_seconds,
+        'standin':      args.standin,
+        'started':      time.time(),
+    })
+    try:
+        serve(listeners, args.idle_timeout)
+    finally:
+        for sock in listeners:
+            sock.close()
+        # The pool renames the file to '<name>.claimed' when it adopts us,
+        # and points our stdout at '<name>.log' (kept only if we crash).
+        log_file = os.path.splitext(args.ready_file)[0] + '.log'
+        for path in (args.ready_file, args.ready_file + '.claimed', log_file,
+                     args.unix_socket):
+            if path is None:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        if not args.standin:
+            import maya.standalone
+            maya.standalone.uninitialize()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Warm pool tests against the plain-Python stand-in worker (no Maya needed).
+
+    python -m pytest tests
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from maya_jupyter.pool import MayapyPool, call_worker
+
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason='uses os.waitpid to reap workers')
+
+
+def _wait_exit(pid, timeout=15.0):
+    """Reap worker ``pid`` (a child of this process); True if it exited in time."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            return True
+        if done:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def make_pool(tmp_path, monkeypatch):
+    monkeypatch.setenv('JUPYTER_RUNTIME_DIR', str(tmp_path))
+    pools = []
+
+    def make(**kwargs):
+        kwargs.setdefault('spares', 0)
+        kwargs.setdefault('startup_timeout', 30.0)
+        pool = MayapyPool(sys.executable, standin=True, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+
+    for pool in pools:
+        for proc in pool._starting.values():
+            proc.kill()
+        for name in os.listdir(pool.pool_dir):
+            if name.endswith(('.json', '.json.claimed')):
+                try:
+                    with open(os.path.join(pool.pool_dir, name), encoding='utf-8') as fh:
+                        pid = json.load(fh)['pid']
+                    os.kill(pid, signal.SIGKILL)
+                    _wait_exit(pid)
+                except (OSError, ValueError):
+                    pass
+
+
+def test_cold_start_and_release(make_pool):
+    pool = make_pool()
+    info = pool.acquire()
+    assert info['adopted'] is False
+    assert info['standin'] is True
+    assert call_worker(info['host'], info['port'], '6 * 7') == '42'
+
+    pool.release(info)
+    assert _wait_exit(info['pid'])
+    assert os.listdir(pool.pool_dir) == []
+
+
+def test_acquire_adopts_ready_spare(make_pool):
+    pool  = make_pool()
+    ready = pool._spawn()
+    spare = pool._wait_ready(ready)
+
+    info = make_pool().acquire()    # a second kernel with the same key
+    assert info['adopted'] is True
+    assert info['pid'] == spare['pid']
+    assert not os.path.exists(ready)
+    assert os.path.exists(ready + '.claimed')
+
+    pool.release(info)
+    assert _wait_exit(info['pid'])
+
+
+def test_claim_is_exclusive(make_pool):
+    pool  = make_pool()
+    ready = pool._spawn()
+    info  = pool._wait_ready(ready)
+
+    assert pool._claim(ready, dict(info)) is not None
+    assert pool._claim(ready, dict(info)) is None
+    pool.release(info)
+    assert _wait_exit(info['pid'])
+
+
+def test_replenish_starts_spares(make_pool):
+    pool = make_pool(spares=2)
+    pool.replenish()
+    assert len(pool._starting) == 2
+    for ready in list(pool._starting):
+        pool._wait_ready(ready)
+    pool.replenish()
+    assert len(pool._ready_files()) == 2
+    assert pool._starting == {}
+
+
+def test_unadopted_spare_expires(make_pool):
+    pool  = make_pool(spare_idle_timeout=1.0)
+    ready = pool._spawn()
+    info  = pool._wait_ready(ready)
+
+    assert _wait_exit(info['pid'])
+    assert not os.path.exists(ready)
+    assert pool._adopt_spare() is None
+
+
+def test_stale_ready_file_is_skipped(make_pool):
+    pool  = make_pool()
+    ready = pool._spawn()
+    info  = pool._wait_ready(ready)
+    os.kill(info['pid'], signal.SIGKILL)
+    assert _wait_exit(info['pid'])
+
+    # SIGKILL skips the worker's own cleanup, so the ready file is left behind.
+    assert os.path.exists(ready)
+    assert pool._adopt_spare() is None
+    assert os.listdir(pool.pool_dir) == []
+
+
+def test_claimed_worker_exits_with_its_owner(make_pool):
+    pool  = make_pool()
+    ready = pool._spawn()
+    info  = pool._wait_ready(ready)
+
+    owner = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+    call_worker(info['host'], info['port'], f'_jupyter_worker_claim("0", "{owner.pid}")')
+    time.sleep(1.5)
+    assert not _wait_exit(info['pid'], timeout=0.1)
+
+    owner.kill()
+    owner.wait()
+    assert _wait_exit(info['pid'])
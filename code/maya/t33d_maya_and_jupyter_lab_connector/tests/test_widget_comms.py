@@ -0,0 +1,50 @@
+"""
+Widget comms: frontend messages routed through the kernel's shell handlers
+must reach the comm the kernel opened for a Maya widget.
+
+    python -m pytest tests
+"""
+
+import pytest
+
+from maya_jupyter.kernel import MayaKernel
+
+
+@pytest.fixture
+def kernel(monkeypatch):
+    kernel = MayaKernel()
+    monkeypatch.setattr(kernel, 'send_response', lambda *args, **kwargs: None)
+    yield kernel
+    for comm_id in list(kernel._widget_comms):
+        kernel.comm_manager.unregister_comm(kernel._widget_comms.pop(comm_id))
+
+
+def _comm_open(comm_id):
+    return {
+        'comm_id':     comm_id,
+        'target_name': 'jupyter.widget',
+        'data':        {'state': {'value': 0.0}, 'buffer_paths': []},
+        'metadata':    {},
+        'display':     {'text/plain': 'slider'},
+    }
+
+
+def test_comm_msg_reaches_on_widget_msg(kernel, monkeypatch):
+    received = []
+    monkeypatch.setattr(kernel, '_on_widget_msg',
+                        lambda comm_id, msg: received.append((comm_id, msg)))
+    kernel._open_widget_comms([_comm_open('widget-1')])
+
+    msg = {'content': {'comm_id': 'widget-1',
+                       'data': {'method': 'update', 'state': {'value': 3.5}}}}
+    kernel.shell_handlers['comm_msg'](None, [], msg)
+
+    assert received == [('widget-1', msg)]
+
+
+def test_comm_manager_is_the_process_wide_one(kernel):
+    import comm
+
+    kernel._open_widget_comms([_comm_open('widget-2')])
+    assert kernel.comm_manager is comm.get_comm_manager()
+    assert kernel.comm_manager.get_comm('widget-2') is kernel._widget_comms['widget-2']
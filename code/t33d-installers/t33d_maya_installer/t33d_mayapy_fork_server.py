@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+## Fork-server for pre-initialised mayapy workers.
+## Initialises maya.standalone ONCE (plus plugins and t33d) in a parent
+## process, then os.fork()s a fresh child per job.  The children share the
+## parent's already-initialised memory copy-on-write, so a job starts in
+## milliseconds instead of paying maya.standalone.initialize() every time.
+##
+## POSIX only (Linux render nodes, macOS) -- Windows has no fork().
+##
+## Start the server with mayapy:
+##     mayapy t33d_mayapy_fork_server.py serve --socket /tmp/t33d_fork.sock --plugin fbxmaya
+##
+## Submit a job from any Python (or import submit() from this file):
+##     python t33d_mayapy_fork_server.py submit --socket /tmp/t33d_fork.sock \
+##         mypkg.jobs:export_scene '["/jobs/shot010.ma"]'
+##
+## The job function is given as "module:function"; it must be importable in
+## the server (on sys.path / installed next to t33d).  Arguments and the
+## return value travel as JSON.
+
+import argparse
+import gc
+import importlib
+import json
+import os
+import socket
+import stat
+import sys
+import time
+import traceback
+
+
+DEFAULT_SOCKET = f"/tmp/t33d_mayapy_fork_server-{os.getuid() if hasattr(os, 'getuid') else 'user'}.sock"
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _abort(msg):
+    print(f"\n[t33d] ERROR: {msg}", file=sys.stderr)
+    sys.exit(1)
+
+
+def _log(msg):
+    print(f"[t33d] {msg}", flush=True)
+
+
+def _send_line(conn, obj):
+    conn.sendall(json.dumps(obj).encode("utf-8") + b"\n")
+
+
+def _recv_line(conn):
+    chunks = []
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b"\n"):
+            break
+    data = b"".join(chunks).strip()
+    return json.loads(data.decode("utf-8")) if data else None
+
+
+def _resolve(func_ref):
+    """'pkg.module:function' -> the function object."""
+    module_name, _, attr = func_ref.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"Job function must look like 'module:function', got {func_ref!r}")
+    obj = importlib.import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+# ── Parent: initialise once ───────────────────────────────────────────────────
+
+def initialise_maya(plugins=(), imports=("t33d",), eval_mode=None):
+    """
+    Bring up maya.standalone, load plugins and import modules.
+    Returns the cold-start time in seconds, for comparison with job startup.
+    """
+    started = time.perf_counter()
+
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+    import maya.cmds as cmds
+
+    for plugin in plugins:
+        cmds.loadPlugin(plugin, quiet=True)
+        _log(f"plugin loaded: {plugin}")
+
+    for module_name in imports:
+        try:
+            importlib.import_module(module_name)
+            _log(f"imported: {module_name}")
+        except ImportError as exc:
+            _log(f"could not import {module_name}: {exc}")
+
+    ## fork() copies only the calling thread.  Maya's evaluation manager and
+    ## TBB keep worker threads; a child that inherits a lock held by one of
+    ## them can hang.  DG mode avoids the EM's threads during jobs.
+    if eval_mode:
+        cmds.evaluationManager(mode=eval_mode)
+
+    cold_start = time.perf_counter() - started
+
+    ## Move everything allocated so far into the permanent generation, so the
+    ## garbage collector never touches (and so never copies-on-write) the
+    ## pages the children share with the parent.
+    gc.collect()
+    gc.freeze()
+    return cold_start
+
+
+# ── Child: run one job ────────────────────────────────────────────────────────
+
+def _run_child(conn, received_at, forked_at, cold_start):
+    """
+    Runs in the forked child.  Never returns -- always os._exit().
+
+    The request is read here rather than in the server loop, so a slow or
+    idle client only holds up its own slot.
+    """
+    code = 0
+    try:
+        forked_s = time.perf_counter() - forked_at
+        read_started = time.perf_counter()
+        try:
+            conn.settimeout(30)
+            request = _recv_line(conn)
+            conn.settimeout(None)
+        except (OSError, ValueError) as exc:
+            code = 1
+            _send_line(conn, {"ok": False, "error": f"bad request: {exc}"})
+            return
+        if request is None:
+            return
+        started = time.perf_counter()
+        reply = {
+            "pid":          os.getpid(),
+            "queued_s":     forked_at - received_at,       # waiting for a free slot
+            "request_s":    started - read_started,        # reading the client's request
+            "startup_s":    forked_s,                      # fork -> child running
+            "cold_start_s": cold_start,                    # what a fresh mayapy costs
+        }
+        try:
+            func   = _resolve(request["func"])
+            result = func(*request.get("args", []), **request.get("kwargs", {}))
+            try:
+                json.dumps(result)
+            except (TypeError, ValueError):
+                result = repr(result)
+            reply.update(ok=True, result=result)
+        except BaseException:
+            reply.update(ok=False, error=traceback.format_exc())
+            code = 1
+        reply["run_s"] = time.perf_counter() - started
+        _send_line(conn, reply)
+    except BaseException:
+        code = 2
+    finally:
+        ## os._exit skips atexit handlers and Maya's own shutdown, which
+        ## belong to the parent -- a child must never uninitialise Maya.
+        try:
+            conn.close()
+        finally:
+            os._exit(code)
+
+
+# ── Server loop ───────────────────────────────────────────────────────────────
+
+def _reap(children):
+    """Collect exited children without blocking."""
+    while children:
+        try:
+            pid, _status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            children.clear()
+            return
+        if pid == 0:
+            return
+        children.discard(pid)
+
+
+def serve(socket_path=DEFAULT_SOCKET, plugins=(), imports=("t33d",),
+          max_jobs=None, eval_mode="off"):
+    if not hasattr(os, "fork"):
+        _abort("The fork-server needs os.fork() (Linux/macOS); it cannot run on Windows.")
+
+    cold_start = initialise_maya(plugins=plugins, imports=imports, eval_mode=eval_mode)
+    _log(f"maya.standalone ready in {cold_start:.2f}s (cold start)")
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    os.chmod(socket_path, stat.S_IRUSR | stat.S_IWUSR)   # this user only
+    listener.listen(64)
+    listener.settimeout(0.5)
+    _log(f"listening on {socket_path}")
+
+    max_jobs = max_jobs or os.cpu_count() or 4
+    children = set()
+    try:
+        while True:
+            _reap(children)
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                continue
+            received_at = time.perf_counter()
+
+            ## Bound concurrency: wait for a slot before forking another job.
+            while len(children) >= max_jobs:
+                pid, _status = os.waitpid(-1, 0)
+                children.discard(pid)
+            forked_at = time.perf_counter()
+
+            pid = os.fork()
+            if pid == 0:
+                listener.close()
+                _run_child(conn, received_at, forked_at, cold_start)
+            conn.close()            ## the child owns the connection now
+            children.add(pid)
+    except KeyboardInterrupt:
+        _log("shutting down")
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        for pid in list(children):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+
+# ── Client ────────────────────────────────────────────────────────────────────
+
+def submit(func_ref, args=(), kwargs=None, socket_path=DEFAULT_SOCKET, timeout=None):
+    """
+    Run ``func_ref`` ("module:function") in a fresh forked child and return
+    the reply dict: ok, result / error, pid, queued_s, request_s, startup_s,
+    run_s, cold_start_s.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(socket_path)
+        _send_line(conn, {"func": func_ref, "args": list(args), "kwargs": kwargs or {}})
+        reply = _recv_line(conn)
+    if reply is None:
+        return {"ok": False, "error": "fork-server closed the connection without a reply"}
+    return reply
+
+
+# ── Main ──────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="Fork-server for pre-initialised mayapy workers")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="initialise Maya once and fork per job (run with mayapy)")
+    p_serve.add_argument("--socket", default=DEFAULT_SOCKET)
+    p_serve.add_argument("--plugin", action="append", default=[], help="plugin to load (repeatable)")
+    p_serve.add_argument("--import", dest="imports", action="append", default=None,
+                         help="module to pre-import (repeatable; default: t33d)")
+    p_serve.add_argument("--max-jobs", type=int, default=None,
+                         help="maximum concurrent children (default: CPU count)")
+    p_serve.add_argument("--eval-mode", default="off",
+                         help="evaluationManager mode set before forking (default: off = DG)")
+
+    p_submit = sub.add_parser("submit", help="run one job and print its reply")
+    p_submit.add_argument("--socket", default=DEFAULT_SOCKET)
+    p_submit.add_argument("func", help="module:function")
+    p_submit.add_argument("args", nargs="?", default="[]", help="JSON list of arguments")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(
+            socket_path=args.socket,
+            plugins=args.plugin,
+            imports=args.imports if args.imports is not None else ("t33d",),
+            max_jobs=args.max_jobs,
+            eval_mode=args.eval_mode,
+        )
+    else:
+        reply = submit(args.func, json.loads(args.args), socket_path=args.socket)
+        if reply.get("ok"):
+            print(json.dumps(reply.get("result")))
+        else:
+            print(reply.get("error"), file=sys.stderr)
+        if "startup_s" in reply:
+            print(
+                f"[t33d] job pid {reply['pid']}: queued {reply['queued_s'] * 1000:.1f} ms, "
+                f"request read in {reply['request_s'] * 1000:.1f} ms, "
+                f"started in {reply['startup_s'] * 1000:.1f} ms "
+                f"(cold start {reply['cold_start_s']:.2f} s), ran {reply['run_s']:.3f} s",
+                file=sys.stderr,
+            )
+        sys.exit(0 if reply.get("ok") else 1)
+
+
+if __name__ == "__main__":
+    main()